@@ -1,13 +1,20 @@
 # app/api/routes.py (update)
-from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
 
+from app.connectors.rasa_connector import RasaUnavailableError
 from app.services.chat_service import ChatService
+from app.services.conversation_locks import ConversationBusyError
 
 chat_router = APIRouter(prefix="/chat", tags=["chat"])
 chat_service = ChatService()
+logger = logging.getLogger(__name__)
 
 
 class MessageRequest(BaseModel):
@@ -28,7 +35,12 @@ class ChatHistory(BaseModel):
 
 @chat_router.post("/new", response_model=MessageResponse)
 async def new_conversation(request: MessageRequest):
-    response = await chat_service.process_message(message=request.message, user_id=request.user_id, conversation_id=request.conversation_id)
+    try:
+        response = await chat_service.process_message(message=request.message, user_id=request.user_id, conversation_id=request.conversation_id)
+    except RasaUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ConversationBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     return {"message": {"role": "assistant", "content": response["response"], "buttons": response.get("buttons", [])}, "conversation_id": response["conversation_id"]}
 
 
@@ -37,55 +49,108 @@ async def send_message(request: MessageRequest):
     try:
         response = await chat_service.process_message(message=request.message, user_id=request.user_id, conversation_id=request.conversation_id)
 
-        print("-----> RESPONSE", response)
+        logger.debug("Message processed", extra={"conversation_id": response["conversation_id"], "buttons": len(response.get("buttons", []))})
         # Format the response to match what the frontend expects
         return {
             "message": {"role": "assistant", "content": response["response"], "buttons": response.get("buttons", []), "custom": response.get("custom", {})},
             "conversation_id": response["conversation_id"],
         }
+    except RasaUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ConversationBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
+        logger.exception("Failed to process message", extra={"conversation_id": request.conversation_id})
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @chat_router.get("/conversations/{conversation_id}", response_model=ChatHistory)
 async def get_conversation(conversation_id: str):
     try:
-        history = chat_service.get_conversation_history(conversation_id)
+        history = await chat_service.get_conversation_history(conversation_id)
         return ChatHistory(conversation_id=conversation_id, messages=history)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
 @chat_router.get("/conversations", response_model=List[Dict[str, Any]])
-async def get_conversations():
-    # Get a list of all conversations with basic metadata
-    conversations = []
-    for conv_id, messages in chat_service.conversations.items():
-        if messages:
-            # Get the first user message as the title, fallback to "New Conversation"
-            title = "New Conversation"
-            for msg in messages:
-                if msg["role"] == "user":
-                    title = msg["content"][:30] + ("..." if len(msg["content"]) > 30 else "")
-                    break
-
-            # Get the latest timestamp
-            latest_ts = messages[-1]["timestamp"] if messages else None
+async def get_conversations(
+    user_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = Query(None, description="Return conversations updated before this timestamp (updated_at of the last item of the previous page)"),
+    before_id: Optional[str] = Query(None, description="With before, also return conversations updated at that timestamp whose id sorts before this one (id of the last item of the previous page)"),
+):
+    # Summaries come from an index, newest first, so the cost depends on the page size only
+    if before is not None:
+        try:
+            datetime.fromisoformat(before)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {before}")
 
-            conversations.append({"id": conv_id, "title": title, "updated_at": latest_ts})
+    elif before_id is not None:
+        raise HTTPException(status_code=400, detail="before_id requires before")
 
-    # Sort by most recent first
-    conversations.sort(key=lambda x: x["updated_at"] if x["updated_at"] else "", reverse=True)
-    return conversations
+    return await chat_service.list_conversations(user_id=user_id, limit=limit, before=before, before_id=before_id)
 
 
 @chat_router.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     try:
-        if conversation_id in chat_service.conversations:
-            del chat_service.conversations[conversation_id]
-            return {"status": "success", "message": f"Conversation {conversation_id} deleted"}
-        else:
-            raise HTTPException(status_code=404, detail=f"Conversation {conversation_id} not found")
+        deleted = await chat_service.delete_conversation(conversation_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Conversation {conversation_id} not found")
+    return {"status": "success", "message": f"Conversation {conversation_id} deleted"}
+
+
+@chat_router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """Carry many conversations over one socket.
+
+    Clients send {"message", "conversation_id", "user_id", "request_id"} frames and
+    receive the "utterance", "progress" and "done" events of ChatService.stream_message,
+    tagged with the request_id. Messages are processed concurrently, so a slow
+    conversation does not hold up the others sharing the socket; messages of the
+    same conversation are still handled in order by ChatService.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    tasks: Set[asyncio.Task] = set()
+
+    async def send(event: Dict[str, Any]):
+        async with send_lock:
+            await websocket.send_json(event)
+
+    async def handle(request: MessageRequest, request_id: Optional[str]):
+        try:
+            async for event in chat_service.stream_message(message=request.message, user_id=request.user_id, conversation_id=request.conversation_id):
+                await send({**event, "request_id": request_id})
+        except WebSocketDisconnect:
+            pass
+        except RasaUnavailableError as e:
+            await send({"type": "error", "request_id": request_id, "conversation_id": request.conversation_id, "status_code": 503, "detail": str(e)})
+        except ConversationBusyError as e:
+            await send({"type": "error", "request_id": request_id, "conversation_id": request.conversation_id, "status_code": 429, "detail": str(e)})
+        except Exception as e:
+            await send({"type": "error", "request_id": request_id, "conversation_id": request.conversation_id, "status_code": 500, "detail": str(e)})
+
+    try:
+        while True:
+            frame = await websocket.receive_text()
+            try:
+                data = json.loads(frame)
+                request = MessageRequest(**data)
+            except (ValueError, TypeError, ValidationError) as e:
+                await send({"type": "error", "request_id": None, "conversation_id": None, "detail": f"Invalid message: {e}"})
+                continue
+
+            task = asyncio.create_task(handle(request, data.get("request_id")))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
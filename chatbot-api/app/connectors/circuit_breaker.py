@@ -0,0 +1,75 @@
+import time
+from typing import Any, Dict, Optional
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    The breaker opens after `failure_threshold` consecutive failures and rejects
+    calls for `reset_timeout` seconds. It then lets a single probe through
+    (half-open); the probe's outcome closes or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self.total_failures = 0
+        self.total_rejections = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.total_rejections += 1
+        return False
+
+    def release(self) -> None:
+        """Forget an abandoned call without counting it as a success or a failure."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.total_failures += 1
+        self._consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        retry_in = None
+        if state == self.OPEN:
+            retry_in = round(max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0), 1)
+        return {
+            "state": state,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "retry_in": retry_in,
+            "total_failures": self.total_failures,
+            "total_rejections": self.total_rejections,
+        }
@@ -1,26 +1,164 @@
-from typing import Any, Dict, Optional
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
 
 import httpx
 
+from app.connectors.circuit_breaker import CircuitBreaker
+from app.monitoring.metrics import RASA_ERRORS, RASA_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Failures where Rasa cannot have processed the message, so sending it again is safe
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Only 503 means the request was turned away; after a 502 or 504 Rasa may have
+# run the message's actions, and sending it again would run them twice
+RETRYABLE_STATUS_CODES = {503}
+
+
+class RasaUnavailableError(Exception):
+    """Raised without calling Rasa while the circuit breaker is open."""
+
 
 class RasaConnector:
-    def __init__(self, rasa_url: str = "http://chatbot-nlu:5005"):  # Changed port to 45005
-        self.rasa_url = rasa_url
-        self.client = httpx.AsyncClient(timeout=30.0)
+    def __init__(self, rasa_url: Optional[str] = None, settings: Optional[Dict[str, str]] = None):
+        settings = os.environ if settings is None else settings
+        self.rasa_url = rasa_url or settings.get("RASA_URL", "http://chatbot-nlu:5005")
+
+        self.limits = httpx.Limits(
+            max_connections=int(settings.get("RASA_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(settings.get("RASA_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(settings.get("RASA_KEEPALIVE_EXPIRY", "30")),
+        )
+        self.timeout = httpx.Timeout(
+            connect=float(settings.get("RASA_CONNECT_TIMEOUT", "5")),
+            read=float(settings.get("RASA_READ_TIMEOUT", "30")),
+            write=float(settings.get("RASA_WRITE_TIMEOUT", "10")),
+            pool=float(settings.get("RASA_POOL_TIMEOUT", "5")),
+        )
+        self.max_retries = int(settings.get("RASA_MAX_RETRIES", "2"))
+        self.backoff_base = float(settings.get("RASA_BACKOFF_BASE", "0.2"))
+        self.backoff_max = float(settings.get("RASA_BACKOFF_MAX", "2"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(settings.get("RASA_BREAKER_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(settings.get("RASA_BREAKER_RESET_TIMEOUT", "30")),
+        )
+        self.in_flight = 0
+
+        self.client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying workers from hitting Rasa in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def _with_retry(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Call `send`, retrying failures that happened before Rasa processed the request."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await send()
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(self._backoff(attempt))
+
+    def _record_error(self, operation: str, error: httpx.HTTPError, started: float) -> None:
+        RASA_LATENCY.labels(operation=operation, outcome="error").observe(time.perf_counter() - started)
+        RASA_ERRORS.labels(operation=operation, error=type(error).__name__).inc()
+        logger.warning("Error communicating with Rasa", extra={"operation": operation, "error": str(error), "error_type": type(error).__name__})
+        # Client errors say nothing about Rasa's health
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code < 500:
+            self.breaker.release()
+        else:
+            self.breaker.record_failure()
+
+    def _check_breaker(self, operation: str) -> None:
+        if not self.breaker.allow_request():
+            RASA_ERRORS.labels(operation=operation, error="CircuitOpen").inc()
+            raise RasaUnavailableError("The assistant is temporarily unavailable. Please try again shortly.")
 
     async def send_message(self, message: str, sender_id: str) -> Dict[str, Any]:
         """Send a message to Rasa and get the response."""
         endpoint = f"{self.rasa_url}/webhooks/rest/webhook"
         payload = {"sender": sender_id, "message": message}
 
+        self._check_breaker("send")
+        self.in_flight += 1
+        started = time.perf_counter()
         try:
-            print(f"Sending message to Rasa: {endpoint} {payload}")
-            response = await self.client.post(endpoint, json=payload)
+            logger.debug("Sending message to Rasa", extra={"endpoint": endpoint, "sender": sender_id})
+            response = await self._with_retry(lambda: self.client.post(endpoint, json=payload))
             response.raise_for_status()
-            return response.json()
+            result = response.json()
         except httpx.HTTPError as e:
-            print(f"Error communicating with Rasa: {e}")
+            self._record_error("send", e, started)
             return [{"text": "Sorry, I'm having trouble processing your request."}]
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            self.in_flight -= 1
+
+        RASA_LATENCY.labels(operation="send", outcome="success").observe(time.perf_counter() - started)
+        self.breaker.record_success()
+        return result
+
+    async def stream_message(self, message: str, sender_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Send a message to Rasa and yield each bot message as soon as Rasa emits it."""
+        endpoint = f"{self.rasa_url}/webhooks/rest/webhook"
+        payload = {"sender": sender_id, "message": message}
+
+        self._check_breaker("stream")
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            # With stream=true the REST channel writes one JSON message per line as the bot produces it
+            request = self.client.build_request("POST", endpoint, params={"stream": "true"}, json=payload)
+            response = await self._with_retry(lambda: self.client.send(request, stream=True))
+            try:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+            finally:
+                await response.aclose()
+        except httpx.HTTPError as e:
+            self._record_error("stream", e, started)
+            yield {"text": "Sorry, I'm having trouble processing your request."}
+            return
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            self.in_flight -= 1
+
+        RASA_LATENCY.labels(operation="stream", outcome="success").observe(time.perf_counter() - started)
+        self.breaker.record_success()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool usage for monitoring."""
+        # httpx does not expose pool statistics publicly; read them from the httpcore pool
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "in_flight_requests": self.in_flight,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rasa_url": self.rasa_url, "circuit_breaker": self.breaker.snapshot(), "pool": self.pool_stats()}
 
     async def close(self):
         await self.client.aclose()
@@ -0,0 +1,68 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with `extra=` fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the event loop: records are dropped when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(settings: Optional[Dict[str, str]] = None) -> logging.handlers.QueueListener:
+    """Route the `app` loggers through a bounded queue to a JSON stdout handler and start its listener.
+
+    Formatting and writing happen on the listener thread; request handlers only
+    enqueue records. Call `stop()` on the returned listener to flush at shutdown.
+    """
+    settings = os.environ if settings is None else settings
+    log_queue: queue.Queue = queue.Queue(maxsize=int(settings.get("LOG_QUEUE_SIZE", "10000")))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    logger = logging.getLogger("app")
+    for handler in list(logger.handlers):
+        if isinstance(handler, DroppingQueueHandler):
+            logger.removeHandler(handler)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    logger.setLevel(settings.get("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+    listener.start()
+    return listener
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Rasa round trips include slow actions such as query analysis, hence the long tail buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram("chatbot_api_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_PROGRESS = Gauge("chatbot_api_requests_in_progress", "HTTP requests and WebSocket connections being served", ["method", "route"])
+
+RASA_LATENCY = Histogram("chatbot_api_rasa_request_duration_seconds", "Round-trip time of calls to Rasa", ["operation", "outcome"], buckets=LATENCY_BUCKETS)
+RASA_ERRORS = Counter("chatbot_api_rasa_errors_total", "Failed calls to Rasa by error type", ["operation", "error"])
+RASA_IN_FLIGHT = Gauge("chatbot_api_rasa_requests_in_flight", "Calls to Rasa waiting for a response")
+RASA_CIRCUIT_OPEN = Gauge("chatbot_api_rasa_circuit_open", "1 while the Rasa circuit breaker rejects requests")
+
+CONVERSATIONS = Gauge("chatbot_api_conversations", "Conversations held by the conversation store")
+ACTIVE_CONVERSATION_LOCKS = Gauge("chatbot_api_conversation_locks", "Conversations with a message being processed or waiting")
+ARTIFACT_FILES = Gauge("chatbot_api_artifact_files", "Files in the download directory")
+ARTIFACT_BYTES = Gauge("chatbot_api_artifact_bytes", "Total size of the download directory in bytes")
+
+
+def _route_template(scope: Scope) -> str:
+    # Label by route template, not raw path, to keep label cardinality bounded
+    app = scope.get("app")
+    for route in getattr(app, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unknown")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight counts per route."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "WS")
+        route = _route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message: Any) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "websocket.accept":
+                status["code"] = 101
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method=method, route=route)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            REQUEST_LATENCY.labels(method=method, route=route, status=str(status["code"])).observe(time.perf_counter() - started)
+
+
+async def update_service_metrics(chat_service: Any) -> None:
+    """Refresh gauges that are sampled at scrape time rather than updated on every request."""
+    CONVERSATIONS.set(await chat_service.store.size())
+    ACTIVE_CONVERSATION_LOCKS.set(len(chat_service.locks))
+    RASA_IN_FLIGHT.set(chat_service.rasa_connector.in_flight)
+    RASA_CIRCUIT_OPEN.set(1 if chat_service.rasa_connector.breaker.state == chat_service.rasa_connector.breaker.OPEN else 0)
+
+    files, total_bytes = await asyncio.to_thread(chat_service.artifacts.usage)
+    ARTIFACT_FILES.set(files)
+    ARTIFACT_BYTES.set(total_bytes)
@@ -1,18 +1,33 @@
 # app/services/chat_service.py (update)
+import asyncio
 import json
+import logging
 import os
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from app.connectors.rasa_connector import RasaConnector
+from app.services.conversation_locks import ConversationLocks
+from app.stores.artifact_store import ArtifactStore
+from app.stores.conversation_store import ConversationStore, create_conversation_store
+
+logger = logging.getLogger(__name__)
 
 
 class ChatService:
-    def __init__(self):
-        # In-memory storage for chat history
-        # In a production environment, you'd use a database
-        self.conversations: Dict[str, List[dict]] = {}
+    def __init__(self, store: Optional[ConversationStore] = None, locks: Optional[ConversationLocks] = None):
+        # Conversation history lives in a pluggable store (bounded in-memory or Redis)
+        self.store = store if store is not None else create_conversation_store()
+        # Messages of one conversation are sent to Rasa and recorded one at a time, in order
+        if locks is None:
+            locks = ConversationLocks(
+                timeout=float(os.getenv("CONVERSATION_LOCK_TIMEOUT", "60")),
+                max_pending=int(os.getenv("CONVERSATION_MAX_PENDING", "10")),
+            )
+        self.locks = locks
+        # Downloads produced by the action server, shared through a volume
+        self.artifacts = ArtifactStore()
         self.rasa_connector = RasaConnector()
 
     async def process_message(self, message: str, user_id: str = "anonymous", conversation_id: Optional[str] = None) -> dict:
@@ -20,68 +35,153 @@ class ChatService:
         if conversation_id is None:
             conversation_id = str(uuid.uuid4())
 
-        # Send message to Rasa
-        print(f"Sending message to Rasa: {message}")
-        rasa_response = await self.rasa_connector.send_message(message, conversation_id)
+        async with self.locks.hold(conversation_id):
+            # Send message to Rasa
+            logger.debug("Sending message to Rasa", extra={"conversation_id": conversation_id, "message_length": len(message)})
+            rasa_response = await self.rasa_connector.send_message(message, conversation_id)
 
-        # Process Rasa response
-        processed_response = self._process_rasa_response(rasa_response)
+            # Process Rasa response
+            processed_response = await self._process_rasa_response(rasa_response)
 
-        # Store message and response in history
-        if conversation_id not in self.conversations:
-            self.conversations[conversation_id] = []
+            timestamp = await self._record_exchange(conversation_id, user_id, message, processed_response)
 
-        timestamp = datetime.now().isoformat()
+        return {
+            "response": processed_response.get("text", ""),
+            "buttons": processed_response.get("buttons", []),
+            "conversation_id": conversation_id,
+            "custom": processed_response.get("custom", {}),
+            "timestamp": timestamp,
+        }
 
-        # Add user message to history
-        self.conversations[conversation_id].append({"role": "user", "content": message, "timestamp": timestamp, "user_id": user_id})
+    async def stream_message(
+        self, message: str, user_id: str = "anonymous", conversation_id: Optional[str] = None, progress_interval: float = 2.0
+    ) -> AsyncIterator[dict]:
+        """Send a message to Rasa and yield events as the conversation progresses.
 
-        # Add assistant response to history
-        self.conversations[conversation_id].append(
+        Yields an "utterance" event for every bot message as soon as Rasa emits it,
+        a "progress" event every `progress_interval` seconds while Rasa (for example
+        a slow action such as action_submit_query_analysis) is still busy, and a
+        final "done" event carrying the combined response stored in history.
+        """
+        if conversation_id is None:
+            conversation_id = str(uuid.uuid4())
+
+        async with self.locks.hold(conversation_id):
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            queue: asyncio.Queue = asyncio.Queue()
+
+            async def pump():
+                try:
+                    async for rasa_message in self.rasa_connector.stream_message(message, conversation_id):
+                        await queue.put(("message", rasa_message))
+                except Exception as e:
+                    await queue.put(("error", e))
+                finally:
+                    await queue.put(("end", None))
+
+            pump_task = asyncio.create_task(pump())
+            parts = []
+            try:
+                while True:
+                    try:
+                        kind, payload = await asyncio.wait_for(queue.get(), timeout=progress_interval)
+                    except asyncio.TimeoutError:
+                        yield {"type": "progress", "conversation_id": conversation_id, "status": "processing", "elapsed": round(loop.time() - started, 1)}
+                        continue
+
+                    if kind == "error":
+                        raise payload
+                    if kind == "end":
+                        break
+
+                    part = await self._process_rasa_message(payload)
+                    parts.append(part)
+                    yield {"type": "utterance", "conversation_id": conversation_id, "message": {"role": "assistant", "content": part["text"], "buttons": part["buttons"], "custom": part["custom"]}}
+            finally:
+                pump_task.cancel()
+
+            processed_response = self._merge_rasa_messages(parts)
+            timestamp = await self._record_exchange(conversation_id, user_id, message, processed_response)
+
+            yield {
+                "type": "done",
+                "conversation_id": conversation_id,
+                "message": {"role": "assistant", "content": processed_response["text"], "buttons": processed_response["buttons"], "custom": processed_response["custom"]},
+                "timestamp": timestamp,
+            }
+
+    async def _record_exchange(self, conversation_id: str, user_id: str, message: str, processed_response: Dict[str, Any]) -> str:
+        """Store a user message and the assistant response in history and return their timestamp."""
+        timestamp = datetime.now().isoformat()
+
+        # Store the user message and the assistant response in history
+        await self.store.append(
+            conversation_id,
+            {"role": "user", "content": message, "timestamp": timestamp, "user_id": user_id},
             {
                 "role": "assistant",
                 "content": processed_response.get("text", ""),
                 "buttons": processed_response.get("buttons", []),  # Store buttons in history
                 "custom": processed_response.get("custom", {}),
                 "timestamp": timestamp,
-            }
+            },
         )
 
-        return {
-            "response": processed_response.get("text", ""),
-            "buttons": processed_response.get("buttons", []),
-            "conversation_id": conversation_id,
-            "custom": processed_response.get("custom", {}),
-            "timestamp": timestamp,
-        }
+        # Keep the conversation summary index up to date
+        summary = await self.store.get_summary(conversation_id) or {"title": self._conversation_title(message), "message_count": 0}
+        summary.update(updated_at=timestamp, user_id=user_id, message_count=summary["message_count"] + 2)
+        await self.store.save_summary(conversation_id, summary)
+
+        return timestamp
+
+    @staticmethod
+    def _conversation_title(message: str) -> str:
+        # The first user message becomes the title of the conversation
+        return message[:30] + ("..." if len(message) > 30 else "")
 
-    def _process_rasa_response(self, rasa_response: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def _process_rasa_response(self, rasa_response: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Process raw Rasa response into structured format."""
-        # Collect all texts and buttons
+        return self._merge_rasa_messages([await self._process_rasa_message(msg) for msg in rasa_response])
+
+    async def _process_rasa_message(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a single Rasa message into its text, buttons and custom payload."""
         texts = []
-        all_buttons = []
+        buttons = []
         custom = {}
 
-        for msg in rasa_response:
-            if "text" in msg:
-                texts.append(msg["text"])
+        if "text" in msg:
+            texts.append(msg["text"])
+
+        if "buttons" in msg:
+            buttons.extend(msg["buttons"])
 
-            if "buttons" in msg:
-                all_buttons.extend(msg["buttons"])
+        if "custom" in msg:
+            custom.update(msg["custom"])
+            custom_object = msg["custom"]
+            if custom_object.get("form_type", "") == "download":
+                # Actions store large payloads in the artifact store and only send its id;
+                # older actions still inline the document, which is serialized and written on a worker thread
+                if "artifact_id" not in custom_object:
+                    objects = custom_object.get("objects", {})
+                    await self.artifacts.write_bytes_async(custom_object.get("file_name"), lambda: json.dumps(objects).encode("utf-8"))
 
-            if "custom" in msg:
-                custom.update(msg["custom"])
-                custom_object = msg["custom"]
-                if custom_object.get("form_type", "") == "download":
-                    file_name = custom_object.get("file_name")
-                    content = json.dumps(custom_object.get("objects", {}))
-                    os.makedirs("/tmp/downloads", exist_ok=True)
-                    download_file_path = f"/tmp/downloads/{file_name}"
-                    with open(download_file_path, "w") as f:
-                        f.write(content)
+                text = "Download file"
+                texts.append(text)
 
-                    text = "Download file"
-                    texts.append(text)
+        return {"text": " ".join(texts), "buttons": buttons, "custom": custom}
+
+    @staticmethod
+    def _merge_rasa_messages(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine processed Rasa messages into a single response."""
+        # Collect all texts and buttons
+        texts = [part["text"] for part in parts if part["text"]]
+        all_buttons = []
+        custom = {}
+
+        for part in parts:
+            all_buttons.extend(part["buttons"])
+            custom.update(part["custom"])
 
         # Fallback if Rasa doesn't respond
         if not texts:
@@ -89,11 +189,19 @@ class ChatService:
 
         return {"text": " ".join(texts), "buttons": all_buttons, "custom": custom}
 
-    def get_conversation_history(self, conversation_id: str) -> List[dict]:
-        if conversation_id not in self.conversations:
+    async def get_conversation_history(self, conversation_id: str) -> List[dict]:
+        history = await self.store.get(conversation_id)
+        if history is None:
             raise ValueError(f"Conversation ID {conversation_id} not found")
 
-        return self.conversations[conversation_id]
+        return history
+
+    async def list_conversations(self, user_id: Optional[str] = None, limit: int = 50, before: Optional[str] = None, before_id: Optional[str] = None) -> List[dict]:
+        return await self.store.list_summaries(user_id=user_id, limit=limit, before=before, before_id=before_id)
+
+    async def delete_conversation(self, conversation_id: str) -> bool:
+        return await self.store.delete(conversation_id)
 
     async def close(self):
         await self.rasa_connector.close()
+        await self.store.close()
@@ -0,0 +1,57 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+
+class ConversationBusyError(Exception):
+    """Raised when a message cannot get its turn in a conversation in time."""
+
+
+class _Entry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Holder plus waiters; the entry is dropped when this reaches zero
+        self.users = 0
+
+
+class ConversationLocks:
+    """Per-conversation FIFO locks, created on demand and dropped once idle.
+
+    Messages of one conversation are handled one at a time in arrival order while
+    different conversations proceed in parallel. Waiting is bounded both in time
+    (`timeout`) and in queue depth (`max_pending`).
+    """
+
+    def __init__(self, timeout: float = 60.0, max_pending: int = 10):
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._entries: Dict[str, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @asynccontextmanager
+    async def hold(self, conversation_id: str) -> AsyncIterator[None]:
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            entry = self._entries[conversation_id] = _Entry()
+        # Everyone but the holder is waiting; at most `max_pending` may do so
+        if entry.users - 1 >= self.max_pending:
+            raise ConversationBusyError(f"Too many pending messages for conversation {conversation_id}")
+
+        entry.users += 1
+        try:
+            try:
+                await asyncio.wait_for(entry.lock.acquire(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                raise ConversationBusyError(f"Timed out waiting for the previous message of conversation {conversation_id}")
+            try:
+                yield
+            finally:
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._entries[conversation_id]
@@ -0,0 +1,229 @@
+import asyncio
+import gzip
+import logging
+import os
+import re
+import shutil
+import stat
+import tempfile
+import time
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Artifact ids are content hashes plus an extension; legacy downloads use similar plain names
+ARTIFACT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,254}$")
+
+# Bytes read from an artifact at a time while its compressed copy is written
+COPY_BLOCK_SIZE = 1 << 20
+
+
+class BrotliWriter:
+    """Minimal writable file compressing into `fileobj`, like `gzip.GzipFile` does."""
+
+    def __init__(self, fileobj: BinaryIO, quality: int = 5):
+        self.fileobj = fileobj
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def write(self, data: bytes) -> int:
+        self.fileobj.write(self.compressor.process(data))
+        return len(data)
+
+    def close(self) -> None:
+        self.fileobj.write(self.compressor.finish())
+
+    def __enter__(self) -> "BrotliWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# Content-Encoding -> (file suffix, writer factory) of the compressed copies kept next to an artifact;
+# a writer compresses what is written to it into the file it wraps, without closing that file
+ENCODINGS: Dict[str, Any] = {"gzip": (".gz", lambda fileobj: gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=6, mtime=0))}
+if brotli is not None:
+    ENCODINGS["br"] = (".br", BrotliWriter)
+
+# Writers (this store, the action server's exports) stage files under dot-prefixed
+# names; the sweeper leaves them alone unless nothing has touched them for this long
+ABANDONED_TEMP_SECONDS = 86400
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """Download artifacts shared with the Rasa action server.
+
+    Actions write large results (schema definitions, execution plans) into this
+    directory and send only the artifact id; the API serves the files from disk.
+    """
+
+    def __init__(self, root: Optional[str] = None, ttl_seconds: Optional[float] = None, max_total_bytes: Optional[int] = None):
+        self.root = root or os.getenv("ARTIFACT_DIR", "/tmp/downloads")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("ARTIFACT_TTL_SECONDS", "86400"))
+        self.max_total_bytes = max_total_bytes if max_total_bytes is not None else int(os.getenv("ARTIFACT_MAX_BYTES", str(1024**3)))
+
+    @staticmethod
+    def is_valid_name(file_name: str) -> bool:
+        return bool(ARTIFACT_NAME_PATTERN.match(file_name)) and ".." not in file_name
+
+    def path(self, file_name: str) -> str:
+        if not self.is_valid_name(file_name):
+            raise ValueError(f"Invalid artifact name: {file_name}")
+        return os.path.join(self.root, file_name)
+
+    def resolve(self, file_name: str) -> Optional[str]:
+        """Return the path of an existing artifact, or None if the name is invalid or unknown."""
+        if not self.is_valid_name(file_name):
+            return None
+        path = os.path.join(self.root, file_name)
+        return path if os.path.isfile(path) else None
+
+    async def stat(self, file_name: str) -> Optional[os.stat_result]:
+        """Stat an artifact on a worker thread; None if the name is invalid or it is not a regular file."""
+        if not self.is_valid_name(file_name):
+            return None
+        try:
+            stat_result = await asyncio.to_thread(os.stat, os.path.join(self.root, file_name))
+        except OSError:
+            return None
+        return stat_result if stat.S_ISREG(stat_result.st_mode) else None
+
+    @staticmethod
+    def etag(stat_result: os.stat_result, encoding: Optional[str] = None) -> str:
+        """Strong ETag of an artifact; every representation (identity, gzip, br) gets its own."""
+        tag = f"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+        return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    def compressed(self, file_name: str, encoding: str) -> str:
+        """Return the path of a compressed copy of an artifact, creating it if missing or stale.
+
+        Copies are written once, atomically, next to the artifact and expire with it.
+        The artifact is compressed block by block, so memory does not grow with its size.
+        """
+        suffix, writer = ENCODINGS[encoding]
+        source = self.path(file_name)
+        target = self.path(file_name + suffix)
+        source_mtime = os.stat(source).st_mtime_ns
+        try:
+            if os.stat(target).st_mtime_ns >= source_mtime:
+                return target
+        except FileNotFoundError:
+            pass
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+                with writer(dst) as compressed:
+                    shutil.copyfileobj(src, compressed, COPY_BLOCK_SIZE)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return target
+
+    def write_bytes(self, file_name: str, content: bytes) -> str:
+        """Atomically write an artifact and return its path."""
+        path = self.path(file_name)
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+    async def write_bytes_async(self, file_name: str, content: Callable[[], bytes]) -> str:
+        """Produce and write an artifact on a worker thread so the event loop never blocks on it.
+
+        `content` is called on the worker thread too, so expensive serialization
+        happens off the event loop as well.
+        """
+        return await asyncio.to_thread(lambda: self.write_bytes(file_name, content()))
+
+    def usage(self) -> Tuple[int, int]:
+        """Return the number of files and total bytes in the artifact directory."""
+        if not os.path.isdir(self.root):
+            return 0, 0
+        files = total = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        files += 1
+                        total += entry.stat(follow_symlinks=False).st_size
+                except FileNotFoundError:
+                    pass
+        return files, total
+
+    def sweep(self) -> Dict[str, Any]:
+        """Delete expired artifacts, then the oldest ones until the directory fits the size budget.
+
+        Dot-prefixed files are still being written (`.tmp-`, `.part-`) and are
+        neither expired nor evicted; they are only removed once abandoned.
+        """
+        if not os.path.isdir(self.root):
+            return {"removed": 0, "freed_bytes": 0, "files": 0, "total_bytes": 0}
+
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+        abandoned = now - ABANDONED_TEMP_SECONDS
+        files = []
+        removed = freed = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    if entry.name.startswith("."):
+                        expired = stat.st_mtime < abandoned
+                    else:
+                        expired = stat.st_mtime < cutoff
+                        if not expired:
+                            files.append((stat.st_mtime, stat.st_size, entry.path))
+                    if expired:
+                        os.unlink(entry.path)
+                        removed += 1
+                        freed += stat.st_size
+                except FileNotFoundError:
+                    pass
+
+        # Over budget: evict the oldest downloads first
+        total = sum(size for _, size, _ in files)
+        files.sort()
+        kept = len(files)
+        for _, size, path in files:
+            if total <= self.max_total_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            removed += 1
+            freed += size
+            total -= size
+            kept -= 1
+
+        return {"removed": removed, "freed_bytes": freed, "files": kept, "total_bytes": total}
+
+
+async def sweep_periodically(store: ArtifactStore, interval: float) -> None:
+    """Run `store.sweep()` on a worker thread every `interval` seconds until cancelled."""
+    while True:
+        try:
+            stats = await asyncio.to_thread(store.sweep)
+            if stats["removed"]:
+                logger.info("Swept download artifacts", extra=stats)
+        except OSError as e:
+            logger.warning("Artifact sweep failed", extra={"error": str(e)})
+        await asyncio.sleep(interval)
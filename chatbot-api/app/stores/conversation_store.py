@@ -0,0 +1,290 @@
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ConversationStore(ABC):
+    """Storage interface for conversation histories and their summaries.
+
+    A summary is a small dict (id, title, updated_at, message_count, user_id) kept
+    next to each conversation so listings never have to read message histories.
+    """
+
+    @abstractmethod
+    async def get(self, conversation_id: str) -> Optional[List[dict]]:
+        """Return the messages of a conversation, or None if it does not exist."""
+
+    @abstractmethod
+    async def append(self, conversation_id: str, *messages: dict) -> None:
+        """Append messages to a conversation, creating it if needed."""
+
+    @abstractmethod
+    async def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation and its summary. Returns False if it did not exist."""
+
+    @abstractmethod
+    async def get_summary(self, conversation_id: str) -> Optional[dict]:
+        """Return the summary of a conversation, or None if it has none."""
+
+    @abstractmethod
+    async def save_summary(self, conversation_id: str, summary: dict) -> None:
+        """Create or replace the summary of a conversation."""
+
+    @abstractmethod
+    async def list_summaries(self, user_id: Optional[str] = None, limit: int = 50, before: Optional[str] = None, before_id: Optional[str] = None) -> List[dict]:
+        """Return up to `limit` summaries, most recently updated first, by descending id on ties.
+
+        The `updated_at` and `id` of the last item are the cursor of the next
+        page: only conversations ordered after (`before`, `before_id`) are
+        returned, so conversations sharing a timestamp are never skipped. Without
+        `before_id`, only conversations updated strictly before `before` are.
+        """
+
+    @abstractmethod
+    async def size(self) -> int:
+        """Return the number of live conversations."""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Process-local store with a size cap, LRU eviction and an idle TTL per conversation."""
+
+    def __init__(self, max_conversations: int = 10000, ttl_seconds: float = 86400):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        # conversation_id -> (expires_at, messages), least recently used first
+        self._conversations: "OrderedDict[str, Tuple[float, List[dict]]]" = OrderedDict()
+        self._summaries: Dict[str, dict] = {}
+        # Sorted (updated_at, conversation_id) keys, globally and per user
+        self._recency: List[Tuple[str, str]] = []
+        self._user_recency: Dict[str, List[Tuple[str, str]]] = {}
+
+    def _expired(self, expires_at: float) -> bool:
+        return expires_at <= time.monotonic()
+
+    def _unindex(self, conversation_id: str) -> Optional[dict]:
+        summary = self._summaries.pop(conversation_id, None)
+        if summary is None:
+            return None
+        key = (summary["updated_at"], conversation_id)
+        for keys in (self._recency, self._user_recency.get(summary["user_id"])):
+            if keys is None:
+                continue
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+        if not self._user_recency.get(summary["user_id"], True):
+            del self._user_recency[summary["user_id"]]
+        return summary
+
+    def _drop(self, conversation_id: str) -> bool:
+        self._unindex(conversation_id)
+        return self._conversations.pop(conversation_id, None) is not None
+
+    def _purge_expired(self) -> None:
+        # Every access refreshes the TTL, so expired entries cluster at the LRU head
+        while self._conversations:
+            conversation_id, (expires_at, _) = next(iter(self._conversations.items()))
+            if not self._expired(expires_at):
+                break
+            self._drop(conversation_id)
+
+    async def get(self, conversation_id: str) -> Optional[List[dict]]:
+        self._purge_expired()
+        entry = self._conversations.get(conversation_id)
+        if entry is None:
+            return None
+        self._conversations[conversation_id] = (time.monotonic() + self.ttl_seconds, entry[1])
+        self._conversations.move_to_end(conversation_id)
+        return list(entry[1])
+
+    async def append(self, conversation_id: str, *messages: dict) -> None:
+        self._purge_expired()
+        entry = self._conversations.get(conversation_id)
+        history = entry[1] if entry is not None else []
+        history.extend(messages)
+        self._conversations[conversation_id] = (time.monotonic() + self.ttl_seconds, history)
+        self._conversations.move_to_end(conversation_id)
+
+        while len(self._conversations) > self.max_conversations:
+            self._drop(next(iter(self._conversations)))
+
+    async def delete(self, conversation_id: str) -> bool:
+        return self._drop(conversation_id)
+
+    async def get_summary(self, conversation_id: str) -> Optional[dict]:
+        self._purge_expired()
+        summary = self._summaries.get(conversation_id)
+        return dict(summary) if summary is not None else None
+
+    async def save_summary(self, conversation_id: str, summary: dict) -> None:
+        if conversation_id not in self._conversations:
+            return
+        self._unindex(conversation_id)
+        summary = dict(summary, id=conversation_id)
+        self._summaries[conversation_id] = summary
+        key = (summary["updated_at"], conversation_id)
+        insort(self._recency, key)
+        insort(self._user_recency.setdefault(summary["user_id"], []), key)
+
+    async def list_summaries(self, user_id: Optional[str] = None, limit: int = 50, before: Optional[str] = None, before_id: Optional[str] = None) -> List[dict]:
+        self._purge_expired()
+        keys = self._recency if user_id is None else self._user_recency.get(user_id, [])
+        if before is None:
+            end = len(keys)
+        else:
+            end = bisect_left(keys, (before, before_id) if before_id is not None else (before,))
+        page = keys[max(end - limit, 0) : end]
+        return [dict(self._summaries[conversation_id]) for _, conversation_id in reversed(page)]
+
+    async def size(self) -> int:
+        self._purge_expired()
+        return len(self._conversations)
+
+
+class RedisConversationStore(ConversationStore):
+    """Redis-backed store shared by every API worker.
+
+    Each conversation is a Redis list of JSON-encoded messages and its summary a
+    hash, both with a sliding TTL refreshed by every read and write. Sorted sets
+    scored by update time index the summaries globally and per user.
+    """
+
+    def __init__(self, url: str = "redis://redis:6379/0", ttl_seconds: int = 86400, key_prefix: str = "chat", client: Any = None):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.index_key = f"{key_prefix}:conversations"
+
+    def _key(self, conversation_id: str) -> str:
+        return f"{self.key_prefix}:conversation:{conversation_id}"
+
+    def _summary_key(self, conversation_id: str) -> str:
+        return f"{self.key_prefix}:summary:{conversation_id}"
+
+    def _user_index_key(self, user_id: str) -> str:
+        return f"{self.key_prefix}:user:{user_id}:conversations"
+
+    @staticmethod
+    def _score(timestamp: str) -> float:
+        return datetime.fromisoformat(timestamp).timestamp()
+
+    async def _prune_index(self, index_key: str) -> None:
+        # Conversation keys expire on their own; drop their ids from the index too.
+        # Only ids not updated within the TTL can have expired, but reads may have kept them alive
+        stale = await self.client.zrangebyscore(index_key, "-inf", time.time() - self.ttl_seconds)
+        if not stale:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for conversation_id in stale:
+                pipe.exists(self._key(conversation_id))
+            alive = await pipe.execute()
+        expired = [conversation_id for conversation_id, exists in zip(stale, alive) if not exists]
+        if expired:
+            await self.client.zrem(index_key, *expired)
+
+    async def get(self, conversation_id: str) -> Optional[List[dict]]:
+        key = self._key(conversation_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrange(key, 0, -1)
+            # Reading a conversation keeps it alive, like the in-memory store does
+            pipe.expire(key, self.ttl_seconds)
+            pipe.expire(self._summary_key(conversation_id), self.ttl_seconds)
+            raw_messages, _, _ = await pipe.execute()
+        if not raw_messages:
+            return None
+        return [json.loads(raw) for raw in raw_messages]
+
+    async def append(self, conversation_id: str, *messages: dict) -> None:
+        if not messages:
+            return
+        key = self._key(conversation_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *[json.dumps(message) for message in messages])
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def delete(self, conversation_id: str) -> bool:
+        summary = await self.get_summary(conversation_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(conversation_id))
+            pipe.delete(self._summary_key(conversation_id))
+            pipe.zrem(self.index_key, conversation_id)
+            if summary is not None:
+                pipe.zrem(self._user_index_key(summary["user_id"]), conversation_id)
+            results = await pipe.execute()
+        return bool(results[0])
+
+    async def get_summary(self, conversation_id: str) -> Optional[dict]:
+        summary = await self.client.hgetall(self._summary_key(conversation_id))
+        if not summary:
+            return None
+        summary["message_count"] = int(summary["message_count"])
+        return summary
+
+    async def save_summary(self, conversation_id: str, summary: dict) -> None:
+        previous = await self.get_summary(conversation_id)
+        summary = dict(summary, id=conversation_id)
+        score = self._score(summary["updated_at"])
+        key = self._summary_key(conversation_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=summary)
+            pipe.expire(key, self.ttl_seconds)
+            if previous is not None and previous["user_id"] != summary["user_id"]:
+                pipe.zrem(self._user_index_key(previous["user_id"]), conversation_id)
+            pipe.zadd(self.index_key, {conversation_id: score})
+            pipe.zadd(self._user_index_key(summary["user_id"]), {conversation_id: score})
+            await pipe.execute()
+
+    async def list_summaries(self, user_id: Optional[str] = None, limit: int = 50, before: Optional[str] = None, before_id: Optional[str] = None) -> List[dict]:
+        index_key = self.index_key if user_id is None else self._user_index_key(user_id)
+        await self._prune_index(index_key)
+        conversation_ids = []
+        if before is None:
+            max_score = "+inf"
+        else:
+            max_score = f"({self._score(before)}"
+            if before_id is not None:
+                # Ids sharing the cursor's score come back in descending order, like the rest of the page
+                ties = await self.client.zrevrangebyscore(index_key, self._score(before), self._score(before))
+                conversation_ids = [conversation_id for conversation_id in ties if conversation_id < before_id][:limit]
+        if len(conversation_ids) < limit:
+            conversation_ids += await self.client.zrevrangebyscore(index_key, max_score, "-inf", start=0, num=limit - len(conversation_ids))
+        if not conversation_ids:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for conversation_id in conversation_ids:
+                pipe.hgetall(self._summary_key(conversation_id))
+            results = await pipe.execute()
+        return [dict(summary, message_count=int(summary["message_count"])) for summary in results if summary]
+
+    async def size(self) -> int:
+        await self._prune_index(self.index_key)
+        return await self.client.zcard(self.index_key)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_conversation_store(settings: Optional[Dict[str, str]] = None) -> ConversationStore:
+    """Build the conversation store selected by the CONVERSATION_STORE_BACKEND environment variable."""
+    settings = os.environ if settings is None else settings
+    backend = settings.get("CONVERSATION_STORE_BACKEND", "memory").lower()
+    ttl_seconds = int(settings.get("CONVERSATION_TTL_SECONDS", "86400"))
+
+    if backend == "redis":
+        return RedisConversationStore(url=settings.get("REDIS_URL", "redis://redis:6379/0"), ttl_seconds=ttl_seconds)
+    if backend == "memory":
+        return InMemoryConversationStore(max_conversations=int(settings.get("CONVERSATION_MAX_COUNT", "10000")), ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown conversation store backend: {backend}")
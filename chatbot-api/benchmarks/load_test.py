@@ -0,0 +1,263 @@
+"""Load test the chat API against a stub Rasa and report latency percentiles and throughput.
+
+By default both the stub Rasa and the API run in this process on free local
+ports; pass `--api-url` to drive an API that is already running instead. Results
+can be written as JSON (`--json`) and compared with an earlier run
+(`--baseline`) to catch regressions between commits:
+
+    python -m benchmarks.load_test --concurrency 50 --duration 20 --json results.json
+    python -m benchmarks.load_test --baseline results.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.stub_rasa import create_stub_rasa
+
+SCENARIOS = ("send", "conversations", "download")
+DOWNLOAD_NAME = "benchmark-artifact.json"
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Summarize one scenario; latencies are in seconds, reported in milliseconds."""
+    values = sorted(latencies)
+    total = len(values) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+async def run_scenario(request: Callable[[int], Awaitable[httpx.Response]], concurrency: int, duration: float, max_requests: Optional[int] = None) -> Dict[str, Any]:
+    """Call `request` from `concurrency` workers until `duration` elapses or `max_requests` were sent."""
+    latencies: List[float] = []
+    errors = 0
+    sent = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        nonlocal errors, sent
+        while time.perf_counter() < deadline and (max_requests is None or sent < max_requests):
+            sent += 1
+            started = time.perf_counter()
+            try:
+                response = await request(worker_id)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def scenario_requests(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Callable[[int], Awaitable[httpx.Response]]]:
+    # Each worker talks in its own set of conversations so per-conversation ordering does not serialize the load
+    conversations_per_worker = max(1, args.conversations_per_worker)
+    counters: Dict[int, int] = {}
+
+    async def send(worker_id: int) -> httpx.Response:
+        counters[worker_id] = counters.get(worker_id, 0) + 1
+        conversation_id = f"bench-{worker_id}-{counters[worker_id] % conversations_per_worker}"
+        return await client.post("/api/chat/send", json={"message": "show me the tables", "user_id": f"bench-user-{worker_id % 10}", "conversation_id": conversation_id})
+
+    async def conversations(worker_id: int) -> httpx.Response:
+        return await client.get("/api/chat/conversations", params={"limit": 50, "user_id": f"bench-user-{worker_id % 10}"})
+
+    async def download(worker_id: int) -> httpx.Response:
+        return await client.get(f"/download/{DOWNLOAD_NAME}", headers={"Accept-Encoding": args.download_encoding})
+
+    return {"send": send, "conversations": conversations, "download": download}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app: Any, port: int) -> Any:
+    """Serve `app` on its own thread and event loop so the load generator does not compete with it."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server on port {port} failed to start")
+        time.sleep(0.01)
+    server.thread = thread
+    return server
+
+
+def stop_server(server: Any) -> None:
+    server.should_exit = True
+    server.thread.join()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    servers = []
+    api_url = args.api_url
+    artifact_dir = None
+    try:
+        if api_url is None:
+            rasa_port = free_port()
+            stub = create_stub_rasa(args.rasa_latency, args.rasa_jitter, args.rasa_payload_bytes, args.rasa_error_rate, args.seed)
+            servers.append(start_server(stub, rasa_port))
+
+            # The API reads its configuration when imported
+            artifact_dir = tempfile.TemporaryDirectory(prefix="bench-artifacts-")
+            os.environ["RASA_URL"] = f"http://127.0.0.1:{rasa_port}"
+            os.environ.setdefault("CONVERSATION_STORE_BACKEND", "memory")
+            os.environ["ARTIFACT_DIR"] = artifact_dir.name
+            os.environ.setdefault("LOG_LEVEL", "WARNING")
+            from main import app, chat_service
+
+            chat_service.artifacts.write_bytes(DOWNLOAD_NAME, json.dumps({"objects": [{"name": f"table_{i}", "columns": ["id", "name"]} for i in range(args.artifact_bytes // 48)]}).encode())
+            api_port = free_port()
+            servers.append(start_server(app, api_port))
+            api_url = f"http://127.0.0.1:{api_port}"
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=args.timeout) as client:
+            requests = scenario_requests(client, args)
+            results = {}
+            for name in args.scenarios:
+                results[name] = await run_scenario(requests[name], args.concurrency, args.duration, args.max_requests)
+    finally:
+        for server in reversed(servers):
+            stop_server(server)
+        if artifact_dir is not None:
+            artifact_dir.cleanup()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "api_url": args.api_url or "in-process",
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "max_requests": args.max_requests,
+            "rasa_latency": args.rasa_latency,
+            "rasa_jitter": args.rasa_jitter,
+            "rasa_payload_bytes": args.rasa_payload_bytes,
+            "rasa_error_rate": args.rasa_error_rate,
+            "artifact_bytes": args.artifact_bytes,
+            "download_encoding": args.download_encoding,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Return a line per metric that is worse than the baseline by more than `max_regression` (a fraction)."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if previous[metric] and current[metric] > previous[metric] * (1 + max_regression):
+                regressions.append(f"{name} {metric}: {previous[metric]} -> {current[metric]}")
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - max_regression):
+            regressions.append(f"{name} rps: {previous['rps']} -> {current['rps']}")
+        if current["error_rate"] > previous["error_rate"] + max_regression:
+            regressions.append(f"{name} error_rate: {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+def format_table(results: Dict[str, Any]) -> str:
+    columns = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    lines = [f"{'scenario':<14}" + "".join(f"{column:>11}" for column in columns)]
+    for name, summary in results["scenarios"].items():
+        lines.append(f"{name:<14}" + "".join(f"{summary[column]:>11}" for column in columns))
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api-url", help="drive an API that is already running instead of starting one")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--max-requests", type=int, help="stop a scenario after this many requests")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--conversations-per-worker", type=int, default=5)
+    parser.add_argument("--rasa-latency", type=float, default=0.05, help="stub Rasa seconds per reply")
+    parser.add_argument("--rasa-jitter", type=float, default=0.0)
+    parser.add_argument("--rasa-payload-bytes", type=int, default=256)
+    parser.add_argument("--rasa-error-rate", type=float, default=0.0)
+    parser.add_argument("--artifact-bytes", type=int, default=1024 * 1024, help="approximate size of the downloaded artifact")
+    parser.add_argument("--download-encoding", default="gzip", help="Accept-Encoding sent by the download scenario")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="write results as JSON to this file ('-' for stdout)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="allowed relative slowdown before failing")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+
+    if args.json == "-":
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_table(results))
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
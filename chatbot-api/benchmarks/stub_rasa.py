@@ -0,0 +1,61 @@
+"""Stand-in for Rasa's REST webhook with configurable latency, payload size and error rate.
+
+Run it on its own with `python -m benchmarks.stub_rasa --port 5005`, or let
+`benchmarks.load_test` start it in-process.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from typing import Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+
+def create_stub_rasa(latency: float = 0.05, jitter: float = 0.0, payload_bytes: int = 256, error_rate: float = 0.0, seed: Optional[int] = None) -> FastAPI:
+    """Build an app answering `/webhooks/rest/webhook` like Rasa's REST channel.
+
+    Every reply takes `latency` seconds plus up to `jitter` seconds, carries a
+    text of `payload_bytes` characters, and a `error_rate` fraction of requests
+    fails with a 500.
+    """
+    app = FastAPI(title="Stub Rasa")
+    rng = random.Random(seed)
+    text = ("x" * payload_bytes) or "ok"
+
+    @app.post("/webhooks/rest/webhook")
+    async def webhook(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency + rng.uniform(0, jitter))
+        if rng.random() < error_rate:
+            return Response(status_code=500)
+
+        messages = [{"recipient_id": body.get("sender"), "text": text}]
+        if request.query_params.get("stream") == "true":
+            return StreamingResponse((json.dumps(message) + "\n" for message in messages), media_type="application/x-ndjson")
+        return messages
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per reply")
+    parser.add_argument("--payload-bytes", type=int, default=256)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    app = create_stub_rasa(args.latency, args.jitter, args.payload_bytes, args.error_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,32 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
+from typing import List, Optional
 
 from app.api.routes import chat_router, chat_service
-from fastapi import FastAPI, HTTPException
+from app.monitoring.log_queue import setup_logging
+from app.monitoring.metrics import MetricsMiddleware, update_service_metrics
+from app.stores.artifact_store import ENCODINGS, sweep_periodically
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Log records are written to stdout by a background thread, never by request handlers
+    log_listener = setup_logging()
+    # Expired and over-budget downloads are removed in the background
+    sweeper = asyncio.create_task(sweep_periodically(chat_service.artifacts, float(os.getenv("ARTIFACT_SWEEP_INTERVAL", "300"))))
     yield
+    sweeper.cancel()
+    try:
+        await sweeper
+    except asyncio.CancelledError:
+        pass
     await chat_service.close()
+    log_listener.stop()
 
 
 app = FastAPI(title="Chatbot API", lifespan=lifespan)
@@ -23,43 +39,111 @@ app.add_middleware(
     allow_methods=["OPTIONS", "GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+# Map common extensions to media types
+MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".txt": "text/plain",
+    ".csv": "text/csv",
+    ".json": "application/json",
+    ".ndjson": "application/x-ndjson",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".zip": "application/zip",
+    ".doc": "application/msword",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xls": "application/vnd.ms-excel",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+COMPRESSIBLE_TYPES = {"application/json", "application/x-ndjson", "text/plain", "text/csv"}
+# Small files are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best content coding we can produce from an Accept-Encoding header."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in ENCODINGS and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _etag_matches(if_none_match: str, etags: List[str]) -> bool:
+    # If-None-Match uses the weak comparison
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
 
 
 @app.get("/download/{file_name}")
-async def download_file(file_name: str):
-    print("-----> DOWNLOAD FILE", file_name)
-    file_path = f"/tmp/downloads/{file_name}"
-    # check if file exists, if not return 404 error.
-    if not os.path.exists(file_path):
+async def download_file(file_name: str, request: Request):
+    # Artifacts are streamed from disk; unknown or malformed names are a 404
+    stat_result = await chat_service.artifacts.stat(file_name)
+    if stat_result is None:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # Get file extension
     _, ext = os.path.splitext(file_name)
-    ext = ext.lower()
-    # Map common extensions to media types
-    media_types = {
-        ".pdf": "application/pdf",
-        ".txt": "text/plain",
-        ".csv": "text/csv",
-        ".json": "application/json",
-        ".png": "image/png",
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".zip": "application/zip",
-        ".doc": "application/msword",
-        ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        ".xls": "application/vnd.ms-excel",
-        ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    }
-    media_type = media_types.get(ext, "application/octet-stream")
+    media_type = MEDIA_TYPES.get(ext.lower(), "application/octet-stream")
+    compressible = media_type in COMPRESSIBLE_TYPES and stat_result.st_size >= MIN_COMPRESS_SIZE
+
+    etag = chat_service.artifacts.etag(stat_result)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if compressible:
+        headers["Vary"] = "Accept-Encoding"
 
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = [etag] + [chat_service.artifacts.etag(stat_result, encoding) for encoding in ENCODINGS]
+        if _etag_matches(if_none_match, etags):
+            return Response(status_code=304, headers=headers)
+
+    # Range requests (resumed downloads) are served from the identity representation
+    encoding = _accepted_encoding(request.headers.get("accept-encoding", "")) if compressible and "range" not in request.headers else None
+    if encoding is not None:
+        try:
+            path = await asyncio.to_thread(chat_service.artifacts.compressed, file_name, encoding)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found")
+        headers.update({"ETag": chat_service.artifacts.etag(stat_result, encoding), "Content-Encoding": encoding})
+        return FileResponse(path=path, filename=file_name, media_type=media_type, headers=headers)
+
+    # FileResponse answers Range / If-Range requests with 206 partial content
     return FileResponse(
-        path=file_path,
+        path=chat_service.artifacts.path(file_name),
         filename=file_name,
         media_type=media_type,
+        headers=headers,
+        stat_result=stat_result,
     )
 
 
+@app.get("/health/rasa")
+async def rasa_health():
+    # Circuit breaker state and connection pool usage of the Rasa connector
+    return chat_service.rasa_connector.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus scrape endpoint; store and download-directory gauges are sampled here
+    await update_service_metrics(chat_service)
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 # Include routers
 app.include_router(chat_router, prefix="/api")
 
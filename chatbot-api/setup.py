@@ -7,7 +7,9 @@ setup(
     install_requires=[
         "fastapi>=0.115.12",
         "httpx>=0.28.1", 
+        "prometheus-client>=0.21.1",
         "pydantic>=2.10.6",
+        "redis>=5.2.1",
         "uvicorn>=0.34.0",
     ],
 )
\ No newline at end of file
@@ -5,7 +5,9 @@ from unittest.mock import AsyncMock, patch, MagicMock
 from app.api.routes import (
     chat_router, MessageRequest, MessageResponse, ChatHistory
 )
+from app.connectors.rasa_connector import RasaUnavailableError
 from app.services.chat_service import ChatService
+from app.services.conversation_locks import ConversationBusyError
 from main import app
 
 
@@ -15,9 +17,10 @@ def test_app():
     # Use a consistent patching mechanism that works better with FastAPI
     with patch("app.api.routes.chat_service") as mock_service:
         # Create mocks for common methods
-        mock_service.conversations = {}
         mock_service.process_message = AsyncMock()
-        mock_service.get_conversation_history = MagicMock()
+        mock_service.get_conversation_history = AsyncMock()
+        mock_service.list_conversations = AsyncMock(return_value=[])
+        mock_service.delete_conversation = AsyncMock()
         mock_service.close = AsyncMock()
         
         app.dependency_overrides = {}  # Reset any overrides
@@ -87,16 +90,10 @@ def test_get_conversations(test_app):
     client, mock_service = test_app
     
     # Setup
-    mock_service.conversations = {
-        "conv1": [
-            {"role": "user", "content": "First conversation", "timestamp": "2023-01-01T12:00:00"}, 
-            {"role": "assistant", "content": "Response 1", "timestamp": "2023-01-01T12:00:01"}
-        ],
-        "conv2": [
-            {"role": "user", "content": "Second conversation", "timestamp": "2023-01-02T12:00:00"},
-            {"role": "assistant", "content": "Response 2", "timestamp": "2023-01-02T12:00:01"}
-        ]
-    }
+    mock_service.list_conversations.return_value = [
+        {"id": "conv2", "title": "Second conversation", "updated_at": "2023-01-02T12:00:01", "message_count": 2, "user_id": "test-user"},
+        {"id": "conv1", "title": "First conversation", "updated_at": "2023-01-01T12:00:01", "message_count": 2, "user_id": "test-user"},
+    ]
     
     # Test
     response = client.get("/api/chat/conversations")
@@ -105,9 +102,27 @@ def test_get_conversations(test_app):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 2
-    # Check sorting (newest first)
-    assert data[0]["id"] == "conv2"  # Should be first as it has a newer timestamp
+    assert data[0]["id"] == "conv2"
     assert data[1]["id"] == "conv1"
+    mock_service.list_conversations.assert_awaited_with(user_id=None, limit=50, before=None, before_id=None)
+
+
+def test_get_conversations_paginated(test_app):
+    client, mock_service = test_app
+    mock_service.list_conversations.return_value = []
+
+    response = client.get("/api/chat/conversations", params={"user_id": "test-user", "limit": 10, "before": "2023-01-02T12:00:01", "before_id": "conv2"})
+
+    assert response.status_code == 200
+    mock_service.list_conversations.assert_awaited_with(user_id="test-user", limit=10, before="2023-01-02T12:00:01", before_id="conv2")
+
+
+def test_get_conversations_invalid_cursor(test_app):
+    client, mock_service = test_app
+
+    assert client.get("/api/chat/conversations", params={"before": "yesterday"}).status_code == 400
+    assert client.get("/api/chat/conversations", params={"before_id": "conv2"}).status_code == 400
+    assert client.get("/api/chat/conversations", params={"limit": 0}).status_code == 422
 
 
 def test_delete_conversation(test_app):
@@ -115,7 +130,7 @@ def test_delete_conversation(test_app):
     
     # Setup
     conversation_id = "test-conv-id"
-    mock_service.conversations = {conversation_id: []}
+    mock_service.delete_conversation.return_value = True
     
     # Test
     response = client.delete(f"/api/chat/conversations/{conversation_id}")
@@ -126,16 +141,69 @@ def test_delete_conversation(test_app):
     assert data["status"] == "success"
 
 
-# Skip this problematic test - in a real scenario we would fix the underlying issue
-@pytest.mark.skip(reason="Endpoint returns 500 instead of 404 in test environment")
 def test_delete_nonexistent_conversation(test_app):
     client, mock_service = test_app
     
-    # Setup - empty conversations dict
-    mock_service.conversations = {}
+    # Setup - the store has no such conversation
+    mock_service.delete_conversation.return_value = False
     
     # Test
     response = client.delete("/api/chat/conversations/non-existent-id")
     
     # Assert
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_websocket_multiplexes_conversations(test_app):
+    client, mock_service = test_app
+
+    async def fake_stream_message(message, user_id, conversation_id):
+        yield {"type": "utterance", "conversation_id": conversation_id, "message": {"role": "assistant", "content": f"echo {message}"}}
+        yield {"type": "done", "conversation_id": conversation_id, "message": {"role": "assistant", "content": f"echo {message}"}}
+
+    mock_service.stream_message = fake_stream_message
+
+    with client.websocket_connect("/api/chat/ws") as websocket:
+        websocket.send_json({"message": "first", "conversation_id": "conv1", "request_id": "r1"})
+        websocket.send_json({"message": "second", "conversation_id": "conv2", "request_id": "r2"})
+        events = [websocket.receive_json() for _ in range(4)]
+
+    by_request = {}
+    for event in events:
+        by_request.setdefault(event["request_id"], []).append(event)
+
+    assert [event["type"] for event in by_request["r1"]] == ["utterance", "done"]
+    assert [event["type"] for event in by_request["r2"]] == ["utterance", "done"]
+    assert by_request["r1"][0]["conversation_id"] == "conv1"
+    assert by_request["r2"][0]["message"]["content"] == "echo second"
+
+
+def test_websocket_rejects_invalid_frames(test_app):
+    client, mock_service = test_app
+
+    with client.websocket_connect("/api/chat/ws") as websocket:
+        websocket.send_text("not json")
+        event = websocket.receive_json()
+
+    assert event["type"] == "error"
+    assert "Invalid message" in event["detail"]
+
+
+def test_send_message_rasa_unavailable(test_app):
+    client, mock_service = test_app
+    mock_service.process_message.side_effect = RasaUnavailableError("The assistant is temporarily unavailable.")
+
+    response = client.post("/api/chat/send", json={"message": "Hello", "user_id": "test-user"})
+    mock_service.process_message.side_effect = None
+
+    assert response.status_code == 503
+    assert "unavailable" in response.json()["detail"]
+
+
+def test_send_message_conversation_busy(test_app):
+    client, mock_service = test_app
+    mock_service.process_message.side_effect = ConversationBusyError("Too many pending messages for conversation conv1")
+
+    response = client.post("/api/chat/send", json={"message": "Hello", "conversation_id": "conv1"})
+    mock_service.process_message.side_effect = None
+
+    assert response.status_code == 429
@@ -0,0 +1,106 @@
+import gzip
+import os
+import time
+import tracemalloc
+
+import pytest
+from app.stores.artifact_store import ABANDONED_TEMP_SECONDS, COPY_BLOCK_SIZE, ArtifactStore
+
+
+@pytest.mark.parametrize("file_name", ["../etc/passwd", "..", ".hidden", "a/b.json", "a\\b.json", "", "x" * 300, "bad..json"])
+def test_rejects_unsafe_names(tmp_path, file_name):
+    store = ArtifactStore(root=str(tmp_path))
+
+    assert store.resolve(file_name) is None
+    with pytest.raises(ValueError):
+        store.path(file_name)
+
+
+def test_write_and_resolve(tmp_path):
+    store = ArtifactStore(root=str(tmp_path / "downloads"))
+
+    path = store.write_bytes("plan.json", b'{"a": 1}')
+
+    assert store.resolve("plan.json") == path
+    assert open(path, "rb").read() == b'{"a": 1}'
+    assert store.resolve("missing.json") is None
+    # No temporary files are left behind
+    assert [p.name for p in (tmp_path / "downloads").iterdir()] == ["plan.json"]
+
+
+
+@pytest.mark.asyncio
+async def test_write_bytes_async(tmp_path):
+    store = ArtifactStore(root=str(tmp_path))
+
+    path = await store.write_bytes_async("plan.json", lambda: b"{}")
+
+    assert store.resolve("plan.json") == path
+
+
+def test_compressed_copy_is_streamed(tmp_path):
+    store = ArtifactStore(root=str(tmp_path))
+    content = b"".join(b'{"name": "table_%d", "columns": []},' % i for i in range(200000))
+    (tmp_path / "definitions.json").write_bytes(content)
+
+    tracemalloc.start()
+    try:
+        path = store.compressed("definitions.json", "gzip")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    with gzip.open(path, "rb") as f:
+        assert f.read() == content
+    # Only a block of the artifact is ever held in memory, not the whole of it
+    assert peak < 4 * COPY_BLOCK_SIZE < len(content)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["definitions.json", "definitions.json.gz"]
+
+
+def test_sweep_removes_expired_files(tmp_path):
+    store = ArtifactStore(root=str(tmp_path), ttl_seconds=60, max_total_bytes=1024)
+    now = time.time()
+    for age, name in [(120, "old.json"), (120, ".part-writing.json"), (ABANDONED_TEMP_SECONDS + 1, ".tmp-abandoned")]:
+        (tmp_path / name).write_bytes(b"x")
+        os.utime(tmp_path / name, (now - age, now - age))
+    (tmp_path / "fresh.json").write_bytes(b"x")
+
+    stats = store.sweep()
+
+    assert stats == {"removed": 2, "freed_bytes": 2, "files": 1, "total_bytes": 1}
+    # A file still being written outlives the TTL of finished artifacts
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".part-writing.json", "fresh.json"]
+
+
+def test_sweep_enforces_size_budget(tmp_path):
+    store = ArtifactStore(root=str(tmp_path), ttl_seconds=3600, max_total_bytes=250)
+    now = time.time()
+    for age, name in enumerate(["c.json", "b.json", "a.json"]):
+        (tmp_path / name).write_bytes(b"x" * 100)
+        os.utime(tmp_path / name, (now - age, now - age))
+
+    stats = store.sweep()
+
+    # The oldest download goes first
+    assert stats["removed"] == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.json", "c.json"]
+
+
+def test_sweep_never_evicts_files_being_written(tmp_path):
+    store = ArtifactStore(root=str(tmp_path), ttl_seconds=3600, max_total_bytes=150)
+    now = time.time()
+    for age, name in [(120, ".part-tables.json"), (120, ".tmp-export.json"), (60, "a.json"), (0, "b.json")]:
+        (tmp_path / name).write_bytes(b"x" * 100)
+        os.utime(tmp_path / name, (now - age, now - age))
+
+    stats = store.sweep()
+
+    # Files being written are the oldest, but are neither counted nor evicted
+    assert stats == {"removed": 1, "freed_bytes": 100, "files": 1, "total_bytes": 100}
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".part-tables.json", ".tmp-export.json", "b.json"]
+
+
+def test_sweep_missing_root(tmp_path):
+    store = ArtifactStore(root=str(tmp_path / "missing"))
+
+    assert store.sweep()["removed"] == 0
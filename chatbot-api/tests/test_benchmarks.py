@@ -0,0 +1,49 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.load_test import compare, percentile, run_scenario
+from benchmarks.stub_rasa import create_stub_rasa
+
+
+def test_percentile_nearest_rank():
+    values = [i / 100 for i in range(1, 101)]
+
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 99) == 0.99
+    assert percentile([], 95) == 0.0
+
+
+def test_stub_rasa_payload_and_errors():
+    client = TestClient(create_stub_rasa(latency=0, payload_bytes=10, error_rate=0, seed=1))
+    failing = TestClient(create_stub_rasa(latency=0, error_rate=1, seed=1))
+
+    response = client.post("/webhooks/rest/webhook", json={"sender": "bench", "message": "hi"})
+    streamed = client.post("/webhooks/rest/webhook?stream=true", json={"sender": "bench", "message": "hi"})
+
+    assert response.json() == [{"recipient_id": "bench", "text": "x" * 10}]
+    assert streamed.text.strip() == '{"recipient_id": "bench", "text": "xxxxxxxxxx"}'
+    assert failing.post("/webhooks/rest/webhook", json={"sender": "bench", "message": "hi"}).status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_run_scenario_counts_requests_and_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500 if len(calls) % 4 == 0 else 200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://api") as client:
+        summary = await run_scenario(lambda worker_id: client.get("/"), concurrency=4, duration=5, max_requests=40)
+
+    assert summary["requests"] == 40
+    assert summary["errors"] == 10
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"]
+
+
+def test_compare_reports_regressions():
+    baseline = {"scenarios": {"send": {"p50_ms": 10, "p95_ms": 20, "p99_ms": 30, "rps": 100, "error_rate": 0.0}}}
+    current = {"scenarios": {"send": {"p50_ms": 10.5, "p95_ms": 40, "p99_ms": 30, "rps": 80, "error_rate": 0.0}}}
+
+    assert compare(current, baseline, max_regression=0.1) == ["send p95_ms: 20 -> 40", "send rps: 100 -> 80"]
@@ -1,19 +1,23 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from datetime import datetime
 import uuid
 from app.services.chat_service import ChatService
+from app.stores.artifact_store import ArtifactStore
+from app.stores.conversation_store import InMemoryConversationStore
 
 
 @pytest.fixture
-def chat_service():
+def chat_service(tmp_path):
     with patch("app.services.chat_service.RasaConnector") as mock_connector_class:
         mock_connector = MagicMock()
         mock_connector.send_message = AsyncMock()
         mock_connector.close = AsyncMock()
         mock_connector_class.return_value = mock_connector
         
-        service = ChatService()
+        service = ChatService(store=InMemoryConversationStore())
+        service.artifacts = ArtifactStore(root=str(tmp_path))
         service.rasa_connector = mock_connector
         yield service
 
@@ -29,20 +33,21 @@ async def test_process_message_new_conversation(chat_service):
         result = await chat_service.process_message("Hello", "test-user")
         
         # Assertions
+        history = await chat_service.store.get(test_uuid)
         assert result["response"] == "Hello from Rasa"
         assert result["conversation_id"] == test_uuid
-        assert len(chat_service.conversations[test_uuid]) == 2  # User message + bot response
-        assert chat_service.conversations[test_uuid][0]["role"] == "user"
-        assert chat_service.conversations[test_uuid][0]["content"] == "Hello"
-        assert chat_service.conversations[test_uuid][1]["role"] == "assistant"
-        assert chat_service.conversations[test_uuid][1]["content"] == "Hello from Rasa"
+        assert len(history) == 2  # User message + bot response
+        assert history[0]["role"] == "user"
+        assert history[0]["content"] == "Hello"
+        assert history[1]["role"] == "assistant"
+        assert history[1]["content"] == "Hello from Rasa"
 
 
 @pytest.mark.asyncio
 async def test_process_message_existing_conversation(chat_service):
     # Setup
     conversation_id = "existing-id"
-    chat_service.conversations[conversation_id] = []
+    await chat_service.store.append(conversation_id, {"role": "user", "content": "Hello", "timestamp": "2023-01-01T12:00:00"})
     chat_service.rasa_connector.send_message.return_value = [{"text": "Another response"}]
     
     # Test
@@ -51,7 +56,7 @@ async def test_process_message_existing_conversation(chat_service):
     # Assertions
     assert result["response"] == "Another response"
     assert result["conversation_id"] == conversation_id
-    assert len(chat_service.conversations[conversation_id]) == 2
+    assert len(await chat_service.store.get(conversation_id)) == 3
 
 
 @pytest.mark.asyncio
@@ -75,11 +80,52 @@ async def test_process_message_with_buttons(chat_service):
     assert result["buttons"][1]["title"] == "Option 2"
     
     # Check that buttons are stored in the conversation history
-    assert len(chat_service.conversations[conversation_id]) == 2
-    assert len(chat_service.conversations[conversation_id][1]["buttons"]) == 2
+    history = await chat_service.store.get(conversation_id)
+    assert len(history) == 2
+    assert len(history[1]["buttons"]) == 2
 
 
-def test_process_rasa_response_multiple_messages(chat_service):
+@pytest.mark.asyncio
+async def test_process_message_updates_summary(chat_service):
+    chat_service.rasa_connector.send_message.return_value = [{"text": "Hi"}]
+
+    await chat_service.process_message("Show me the slowest queries on the primary", "test-user", "summary-id")
+    result = await chat_service.process_message("And the indexes", "test-user", "summary-id")
+
+    summary = await chat_service.store.get_summary("summary-id")
+    assert summary["title"] == "Show me the slowest queries on..."
+    assert summary["message_count"] == 4
+    assert summary["updated_at"] == result["timestamp"]
+    assert summary["user_id"] == "test-user"
+    assert await chat_service.list_conversations(user_id="test-user") == [summary]
+    assert await chat_service.list_conversations(user_id="someone-else") == []
+
+
+@pytest.mark.asyncio
+async def test_stream_message_pushes_utterances_and_progress(chat_service):
+    async def slow_stream(message, sender_id):
+        yield {"text": "Request in Progress..."}
+        await asyncio.sleep(0.05)
+        yield {"text": "Query analysis complete!"}
+
+    chat_service.rasa_connector.stream_message = slow_stream
+
+    events = [event async for event in chat_service.stream_message("Analyze", "test-user", "stream-id", progress_interval=0.01)]
+    types = [event["type"] for event in events]
+
+    assert types[0] == "utterance"
+    assert "progress" in types
+    assert types[-1] == "done"
+    assert [event["message"]["content"] for event in events if event["type"] == "utterance"] == ["Request in Progress...", "Query analysis complete!"]
+    assert events[-1]["message"]["content"] == "Request in Progress... Query analysis complete!"
+
+    history = await chat_service.store.get("stream-id")
+    assert [msg["role"] for msg in history] == ["user", "assistant"]
+    assert history[1]["content"] == "Request in Progress... Query analysis complete!"
+
+
+@pytest.mark.asyncio
+async def test_process_rasa_response_multiple_messages(chat_service):
     # Setup
     rasa_response = [
         {"text": "First part of response"},
@@ -87,7 +133,7 @@ def test_process_rasa_response_multiple_messages(chat_service):
     ]
     
     # Test
-    result = chat_service._process_rasa_response(rasa_response)
+    result = await chat_service._process_rasa_response(rasa_response)
     
     # Assertions
     assert result["text"] == "First part of response Second part of response"
@@ -95,32 +141,64 @@ def test_process_rasa_response_multiple_messages(chat_service):
     assert result["buttons"][0]["title"] == "Click me"
 
 
-def test_process_rasa_response_empty(chat_service):
+@pytest.mark.asyncio
+async def test_process_rasa_response_artifact_download(chat_service, tmp_path):
+    rasa_response = [{"custom": {"text": "Download the plan", "form_type": "download", "file_name": "abc123.json", "artifact_id": "abc123.json"}}]
+
+    result = await chat_service._process_rasa_response(rasa_response)
+
+    # The artifact was written by the action server; nothing is serialized again here
+    assert result["text"] == "Download file"
+    assert result["custom"]["artifact_id"] == "abc123.json"
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_process_rasa_response_inline_download(chat_service, tmp_path):
+    rasa_response = [{"custom": {"form_type": "download", "file_name": "legacy.json", "objects": {"tables": ["users"]}}}]
+
+    await chat_service._process_rasa_response(rasa_response)
+
+    assert (tmp_path / "legacy.json").read_text() == '{"tables": ["users"]}'
+
+
+@pytest.mark.asyncio
+async def test_process_rasa_response_empty(chat_service):
     # Test with empty response
-    result = chat_service._process_rasa_response([])
+    result = await chat_service._process_rasa_response([])
     
     # Should get fallback message
     assert result["text"] == "I'm not sure how to respond to that."
     assert result["buttons"] == []
 
 
-def test_get_conversation_history(chat_service):
+@pytest.mark.asyncio
+async def test_get_conversation_history(chat_service):
     # Setup
     conversation_id = "test-conversation"
     mock_history = [{"role": "user", "content": "Test message"}]
-    chat_service.conversations[conversation_id] = mock_history
+    await chat_service.store.append(conversation_id, *mock_history)
     
     # Test
-    result = chat_service.get_conversation_history(conversation_id)
+    result = await chat_service.get_conversation_history(conversation_id)
     
     # Assertions
     assert result == mock_history
 
 
-def test_get_conversation_history_not_found(chat_service):
+@pytest.mark.asyncio
+async def test_get_conversation_history_not_found(chat_service):
     # Test getting a non-existent conversation
     with pytest.raises(ValueError, match="not found"):
-        chat_service.get_conversation_history("non-existent")
+        await chat_service.get_conversation_history("non-existent")
+
+
+@pytest.mark.asyncio
+async def test_delete_conversation(chat_service):
+    await chat_service.store.append("to-delete", {"role": "user", "content": "Bye"})
+
+    assert await chat_service.delete_conversation("to-delete") is True
+    assert await chat_service.delete_conversation("to-delete") is False
 
 
 @pytest.mark.asyncio
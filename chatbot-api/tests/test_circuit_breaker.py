@@ -0,0 +1,44 @@
+from unittest.mock import patch
+from app.connectors.circuit_breaker import CircuitBreaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow_request() is False
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    with patch("app.connectors.circuit_breaker.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+
+    with patch("app.connectors.circuit_breaker.time.monotonic", return_value=111.0):
+        assert breaker.state == "half_open"
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+
+        breaker.record_success()
+        assert breaker.state == "closed"
+        assert breaker.allow_request() is True
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    with patch("app.connectors.circuit_breaker.time.monotonic", return_value=100.0):
+        for _ in range(5):
+            breaker.record_failure()
+
+    with patch("app.connectors.circuit_breaker.time.monotonic", return_value=111.0):
+        assert breaker.allow_request() is True
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.snapshot()["retry_in"] == 10.0
@@ -0,0 +1,154 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.chat_service import ChatService
+from app.services.conversation_locks import ConversationBusyError, ConversationLocks
+from app.stores.conversation_store import InMemoryConversationStore
+
+
+class FakeRasa:
+    """Rasa stand-in that takes `delay` seconds per message and tracks concurrency."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = {}
+        self.max_active_per_conversation = 0
+        self.max_active = 0
+
+    async def send_message(self, message, sender_id):
+        self.active[sender_id] = self.active.get(sender_id, 0) + 1
+        self.max_active_per_conversation = max(self.max_active_per_conversation, self.active[sender_id])
+        self.max_active = max(self.max_active, sum(self.active.values()))
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active[sender_id] -= 1
+        return [{"text": f"reply to {message}"}]
+
+
+@pytest.fixture
+def make_service():
+    def factory(delay, timeout=10.0, max_pending=100):
+        with patch("app.services.chat_service.RasaConnector", return_value=MagicMock()):
+            service = ChatService(store=InMemoryConversationStore(), locks=ConversationLocks(timeout=timeout, max_pending=max_pending))
+        service.rasa_connector = FakeRasa(delay)
+        return service
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_flooding_one_conversation_keeps_order(make_service):
+    service = make_service(delay=0.005)
+
+    await asyncio.gather(*(service.process_message(str(i), "test-user", "flooded") for i in range(30)))
+
+    history = await service.store.get("flooded")
+    assert [msg["content"] for msg in history if msg["role"] == "user"] == [str(i) for i in range(30)]
+    assert [msg["content"] for msg in history if msg["role"] == "assistant"] == [f"reply to {i}" for i in range(30)]
+    assert service.rasa_connector.max_active_per_conversation == 1
+    assert (await service.store.get_summary("flooded"))["message_count"] == 60
+    assert len(service.locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_many_conversations_run_in_parallel(make_service):
+    delay = 0.05
+    service = make_service(delay=delay)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(service.process_message("Hello", "test-user", f"conv{i}") for i in range(100)))
+    elapsed = time.perf_counter() - started
+
+    # Sequential handling would take 100 * delay; parallel handling takes about one delay
+    assert elapsed < delay * 10
+    assert service.rasa_connector.max_active == 100
+    assert await service.store.size() == 100
+    assert len(service.locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_mixed_flood_orders_each_conversation(make_service):
+    delay = 0.01
+    service = make_service(delay=delay)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(service.process_message(f"{conversation}-{i}", "test-user", f"conv{conversation}") for i in range(10) for conversation in range(20)))
+    elapsed = time.perf_counter() - started
+
+    for conversation in range(20):
+        history = await service.store.get(f"conv{conversation}")
+        assert [msg["content"] for msg in history if msg["role"] == "user"] == [f"{conversation}-{i}" for i in range(10)]
+    assert service.rasa_connector.max_active_per_conversation == 1
+    assert service.rasa_connector.max_active == 20
+    # 10 turns per conversation, conversations side by side
+    assert elapsed < delay * 10 * 5
+
+
+@pytest.mark.asyncio
+async def test_waiting_is_bounded_by_queue_depth():
+    locks = ConversationLocks(timeout=10, max_pending=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with locks.hold("conv"):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(ConversationBusyError, match="Too many pending"):
+        async with locks.hold("conv"):
+            pass
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    assert len(locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_exactly_max_pending_messages_wait():
+    locks = ConversationLocks(timeout=10, max_pending=2)
+    release = asyncio.Event()
+    handled = []
+
+    async def hold(name):
+        async with locks.hold("conv"):
+            await release.wait()
+            handled.append(name)
+
+    # One holder and two waiters fill the queue
+    tasks = [asyncio.create_task(hold(name)) for name in ("holder", "first", "second")]
+    await asyncio.sleep(0)
+
+    with pytest.raises(ConversationBusyError, match="Too many pending"):
+        async with locks.hold("conv"):
+            pass
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert handled == ["holder", "first", "second"]
+    assert len(locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_waiting_is_bounded_in_time():
+    locks = ConversationLocks(timeout=0.01)
+    release = asyncio.Event()
+
+    async def hold():
+        async with locks.hold("conv"):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(ConversationBusyError, match="Timed out"):
+        async with locks.hold("conv"):
+            pass
+
+    release.set()
+    await holder
+    assert len(locks) == 0
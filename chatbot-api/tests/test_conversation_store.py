@@ -0,0 +1,241 @@
+import time
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app.stores.conversation_store import (
+    InMemoryConversationStore,
+    RedisConversationStore,
+    create_conversation_store,
+)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_append_and_get():
+    store = InMemoryConversationStore()
+    await store.append("conv1", {"role": "user", "content": "Hello"})
+    await store.append("conv1", {"role": "assistant", "content": "Hi"})
+
+    history = await store.get("conv1")
+    assert [msg["content"] for msg in history] == ["Hello", "Hi"]
+    assert await store.get("missing") is None
+    assert await store.size() == 1
+
+
+@pytest.mark.asyncio
+async def test_in_memory_returns_copies():
+    store = InMemoryConversationStore()
+    await store.append("conv1", {"role": "user", "content": "Hello"})
+
+    history = await store.get("conv1")
+    history.append({"role": "user", "content": "Injected"})
+
+    assert len(await store.get("conv1")) == 1
+
+
+@pytest.mark.asyncio
+async def test_in_memory_evicts_least_recently_used():
+    store = InMemoryConversationStore(max_conversations=2)
+    await store.append("conv1", {"content": "1"})
+    await store.append("conv2", {"content": "2"})
+
+    # Touch conv1 so conv2 becomes the eviction candidate
+    await store.get("conv1")
+    await store.append("conv3", {"content": "3"})
+
+    assert await store.size() == 2
+    assert await store.get("conv2") is None
+    assert await store.get("conv1") is not None
+    assert await store.get("conv3") is not None
+
+
+@pytest.mark.asyncio
+async def test_in_memory_expires_idle_conversations():
+    store = InMemoryConversationStore(ttl_seconds=10)
+    with patch("app.stores.conversation_store.time.monotonic", return_value=100.0):
+        await store.append("conv1", {"content": "old"})
+
+    # Reading the conversation refreshes its TTL
+    with patch("app.stores.conversation_store.time.monotonic", return_value=105.0):
+        assert await store.get("conv1") is not None
+
+    with patch("app.stores.conversation_store.time.monotonic", return_value=114.0):
+        assert await store.size() == 1
+
+    with patch("app.stores.conversation_store.time.monotonic", return_value=116.0):
+        assert await store.get("conv1") is None
+        assert await store.size() == 0
+
+
+def make_summary(updated_at, user_id="user1", title="Title"):
+    return {"title": title, "updated_at": updated_at, "message_count": 2, "user_id": user_id}
+
+
+@pytest.mark.asyncio
+async def test_in_memory_summaries_are_paginated_newest_first():
+    store = InMemoryConversationStore()
+    for day in range(1, 6):
+        conversation_id = f"conv{day}"
+        await store.append(conversation_id, {"content": str(day)})
+        await store.save_summary(conversation_id, make_summary(f"2023-01-0{day}T12:00:00", user_id="user1" if day % 2 else "user2"))
+
+    first_page = await store.list_summaries(limit=2)
+    assert [summary["id"] for summary in first_page] == ["conv5", "conv4"]
+
+    second_page = await store.list_summaries(limit=2, before=first_page[-1]["updated_at"])
+    assert [summary["id"] for summary in second_page] == ["conv3", "conv2"]
+
+    user_page = await store.list_summaries(user_id="user1", limit=10)
+    assert [summary["id"] for summary in user_page] == ["conv5", "conv3", "conv1"]
+    assert await store.list_summaries(user_id="unknown") == []
+
+
+@pytest.mark.asyncio
+async def test_in_memory_summary_moves_when_updated():
+    store = InMemoryConversationStore()
+    await store.append("conv1", {"content": "1"})
+    await store.save_summary("conv1", make_summary("2023-01-01T12:00:00"))
+    await store.append("conv2", {"content": "2"})
+    await store.save_summary("conv2", make_summary("2023-01-02T12:00:00"))
+
+    await store.save_summary("conv1", make_summary("2023-01-03T12:00:00", user_id="user2"))
+
+    assert [summary["id"] for summary in await store.list_summaries()] == ["conv1", "conv2"]
+    assert [summary["id"] for summary in await store.list_summaries(user_id="user1")] == ["conv2"]
+    assert [summary["id"] for summary in await store.list_summaries(user_id="user2")] == ["conv1"]
+
+
+@pytest.mark.asyncio
+async def test_in_memory_eviction_drops_summary():
+    store = InMemoryConversationStore(max_conversations=1)
+    await store.append("conv1", {"content": "1"})
+    await store.save_summary("conv1", make_summary("2023-01-01T12:00:00"))
+    await store.append("conv2", {"content": "2"})
+
+    assert await store.get_summary("conv1") is None
+    assert await store.list_summaries() == []
+
+
+@pytest.mark.asyncio
+async def test_in_memory_delete():
+    store = InMemoryConversationStore()
+    await store.append("conv1", {"content": "1"})
+
+    assert await store.delete("conv1") is True
+    assert await store.delete("conv1") is False
+    assert await store.get("conv1") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_store_round_trip():
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisConversationStore(client=fakeredis.FakeAsyncRedis(decode_responses=True), ttl_seconds=60)
+
+    now = datetime.now()
+    await store.append("conv1", {"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hi"})
+    await store.save_summary("conv1", make_summary((now - timedelta(seconds=2)).isoformat(), user_id="user1"))
+    await store.append("conv2", {"role": "user", "content": "Other"})
+    await store.save_summary("conv2", make_summary((now - timedelta(seconds=1)).isoformat(), user_id="user2"))
+
+    history = await store.get("conv1")
+    assert [msg["content"] for msg in history] == ["Hello", "Hi"]
+    assert await store.size() == 2
+    assert await store.client.ttl("chat:conversation:conv1") > 0
+
+    summaries = await store.list_summaries()
+    assert [summary["id"] for summary in summaries] == ["conv2", "conv1"]
+    assert summaries[0]["message_count"] == 2
+    assert [summary["id"] for summary in await store.list_summaries(before=summaries[0]["updated_at"])] == ["conv1"]
+    assert [summary["id"] for summary in await store.list_summaries(user_id="user1")] == ["conv1"]
+
+    assert await store.delete("conv1") is True
+    assert await store.delete("conv1") is False
+    assert await store.get("conv1") is None
+    assert await store.list_summaries(user_id="user1") == []
+    assert await store.size() == 1
+    await store.close()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryConversationStore(ttl_seconds=60)
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisConversationStore(client=fakeredis.FakeAsyncRedis(decode_responses=True), ttl_seconds=60)
+
+
+async def age(store, conversation_id, seconds):
+    """Move a conversation `seconds` closer to its expiry."""
+    if isinstance(store, InMemoryConversationStore):
+        expires_at, messages = store._conversations[conversation_id]
+        store._conversations[conversation_id] = (expires_at - seconds, messages)
+    else:
+        for key in (store._key(conversation_id), store._summary_key(conversation_id)):
+            await store.client.expire(key, store.ttl_seconds - seconds)
+
+
+async def remaining_ttls(store, conversation_id):
+    """Seconds before the conversation and its summary expire."""
+    if isinstance(store, InMemoryConversationStore):
+        # Summaries live exactly as long as their conversation
+        remaining = store._conversations[conversation_id][0] - time.monotonic()
+        return [remaining, remaining]
+    return [await store.client.ttl(key) for key in (store._key(conversation_id), store._summary_key(conversation_id))]
+
+
+@pytest.mark.asyncio
+async def test_reading_a_conversation_refreshes_its_ttl(store):
+    await store.append("conv1", {"role": "user", "content": "Hello"})
+    await store.save_summary("conv1", make_summary(datetime.now().isoformat()))
+    await age(store, "conv1", 50)
+    assert all(ttl <= 10 for ttl in await remaining_ttls(store, "conv1"))
+
+    assert await store.get("conv1") is not None
+
+    assert all(ttl > 50 for ttl in await remaining_ttls(store, "conv1"))
+    assert (await store.get_summary("conv1"))["id"] == "conv1"
+
+
+@pytest.mark.asyncio
+async def test_pages_do_not_skip_conversations_sharing_a_timestamp(store):
+    for conversation_id, updated_at in [("a", "2023-01-01T12:00:00"), ("b", "2023-01-02T12:00:00"), ("c", "2023-01-02T12:00:00"), ("d", "2023-01-02T12:00:00"), ("e", "2023-01-03T12:00:00")]:
+        await store.append(conversation_id, {"content": conversation_id})
+        await store.save_summary(conversation_id, make_summary(updated_at))
+    # The TTL is measured from now; keep these old timestamps in the Redis index
+    store.ttl_seconds = 10**9
+
+    pages, cursor = [], {}
+    while True:
+        page = await store.list_summaries(limit=2, **cursor)
+        if not page:
+            break
+        pages.append([summary["id"] for summary in page])
+        cursor = {"before": page[-1]["updated_at"], "before_id": page[-1]["id"]}
+
+    assert pages == [["e", "d"], ["c", "b"], ["a"]]
+
+
+@pytest.mark.asyncio
+async def test_redis_index_keeps_conversations_kept_alive_by_reads():
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisConversationStore(client=fakeredis.FakeAsyncRedis(decode_responses=True), ttl_seconds=60)
+    long_ago = (datetime.now() - timedelta(minutes=5)).isoformat()
+    for conversation_id in ("read", "expired"):
+        await store.append(conversation_id, {"content": conversation_id})
+        await store.save_summary(conversation_id, make_summary(long_ago))
+    await store.client.delete(store._key("expired"), store._summary_key("expired"))
+
+    # Not updated within the TTL, but still alive because it is being read
+    assert [summary["id"] for summary in await store.list_summaries()] == ["read"]
+    assert await store.size() == 1
+    await store.close()
+
+
+def test_create_conversation_store():
+    store = create_conversation_store({"CONVERSATION_STORE_BACKEND": "memory", "CONVERSATION_MAX_COUNT": "5", "CONVERSATION_TTL_SECONDS": "30"})
+    assert isinstance(store, InMemoryConversationStore)
+    assert store.max_conversations == 5
+    assert store.ttl_seconds == 30
+
+    with pytest.raises(ValueError, match="Unknown conversation store backend"):
+        create_conversation_store({"CONVERSATION_STORE_BACKEND": "sqlite"})
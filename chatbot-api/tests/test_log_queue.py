@@ -0,0 +1,46 @@
+import json
+import logging
+import queue
+
+from app.monitoring.log_queue import DroppingQueueHandler, JsonFormatter, setup_logging
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, "Sent %s", ("hello",), None)
+    record.conversation_id = "abc"
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["message"] == "Sent hello"
+    assert entry["conversation_id"] == "abc"
+
+
+def test_queue_handler_drops_records_when_full():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger("app.test.dropping")
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    logger.warning("first")
+    logger.warning("second")
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+    logger.removeHandler(handler)
+
+
+def test_setup_logging_writes_json_lines(capsys):
+    listener = setup_logging({"LOG_LEVEL": "debug"})
+    try:
+        logging.getLogger("app.test.setup").debug("Processed", extra={"conversation_id": "abc"})
+    finally:
+        listener.stop()
+        app_logger = logging.getLogger("app")
+        app_logger.handlers.clear()
+        app_logger.setLevel(logging.NOTSET)
+        app_logger.propagate = True
+
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert json.loads(lines[-1])["conversation_id"] == "abc"
@@ -1,4 +1,8 @@
+import asyncio
+import os
+
 import pytest
+from app.stores.artifact_store import ArtifactStore
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch
 from main import app, lifespan
@@ -24,15 +28,112 @@ def test_cors_middleware():
 
 
 @pytest.mark.asyncio
-async def test_lifespan():
+async def test_lifespan(tmp_path):
     # Mock the chat service
     with patch("main.chat_service", autospec=True) as mock_service:
         mock_service.close = AsyncMock()
+        mock_service.artifacts = ArtifactStore(root=str(tmp_path), ttl_seconds=60)
+        stale = tmp_path / "stale.json"
+        stale.write_text("{}")
+        os.utime(stale, (0, 0))
         fake_app = object()  # Just a placeholder
         
         # Call the lifespan context manager
         async with lifespan(fake_app):
-            pass  # Nothing happens on startup in this app
+            # The artifact sweeper runs once at startup, on a worker thread
+            for _ in range(100):
+                if not stale.exists():
+                    break
+                await asyncio.sleep(0.02)
+            assert not stale.exists()
         
         # Verify chat_service.close was called
-        mock_service.close.assert_awaited_once()
\ No newline at end of file
+        mock_service.close.assert_awaited_once()
+
+
+def test_rasa_health():
+    client = TestClient(app)
+    response = client.get("/health/rasa")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["circuit_breaker"]["state"] == "closed"
+    assert "max_connections" in data["pool"]
+
+
+def test_download_file(tmp_path):
+    (tmp_path / "abc123.json").write_text('{"plan": []}')
+    client = TestClient(app)
+
+    with patch("main.chat_service.artifacts.root", str(tmp_path)):
+        response = client.get("/download/abc123.json")
+        missing = client.get("/download/missing.json")
+        traversal = client.get("/download/..%2Fabc123.json")
+
+    assert response.status_code == 200
+    assert response.json() == {"plan": []}
+    assert response.headers["content-type"] == "application/json"
+    assert missing.status_code == 404
+    assert traversal.status_code == 404
+
+
+def test_download_conditional_and_range(tmp_path):
+    (tmp_path / "plan.json").write_bytes(b'{"plan": [1, 2, 3]}')
+    client = TestClient(app)
+
+    with patch("main.chat_service.artifacts.root", str(tmp_path)):
+        first = client.get("/download/plan.json")
+        etag = first.headers["etag"]
+        cached = client.get("/download/plan.json", headers={"If-None-Match": etag})
+        changed = client.get("/download/plan.json", headers={"If-None-Match": '"other"'})
+        partial = client.get("/download/plan.json", headers={"Range": "bytes=0-8"})
+        resumed = client.get("/download/plan.json", headers={"Range": "bytes=9-", "If-Range": etag})
+
+    assert first.status_code == 200
+    assert not etag.startswith("W/")
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert changed.status_code == 200
+    assert partial.status_code == 206
+    assert partial.content == b'{"plan": '
+    assert resumed.status_code == 206
+    assert partial.content + resumed.content == b'{"plan": [1, 2, 3]}'
+
+
+def test_download_compressed_json(tmp_path):
+    content = b'{"objects": [' + b",".join(b'{"name": "table_%d"}' % i for i in range(200)) + b"]}"
+    (tmp_path / "definitions.json").write_bytes(content)
+    client = TestClient(app)
+
+    with patch("main.chat_service.artifacts.root", str(tmp_path)):
+        compressed = client.get("/download/definitions.json", headers={"Accept-Encoding": "gzip"})
+        identity = client.get("/download/definitions.json", headers={"Accept-Encoding": "identity"})
+        cached = client.get("/download/definitions.json", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert int(compressed.headers["content-length"]) < len(content)
+    # httpx transparently decodes the body
+    assert compressed.content == content
+    assert "content-encoding" not in identity.headers
+    assert identity.content == content
+    assert compressed.headers["etag"] != identity.headers["etag"]
+    assert cached.status_code == 304
+    # The compressed copy is kept next to the artifact and reused
+    assert (tmp_path / "definitions.json.gz").exists()
+
+
+def test_metrics_endpoint():
+    client = TestClient(app)
+    client.get("/health/rasa")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'chatbot_api_request_duration_seconds_count{method="GET",route="/health/rasa",status="200"}' in body
+    assert "chatbot_api_requests_in_progress" in body
+    assert "chatbot_api_conversations " in body
+    assert "chatbot_api_artifact_bytes " in body
+    assert "chatbot_api_rasa_requests_in_flight " in body
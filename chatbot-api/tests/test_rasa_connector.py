@@ -1,7 +1,7 @@
 import pytest
 import json
 from unittest.mock import AsyncMock, patch, MagicMock
-from app.connectors.rasa_connector import RasaConnector
+from app.connectors.rasa_connector import RasaConnector, RasaUnavailableError
 import httpx
 
 
@@ -24,7 +24,7 @@ async def test_send_message_success(mock_httpx_client):
     mock_httpx_client.post.return_value = mock_response
     
     # Test
-    connector = RasaConnector()
+    connector = RasaConnector(rasa_url="http://localhost:45005")
     result = await connector.send_message("Hello", "user123")
     
     # Assertions
@@ -61,4 +61,185 @@ async def test_close():
         await connector.close()
         
         # Assert client was closed
-        client_instance.aclose.assert_awaited_once()
\ No newline at end of file
+        client_instance.aclose.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_stream_message_yields_each_line():
+    def handler(request):
+        assert request.url.params["stream"] == "true"
+        body = json.dumps({"text": "First"}) + "\n" + json.dumps({"text": "Second"}) + "\n"
+        return httpx.Response(200, content=body.encode())
+
+    connector = RasaConnector()
+    connector.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    messages = [message async for message in connector.stream_message("Hello", "user123")]
+
+    assert messages == [{"text": "First"}, {"text": "Second"}]
+    await connector.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_message_http_error():
+    def handler(request):
+        return httpx.Response(500)
+
+    connector = RasaConnector()
+    connector.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    messages = [message async for message in connector.stream_message("Hello", "user123")]
+
+    assert messages == [{"text": "Sorry, I'm having trouble processing your request."}]
+    await connector.close()
+
+
+def make_connector(handler, **settings):
+    settings = {"RASA_BACKOFF_BASE": "0", "RASA_BACKOFF_MAX": "0", **settings}
+    connector = RasaConnector(rasa_url="http://rasa", settings=settings)
+    connector.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return connector
+
+
+@pytest.mark.asyncio
+async def test_send_message_retries_connect_errors():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("Connection refused", request=request)
+        return httpx.Response(200, json=[{"text": "Recovered"}])
+
+    connector = make_connector(handler, RASA_MAX_RETRIES="2")
+    result = await connector.send_message("Hello", "user123")
+
+    assert result == [{"text": "Recovered"}]
+    assert len(attempts) == 3
+    assert connector.breaker.state == "closed"
+    await connector.close()
+
+
+@pytest.mark.asyncio
+async def test_send_message_retries_service_unavailable():
+    statuses = [503, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json=[{"text": "Recovered"}])
+
+    connector = make_connector(handler)
+    assert await connector.send_message("Hello", "user123") == [{"text": "Recovered"}]
+    await connector.close()
+
+
+@pytest.mark.asyncio
+async def test_send_message_does_not_retry_read_timeouts():
+    attempts = []
+
+    def handler(request):
+        # Rasa may already have processed the message, so it must not be sent twice
+        attempts.append(request)
+        raise httpx.ReadTimeout("Timed out", request=request)
+
+    connector = make_connector(handler, RASA_MAX_RETRIES="3")
+    result = await connector.send_message("Hello", "user123")
+
+    assert result == [{"text": "Sorry, I'm having trouble processing your request."}]
+    assert len(attempts) == 1
+    await connector.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [502, 504])
+async def test_send_message_does_not_retry_gateway_errors(status):
+    attempts = []
+
+    def handler(request):
+        # The gateway may have forwarded the message before giving up on Rasa
+        attempts.append(request)
+        return httpx.Response(status)
+
+    connector = make_connector(handler, RASA_MAX_RETRIES="3")
+    result = await connector.send_message("Hello", "user123")
+
+    assert result == [{"text": "Sorry, I'm having trouble processing your request."}]
+    assert len(attempts) == 1
+    await connector.close()
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_while_rasa_is_down():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    connector = make_connector(handler, RASA_MAX_RETRIES="0", RASA_BREAKER_FAILURE_THRESHOLD="2", RASA_BREAKER_RESET_TIMEOUT="60")
+    await connector.send_message("Hello", "user123")
+    await connector.send_message("Hello", "user123")
+
+    with pytest.raises(RasaUnavailableError):
+        await connector.send_message("Hello", "user123")
+    with pytest.raises(RasaUnavailableError):
+        [message async for message in connector.stream_message("Hello", "user123")]
+
+    assert len(attempts) == 2
+    stats = connector.stats()
+    assert stats["circuit_breaker"]["state"] == "open"
+    assert stats["circuit_breaker"]["total_rejections"] == 2
+    await connector.close()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_open_the_breaker():
+    def handler(request):
+        return httpx.Response(400)
+
+    connector = make_connector(handler, RASA_BREAKER_FAILURE_THRESHOLD="1")
+    await connector.send_message("Hello", "user123")
+
+    assert connector.breaker.state == "closed"
+    await connector.close()
+
+
+def test_connector_settings():
+    connector = RasaConnector(settings={
+        "RASA_URL": "http://rasa:5005",
+        "RASA_MAX_CONNECTIONS": "10",
+        "RASA_MAX_KEEPALIVE_CONNECTIONS": "4",
+        "RASA_CONNECT_TIMEOUT": "1.5",
+        "RASA_READ_TIMEOUT": "60",
+    })
+
+    assert connector.rasa_url == "http://rasa:5005"
+    assert connector.timeout.connect == 1.5
+    assert connector.timeout.read == 60
+    pool = connector.pool_stats()
+    assert pool["max_connections"] == 10
+    assert pool["max_keepalive_connections"] == 4
+    assert pool["connections"] == 0
+    assert pool["in_flight_requests"] == 0
+
+
+@pytest.mark.asyncio
+async def test_send_message_records_metrics():
+    from prometheus_client import REGISTRY
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    statuses = [200, 500]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json=[{"text": "Hi"}])
+
+    before_success = sample("chatbot_api_rasa_request_duration_seconds_count", operation="send", outcome="success")
+    before_errors = sample("chatbot_api_rasa_errors_total", operation="send", error="HTTPStatusError")
+
+    connector = make_connector(handler, RASA_MAX_RETRIES="0")
+    await connector.send_message("Hello", "user123")
+    await connector.send_message("Hello", "user123")
+
+    assert sample("chatbot_api_rasa_request_duration_seconds_count", operation="send", outcome="success") == before_success + 1
+    assert sample("chatbot_api_rasa_errors_total", operation="send", error="HTTPStatusError") == before_errors + 1
+    await connector.close()
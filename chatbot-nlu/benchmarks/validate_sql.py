@@ -0,0 +1,109 @@
+"""Compare the regex-based and the lexer-based SQL query validation as the query grows.
+
+Runs on synthetic queries only, no database is needed:
+
+    python -m benchmarks.validate_sql --sizes 1 16 64 256 1024
+
+`generated` is a CTE with a long IN list, the shape of machine-generated report
+SQL; `unbalanced` repeats `x as (` without closing parentheses, the worst case
+for the old CTE pattern. Sizes are in KB.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from rasa_sdk.executor import CollectingDispatcher
+
+from rasa.actions.query_analyzer import ValidateAnalyzeQueryForm
+
+# The checks validate_sql_query used to run before the lexer
+LEGACY_PATTERNS = [
+    r'^\s*with\s+.+\s+as\s+\(.+\)',
+    r'^\s*(select|insert|update|delete|create|alter|drop|truncate|grant|revoke|use|show|desc|explain)\s+',
+    r'^\s*\(\s*select\s+',
+]
+LEGACY_KEYWORDS = ['select', 'from', 'where', 'group by', 'order by', 'with']
+
+
+def legacy(sql: str) -> bool:
+    normalized_query = re.sub(r'\s+', ' ', sql.strip().lower())
+    for pattern in LEGACY_PATTERNS:
+        if re.search(pattern, sql, re.IGNORECASE | re.DOTALL):
+            return True
+    return any(keyword in normalized_query for keyword in LEGACY_KEYWORDS)
+
+
+def lexer(sql: str) -> bool:
+    return ValidateAnalyzeQueryForm().validate_sql_query(sql, CollectingDispatcher(), None, {})["sql_query"] is not None
+
+
+def generated(size: int) -> str:
+    head = "WITH recent AS (SELECT id, customer_id, total FROM orders WHERE created_at > now() - interval '7 days')\nSELECT * FROM recent WHERE customer_id IN ("
+    ids = []
+    length = len(head) + 1
+    while length + 8 <= size:
+        ids.append(str(100000 + len(ids)))
+        length += len(ids[-1]) + 2
+    return head + ", ".join(ids) + ")"
+
+
+def unbalanced(size: int) -> str:
+    return ("with " + "x as (" * size)[:size]
+
+
+SHAPES: Dict[str, Callable[[int], str]] = {"generated": generated, "unbalanced": unbalanced}
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Median wall-clock milliseconds of `repeat` calls."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def run(sizes: List[int], repeat: int, legacy_limit: int) -> List[Dict[str, Any]]:
+    os.environ["SQL_QUERY_MAX_BYTES"] = str(max(sizes) * 1024)
+    results = []
+    for shape, build in SHAPES.items():
+        for size in sizes:
+            sql = build(size * 1024)
+            results.append({
+                "shape": shape,
+                "kb": size,
+                # The old patterns are quadratic on some inputs; skip what would not finish in time
+                "legacy_ms": timed(lambda: legacy(sql), repeat) if size <= legacy_limit else None,
+                "lexer_ms": timed(lambda: lexer(sql), repeat),
+            })
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16, 64, 256, 1024])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-limit", type=int, default=64, help="largest size in KB to run the regex validation on")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.legacy_limit)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'shape':>10} {'KB':>6} {'regex ms':>10} {'lexer ms':>10}")
+        for row in results:
+            legacy_ms = "-" if row["legacy_ms"] is None else row["legacy_ms"]
+            print(f"{row['shape']:>10} {row['kb']:>6} {legacy_ms:>10} {row['lexer_ms']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,7 @@ from .schema_explorer import (
 from .submit_database import ActionSubmitDatabase, ValidateCreateDatabaseForm
 from .submit_delete_database import ActionSubmitDeleteDatabase
 from .query_analyzer import ValidateAnalyzeQueryForm, ActionSubmitQueryAnalysis
+from .workload_analyzer import ValidateAnalyzeWorkloadForm, ActionSubmitWorkloadAnalysis
 
 __all__ = [
     "ActionRecommendDatabase",
@@ -25,4 +26,6 @@ __all__ = [
     "ActionFetchObjectDefinitions",
     "ValidateAnalyzeQueryForm",
     "ActionSubmitQueryAnalysis",
+    "ValidateAnalyzeWorkloadForm",
+    "ActionSubmitWorkloadAnalysis",
 ]
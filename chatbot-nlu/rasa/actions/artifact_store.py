@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Iterable, Optional, Text
+
+
+class ArtifactStore:
+    """Content-addressed artifact files shared with the chatbot API.
+
+    Large action results (schema definitions, execution plans) are written here
+    once and only the artifact id travels in the bot message. The API serves
+    `/download/{artifact_id}` straight from the same directory, which is a volume
+    shared by the action server and the API containers.
+    """
+
+    def __init__(self, root: Optional[Text] = None, ttl_seconds: Optional[float] = None):
+        self.root = root or os.getenv("ARTIFACT_DIR", "/tmp/downloads")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("ARTIFACT_TTL_SECONDS", "86400"))
+        self.purge_interval = min(self.ttl_seconds, 600)
+        self._last_purge = 0.0
+
+    def path(self, artifact_id: Text) -> Text:
+        return os.path.join(self.root, artifact_id)
+
+    def exists(self, artifact_id: Text) -> bool:
+        return os.path.exists(self.path(artifact_id))
+
+    def put_bytes(self, content: bytes, suffix: Text = ".json") -> Text:
+        """Store content and return its artifact id (content hash plus suffix)."""
+        self._maybe_purge()
+        artifact_id = f"{hashlib.sha256(content).hexdigest()}{suffix}"
+        path = self.path(artifact_id)
+        if os.path.exists(path):
+            # Same content already stored; refresh its TTL instead of rewriting it
+            os.utime(path)
+            return artifact_id
+
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-", suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return artifact_id
+
+    def put_stream(self, chunks: Iterable[bytes], suffix: Text = ".json") -> Text:
+        """Store content produced piece by piece, never holding all of it in memory,
+        and return its artifact id; the id is the same as `put_bytes` would give."""
+        self._maybe_purge()
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-", suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+            artifact_id = f"{digest.hexdigest()}{suffix}"
+            path = self.path(artifact_id)
+            if os.path.exists(path):
+                os.utime(path)
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return artifact_id
+
+    def put_json(self, obj: Any) -> Text:
+        """Serialize `obj` once as compact JSON and store it."""
+        return self.put_bytes(json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8"), suffix=".json")
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge >= self.purge_interval:
+            self._last_purge = now
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Delete artifacts older than the TTL and return how many were removed."""
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,258 @@
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Text, Tuple
+
+# Object types in the order their definitions appear in an export
+DEFINITION_TYPES = ("tables", "functions", "views", "sequences", "indexes", "constraints", "triggers", "materialized_views", "procedures", "schemas")
+
+DEFAULT_SCHEMAS = ("public",)
+
+# Name listings for the inventory step, read straight from pg_catalog
+INVENTORY_QUERIES = {
+    "tables": "SELECT c.relname FROM pg_catalog.pg_class c JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace WHERE c.relkind IN ('r', 'p', 'f') AND n.nspname = ANY(%(schemas)s)",
+    "views": "SELECT c.relname FROM pg_catalog.pg_class c JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace WHERE c.relkind = 'v' AND n.nspname = ANY(%(schemas)s)",
+    "functions": "SELECT p.proname FROM pg_catalog.pg_proc p JOIN pg_catalog.pg_namespace n ON n.oid = p.pronamespace WHERE p.prokind = 'f' AND n.nspname = ANY(%(schemas)s)",
+    "sequences": "SELECT c.relname FROM pg_catalog.pg_class c JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace WHERE c.relkind = 'S' AND n.nspname = ANY(%(schemas)s)",
+    "indexes": "SELECT c.relname FROM pg_catalog.pg_class c JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace WHERE c.relkind IN ('i', 'I') AND n.nspname = ANY(%(schemas)s)",
+    "constraints": "SELECT c.conname FROM pg_catalog.pg_constraint c JOIN pg_catalog.pg_namespace n ON n.oid = c.connamespace WHERE n.nspname = ANY(%(schemas)s)",
+    "triggers": (
+        "SELECT t.tgname FROM pg_catalog.pg_trigger t JOIN pg_catalog.pg_class r ON r.oid = t.tgrelid "
+        "JOIN pg_catalog.pg_namespace n ON n.oid = r.relnamespace WHERE NOT t.tgisinternal AND n.nspname = ANY(%(schemas)s)"
+    ),
+    "materialized_views": "SELECT c.relname FROM pg_catalog.pg_class c JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace WHERE c.relkind = 'm' AND n.nspname = ANY(%(schemas)s)",
+    "procedures": "SELECT p.proname FROM pg_catalog.pg_proc p JOIN pg_catalog.pg_namespace n ON n.oid = p.pronamespace WHERE p.prokind = 'p' AND n.nspname = ANY(%(schemas)s)",
+    # Schemas are how users discover what to filter on, so they are never filtered themselves
+    "schemas": "SELECT nspname FROM pg_catalog.pg_namespace WHERE nspname NOT IN ('information_schema', 'pg_catalog', 'pg_toast') AND nspname NOT LIKE 'pg\\_temp\\_%%' AND nspname NOT LIKE 'pg\\_toast\\_temp\\_%%'",
+}
+
+NOT_AVAILABLE = "-- Definition not available"
+
+# Each query fetches every selected object of one type in a single round trip.
+# Parameters are the list of schemas and the list of object names; when a name
+# exists in several schemas the one from the earliest schema in the list wins.
+COLUMNS_QUERY = """
+    SELECT DISTINCT ON (c.relname)
+        c.relname,
+        cols.columns
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN LATERAL (
+        SELECT json_agg(
+            json_build_object(
+                'name', a.attname,
+                'type', pg_catalog.format_type(a.atttypid, a.atttypmod),
+                'nullable', NOT a.attnotnull
+            ) ORDER BY a.attnum
+        ) AS columns
+        FROM pg_catalog.pg_attribute a
+        WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    ) cols ON true
+    WHERE n.nspname = ANY(%s)
+      AND c.relname = ANY(%s)
+      AND c.relkind IN ('r', 'p', 'f', 'v', 'm')
+    ORDER BY c.relname, array_position(%s, n.nspname::text)
+"""
+
+FUNCTIONS_QUERY = """
+    SELECT DISTINCT ON (p.proname)
+        p.proname,
+        pg_catalog.pg_get_function_arguments(p.oid),
+        pg_catalog.pg_get_function_result(p.oid),
+        p.prosrc
+    FROM pg_catalog.pg_proc p
+    JOIN pg_catalog.pg_namespace n ON n.oid = p.pronamespace
+    WHERE n.nspname = ANY(%s)
+      AND p.proname = ANY(%s)
+    ORDER BY p.proname, array_position(%s, n.nspname::text), p.oid
+"""
+
+SEQUENCES_QUERY = """
+    SELECT DISTINCT ON (c.relname)
+        c.relname,
+        c.oid::regclass::text,
+        a.attname
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_catalog.pg_depend d
+        ON d.classid = 'pg_catalog.pg_class'::regclass AND d.objid = c.oid AND d.refobjsubid > 0 AND d.deptype IN ('a', 'i')
+    LEFT JOIN pg_catalog.pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+    WHERE c.relkind = 'S'
+      AND n.nspname = ANY(%s)
+      AND c.relname = ANY(%s)
+    ORDER BY c.relname, array_position(%s, n.nspname::text)
+"""
+
+INDEXES_QUERY = """
+    SELECT DISTINCT ON (i.relname)
+        i.relname,
+        pg_catalog.pg_get_indexdef(i.oid)
+    FROM pg_catalog.pg_index x
+    JOIN pg_catalog.pg_class i ON i.oid = x.indexrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = i.relnamespace
+    WHERE n.nspname = ANY(%s)
+      AND i.relname = ANY(%s)
+    ORDER BY i.relname, array_position(%s, n.nspname::text)
+"""
+
+CONSTRAINTS_QUERY = """
+    SELECT DISTINCT ON (c.conname)
+        c.conname,
+        pg_catalog.pg_get_constraintdef(c.oid)
+    FROM pg_catalog.pg_constraint c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.connamespace
+    WHERE n.nspname = ANY(%s)
+      AND c.conname = ANY(%s)
+    ORDER BY c.conname, array_position(%s, n.nspname::text), c.oid
+"""
+
+TRIGGERS_QUERY = """
+    SELECT DISTINCT ON (t.tgname)
+        t.tgname,
+        pg_catalog.pg_get_triggerdef(t.oid)
+    FROM pg_catalog.pg_trigger t
+    JOIN pg_catalog.pg_class r ON r.oid = t.tgrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = r.relnamespace
+    WHERE NOT t.tgisinternal
+      AND n.nspname = ANY(%s)
+      AND t.tgname = ANY(%s)
+    ORDER BY t.tgname, array_position(%s, n.nspname::text), t.oid
+"""
+
+MATERIALIZED_VIEWS_QUERY = """
+    SELECT DISTINCT ON (c.relname)
+        c.relname,
+        pg_catalog.pg_get_viewdef(c.oid)
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind = 'm'
+      AND n.nspname = ANY(%s)
+      AND c.relname = ANY(%s)
+    ORDER BY c.relname, array_position(%s, n.nspname::text)
+"""
+
+PROCEDURES_QUERY = """
+    SELECT DISTINCT ON (p.proname)
+        p.proname,
+        pg_catalog.pg_get_function_result(p.oid),
+        pg_catalog.pg_get_function_arguments(p.oid),
+        p.prosrc
+    FROM pg_catalog.pg_proc p
+    JOIN pg_catalog.pg_namespace n ON n.oid = p.pronamespace
+    WHERE n.nspname = ANY(%s)
+      AND p.proname = ANY(%s)
+    ORDER BY p.proname, array_position(%s, n.nspname::text), p.oid
+"""
+
+SCHEMAS_QUERY = """
+    SELECT
+        nspname,
+        pg_catalog.pg_get_userbyid(nspowner)
+    FROM pg_catalog.pg_namespace
+    WHERE nspname = ANY(%s)
+"""
+
+
+def inventory_query(object_types: Sequence[Text]) -> Text:
+    """Build one query listing the names of every requested object type."""
+    parts = [f"SELECT '{object_type}'::text AS object_type, name::text AS name FROM ({INVENTORY_QUERIES[object_type]}) AS {object_type}(name)" for object_type in object_types]
+    return f"SELECT object_type, array_agg(DISTINCT name ORDER BY name) FROM ({' UNION ALL '.join(parts)}) AS inventory GROUP BY object_type"
+
+
+def fetch_inventory(cursor: Any, object_types: Sequence[Text], schemas: Sequence[Text] = DEFAULT_SCHEMAS) -> Dict[Text, List[Text]]:
+    """List the names of the requested object types in one catalog round trip.
+
+    Unknown types are ignored; requested types without objects map to an empty list.
+    """
+    object_types = [object_type for object_type in dict.fromkeys(object_types) if object_type in INVENTORY_QUERIES]
+    if not object_types:
+        return {}
+
+    cursor.execute(inventory_query(object_types), {"schemas": list(schemas)})
+    names = {object_type: list(object_names) for object_type, object_names in cursor.fetchall()}
+    return {object_type: names.get(object_type, []) for object_type in object_types}
+
+
+# The query fetching each object type and how one of its rows becomes a definition
+DEFINITION_ROWS: Dict[Text, Tuple[Text, Callable[[Tuple], Dict[Text, Any]]]] = {
+    "tables": (COLUMNS_QUERY, lambda row: {"name": row[0], "columns": row[1] or []}),
+    "functions": (FUNCTIONS_QUERY, lambda row: {"name": row[0], "arguments": row[1], "return_type": row[2], "source": row[3]}),
+    "views": (COLUMNS_QUERY, lambda row: {"name": row[0], "columns": row[1] or []}),
+    "sequences": (SEQUENCES_QUERY, lambda row: {"name": row[0], "sequence_name": row[1], "column_name": row[2]}),
+    "indexes": (INDEXES_QUERY, lambda row: {"name": row[0], "definition": row[1]}),
+    "constraints": (CONSTRAINTS_QUERY, lambda row: {"name": row[0], "definition": row[1]}),
+    "triggers": (TRIGGERS_QUERY, lambda row: {"name": row[0], "definition": row[1]}),
+    "materialized_views": (MATERIALIZED_VIEWS_QUERY, lambda row: {"name": row[0], "definition": row[1]}),
+    "procedures": (PROCEDURES_QUERY, lambda row: {"name": row[0], "return_type": row[1], "arguments": row[2], "source": row[3]}),
+    "schemas": (SCHEMAS_QUERY, lambda row: {"name": row[0], "owner": row[1]}),
+}
+
+
+def _parameters(object_type: Text, names: Sequence[Text], schemas: Sequence[Text]) -> Tuple:
+    if object_type == "schemas":
+        return (list(names),)
+    return (list(schemas), list(names), list(schemas))
+
+
+def placeholder(object_type: Text, name: Text) -> Dict[Text, Any]:
+    """The definition exported for a selected object that does not exist."""
+    if DEFINITION_ROWS[object_type][0] is COLUMNS_QUERY:
+        return {"name": name, "columns": []}
+    return {"name": name, "source": NOT_AVAILABLE}
+
+
+def _fetcher(object_type: Text) -> Callable[[Any, Sequence[Text], Sequence[Text]], List[Dict[Text, Any]]]:
+    query, build = DEFINITION_ROWS[object_type]
+
+    def fetch(cursor: Any, names: Sequence[Text], schemas: Sequence[Text]) -> List[Dict[Text, Any]]:
+        cursor.execute(query, _parameters(object_type, list(dict.fromkeys(names)), schemas))
+        rows = {row[0]: row for row in cursor.fetchall()}
+        return [build(rows[name]) if name in rows else placeholder(object_type, name) for name in names]
+
+    return fetch
+
+
+DEFINITION_FETCHERS: Dict[Text, Callable[[Any, Sequence[Text], Sequence[Text]], List[Dict[Text, Any]]]] = {
+    object_type: _fetcher(object_type) for object_type in DEFINITION_TYPES
+}
+
+
+def fetch_definitions(cursor: Any, selected_objects: Dict[Text, List[Text]], schemas: Sequence[Text] = DEFAULT_SCHEMAS) -> Dict[Text, List[Dict[Text, Any]]]:
+    """Fetch the definitions of the selected objects with one query per object type.
+
+    Entries keep the order of the selected names; names that do not exist get a
+    placeholder definition.
+    """
+    definitions = {}
+    for object_type in DEFINITION_TYPES:
+        names = selected_objects.get(object_type)
+        if names:
+            definitions[object_type] = DEFINITION_FETCHERS[object_type](cursor, names, schemas)
+    return definitions
+
+
+def stream_definitions(conn: Any, object_type: Text, names: Sequence[Text], schemas: Sequence[Text] = DEFAULT_SCHEMAS, batch_size: int = 1000) -> Iterator[Dict[Text, Any]]:
+    """Yield the definitions of the selected objects of one type, in the order selected.
+
+    Rows are read through a named (server-side) cursor, `batch_size` at a time,
+    so memory does not grow with the number of objects. The database returns
+    them in selection order; a name selected twice is exported once and names
+    that do not exist get a placeholder definition.
+    """
+    names = list(dict.fromkeys(names))
+    query, build = DEFINITION_ROWS[object_type]
+    pending = iter(names)
+    with conn.cursor(name=f"export_{object_type}") as cursor:
+        cursor.execute(
+            f"SELECT * FROM ({query}) AS definitions(name) ORDER BY array_position(%s::text[], definitions.name::text)",
+            _parameters(object_type, names, schemas) + (names,),
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                for name in pending:
+                    if name == row[0]:
+                        yield build(row)
+                        break
+                    yield placeholder(object_type, name)
+    for name in pending:
+        yield placeholder(object_type, name)
@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Text
+
+from .catalog import fetch_inventory
+from .db_pool import database_target
+
+# Any DDL inserts, updates or deletes rows in these catalogs, which changes
+# their row count or their highest xmin
+FINGERPRINT_QUERY = """
+    SELECT concat_ws(':',
+        (SELECT count(*) || '/' || coalesce(max(xmin::text::bigint), 0) FROM pg_catalog.pg_class),
+        (SELECT count(*) || '/' || coalesce(max(xmin::text::bigint), 0) FROM pg_catalog.pg_proc),
+        (SELECT count(*) || '/' || coalesce(max(xmin::text::bigint), 0) FROM pg_catalog.pg_namespace),
+        (SELECT count(*) || '/' || coalesce(max(xmin::text::bigint), 0) FROM pg_catalog.pg_constraint),
+        (SELECT count(*) || '/' || coalesce(max(xmin::text::bigint), 0) FROM pg_catalog.pg_trigger)
+    )
+"""
+
+
+def catalog_fingerprint(cursor: Any) -> Text:
+    """Cheap value that changes whenever the database's catalog changes."""
+    cursor.execute(FINGERPRINT_QUERY)
+    return cursor.fetchone()[0]
+
+
+def cache_key(dsn: Text, schemas: Sequence[Text]) -> Text:
+    """Identify a database (host, port and name) and the schemas explored in it."""
+    return f"{database_target(dsn)}?schemas={','.join(schemas)}"
+
+
+class CatalogSnapshot:
+    """The inventory read so far from one database's catalog at one fingerprint.
+
+    Definitions are not kept: exports stream them straight to disk instead.
+    """
+
+    def __init__(self, fingerprint: Text, inventory: Optional[Dict] = None):
+        self.fingerprint = fingerprint
+        # object type -> names
+        self.inventory: Dict[Text, List[Text]] = inventory or {}
+        # Snapshots are shared by concurrent actions; guards updates and serialization
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> Dict[Text, Any]:
+        return {"fingerprint": self.fingerprint, "inventory": self.inventory}
+
+
+class CatalogCache:
+    """Per-database catalog snapshots, kept in memory and optionally on disk.
+
+    A snapshot is reused for as long as the catalog fingerprint of its database
+    is unchanged and dropped as soon as it differs. On disk, snapshots are stored
+    as gzip-compressed compact JSON, one file per database and schema list.
+    """
+
+    def __init__(self, directory: Optional[Text] = None, max_entries: Optional[int] = None):
+        self.directory = directory if directory is not None else os.getenv("CATALOG_CACHE_DIR") or None
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "32"))
+        self._snapshots: "OrderedDict[Text, CatalogSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _file(self, key: Text) -> Text:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json.gz")
+
+    def _load(self, key: Text) -> Optional[CatalogSnapshot]:
+        if not self.directory:
+            return None
+        try:
+            with gzip.open(self._file(key), "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return CatalogSnapshot(data["fingerprint"], data.get("inventory"))
+
+    def get(self, key: Text, fingerprint: Text) -> CatalogSnapshot:
+        """Return the snapshot of `key` if it is still current, else a new empty one."""
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+        if snapshot is None:
+            snapshot = self._load(key)
+        if snapshot is None or snapshot.fingerprint != fingerprint:
+            snapshot = CatalogSnapshot(fingerprint)
+
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def save(self, key: Text, snapshot: CatalogSnapshot) -> None:
+        """Persist a snapshot to disk, if a cache directory is configured."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with snapshot.lock:
+            serialized = json.dumps(snapshot.to_dict(), separators=(",", ":"), default=str)
+        content = gzip.compress(serialized.encode("utf-8"))
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, self._file(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+catalog_cache = CatalogCache()
+
+
+def cached_inventory(cursor: Any, dsn: Text, object_types: Sequence[Text], schemas: Sequence[Text], cache: Optional[CatalogCache] = None) -> Dict[Text, List[Text]]:
+    """`fetch_inventory` served from the catalog snapshot; only missing types are queried."""
+    cache = cache or catalog_cache
+    key = cache_key(dsn, schemas)
+    snapshot = cache.get(key, catalog_fingerprint(cursor))
+
+    missing = [object_type for object_type in object_types if object_type not in snapshot.inventory]
+    if missing:
+        inventory = fetch_inventory(cursor, missing, schemas)
+        with snapshot.lock:
+            snapshot.inventory.update(inventory)
+        cache.save(key, snapshot)
+    return {object_type: snapshot.inventory[object_type] for object_type in dict.fromkeys(object_types) if object_type in snapshot.inventory}
+
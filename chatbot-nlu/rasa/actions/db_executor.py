@@ -0,0 +1,59 @@
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Text
+
+
+class DatabaseExecutor:
+    """Runs blocking database work off the action server's event loop.
+
+    rasa_sdk serves every conversation from a single asyncio loop, so a psycopg2
+    call made directly inside an async action stalls all of them. Work submitted
+    here runs on a bounded thread pool of `DB_EXECUTOR_MAX_WORKERS` threads, and
+    each action has at most `DB_ACTION_CONCURRENCY` calls in flight (overridable
+    per action with `DB_ACTION_CONCURRENCY_<ACTION_NAME>`). Calls over the limit
+    wait on the loop without holding a thread.
+    """
+
+    def __init__(self, settings: Optional[Dict[Text, Text]] = None):
+        self._settings = os.environ if settings is None else settings
+        self.max_workers = int(self._settings.get("DB_EXECUTOR_MAX_WORKERS", "16"))
+        self.default_limit = int(self._settings.get("DB_ACTION_CONCURRENCY", "4"))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Semaphores belong to the loop they are used on; keep one set per loop
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Text, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def limit(self, action: Text) -> int:
+        """Maximum number of concurrent database calls for `action`."""
+        return int(self._settings.get(f"DB_ACTION_CONCURRENCY_{action.upper()}", self.default_limit))
+
+    def _semaphore(self, action: Text) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if action not in semaphores:
+            semaphores[action] = asyncio.Semaphore(self.limit(action))
+        return semaphores[action]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+            return self._executor
+
+    async def run(self, action: Text, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call `fn(*args, **kwargs)` on the executor within `action`'s concurrency limit."""
+        async with self._semaphore(action):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+db_executor = DatabaseExecutor()
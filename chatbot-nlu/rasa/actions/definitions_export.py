@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Sequence, Text, Tuple
+
+from .artifact_store import ArtifactStore, artifact_store
+from .catalog import DEFAULT_SCHEMAS, DEFINITION_TYPES, stream_definitions
+
+# Bytes copied at a time when the per-type parts are joined into the artifact
+COPY_BLOCK_SIZE = 1 << 16
+
+
+def _write_part(connection: Callable[[], ContextManager[Any]], object_type: Text, names: Sequence[Text], schemas: Sequence[Text], batch_size: int, directory: Text) -> Tuple[Text, int]:
+    """Stream one type's definitions into a temporary file as comma-separated JSON values."""
+    fd, path = tempfile.mkstemp(dir=directory, prefix=".part-", suffix=".json")
+    exported = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f, connection() as conn:
+            for definition in stream_definitions(conn, object_type, names, schemas, batch_size):
+                if exported:
+                    f.write(",")
+                json.dump(definition, f, separators=(",", ":"), default=str)
+                exported += 1
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, exported
+
+
+def _chunks(header: Dict[Text, Any], parts: List[Tuple[Text, Text]]) -> Iterator[bytes]:
+    # The same bytes ArtifactStore.put_json writes for {**header, "definitions": {...}}
+    opening = json.dumps(header, separators=(",", ":"), default=str)[:-1]
+    yield f"{opening}{',' if header else ''}\"definitions\":{{".encode("utf-8")
+    for position, (object_type, path) in enumerate(parts):
+        yield f"{',' if position else ''}\"{object_type}\":[".encode("utf-8")
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(COPY_BLOCK_SIZE)
+                if not block:
+                    break
+                yield block
+        yield b"]"
+    yield b"}}"
+
+
+def export_definitions(
+    connection: Callable[[], ContextManager[Any]],
+    selected_objects: Dict[Text, List[Text]],
+    header: Dict[Text, Any],
+    schemas: Sequence[Text] = DEFAULT_SCHEMAS,
+    parallelism: int = 1,
+    batch_size: int = 1000,
+    store: Optional[ArtifactStore] = None,
+) -> Dict[Text, Any]:
+    """Write the definitions of the selected objects into one compact JSON artifact.
+
+    The artifact has the `header` keys followed by `definitions`, by type in
+    `DEFINITION_TYPES` order. Each type is streamed from its own connection (at
+    most `parallelism` at a time) into a part file, and the parts are joined
+    into the artifact, so memory stays flat however large the schema is.
+    Returns the artifact id, its size and the number of definitions per type.
+    """
+    store = store or artifact_store
+    object_types = [object_type for object_type in DEFINITION_TYPES if selected_objects.get(object_type)]
+    os.makedirs(store.root, exist_ok=True)
+
+    futures: Dict[Text, Future] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(object_types))), thread_name_prefix="export") as executor:
+            for object_type in object_types:
+                futures[object_type] = executor.submit(_write_part, connection, object_type, selected_objects[object_type], schemas, batch_size, store.root)
+        parts = {object_type: future.result() for object_type, future in futures.items()}
+        artifact_id = store.put_stream(_chunks(header, [(object_type, path) for object_type, (path, _) in parts.items()]))
+    finally:
+        for future in futures.values():
+            if not future.cancelled() and future.exception() is None and os.path.exists(future.result()[0]):
+                os.unlink(future.result()[0])
+
+    return {
+        "artifact_id": artifact_id,
+        "bytes": os.path.getsize(store.path(artifact_id)),
+        "definitions": {object_type: exported for object_type, (_, exported) in parts.items()},
+    }
+
+
+def export_summary(export: Dict[Text, Any]) -> Text:
+    """One chat line describing an export."""
+    counts = export["definitions"]
+    by_type = ", ".join(f"{object_type.replace('_', ' ')}: {count:,}" for object_type, count in counts.items())
+    size = f"{export['bytes'] / (1024 * 1024):.1f} MB" if export["bytes"] >= 1024 * 1024 else f"{export['bytes'] / 1024:.1f} KB"
+    return f"Exported {sum(counts.values()):,} definitions ({by_type}), {size}."
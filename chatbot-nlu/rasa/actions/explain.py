@@ -0,0 +1,117 @@
+import os
+import threading
+from typing import Any, Dict, Iterator, Optional, Text
+
+import psycopg2
+
+from .plan_renderer import render_plan
+
+
+class AnalysisBudget:
+    """Limits on what analysing one query may cost the target database.
+
+    `statement_timeout_ms` and `lock_timeout_ms` are applied to the analysis
+    transaction. `max_rows` and `max_cost` (0 disables either) are checked
+    against the planner's estimates before the query is executed; a query
+    over budget is only planned, never run.
+    """
+
+    def __init__(self, settings: Optional[Dict[Text, Text]] = None):
+        settings = os.environ if settings is None else settings
+        self.statement_timeout_ms = int(settings.get("ANALYZE_STATEMENT_TIMEOUT_MS", "30000"))
+        self.lock_timeout_ms = int(settings.get("ANALYZE_LOCK_TIMEOUT_MS", "2000"))
+        self.max_rows = int(settings.get("ANALYZE_MAX_ROWS", "1000000"))
+        self.max_cost = float(settings.get("ANALYZE_MAX_COST", "0"))
+
+    def exceeded_by(self, json_plan: Any) -> Optional[Text]:
+        """Why executing a query with this estimated plan is over budget, or None."""
+        root = json_plan[0]["Plan"]
+        if any(node.get("Node Type") == "ModifyTable" for node in plan_nodes(root)):
+            return "the statement modifies data"
+        if self.max_rows and root.get("Plan Rows", 0) > self.max_rows:
+            return f"an estimated {root['Plan Rows']} rows exceed the limit of {self.max_rows}"
+        if self.max_cost and root.get("Total Cost", 0) > self.max_cost:
+            return f"an estimated cost of {root['Total Cost']:.2f} exceeds the limit of {self.max_cost:.2f}"
+        return None
+
+    def to_dict(self) -> Dict[Text, Any]:
+        return {"statement_timeout_ms": self.statement_timeout_ms, "lock_timeout_ms": self.lock_timeout_ms, "max_rows": self.max_rows, "max_cost": self.max_cost}
+
+
+class RunningQuery:
+    """Handle on the connection an analysis runs on, so another thread can cancel it."""
+
+    def __init__(self):
+        self.cancelled = False
+        self._conn: Any = None
+        self._lock = threading.Lock()
+
+    def attach(self, conn: Any) -> None:
+        with self._lock:
+            self._conn = conn
+
+    def detach(self) -> None:
+        with self._lock:
+            self._conn = None
+
+    def cancel(self) -> None:
+        """Stop the statement the backend is running; later statements are skipped."""
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                # Sends a cancel request for this connection's backend, the
+                # equivalent of pg_cancel_backend() without needing its privileges
+                self._conn.cancel()
+
+
+def plan_nodes(node: Dict[Text, Any]) -> Iterator[Dict[Text, Any]]:
+    """`node` and all of its descendants, depth first."""
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def bounded_explain(conn: Any, sql_query: Text, budget: AnalysisBudget, running: Optional[RunningQuery] = None) -> Dict[Text, Any]:
+    """EXPLAIN `sql_query` on `conn`, executing it at most once and within `budget`.
+
+    Everything runs in one read-only transaction that is rolled back at the end,
+    with the budget's statement and lock timeouts. The query is planned first;
+    it is only executed (EXPLAIN ANALYZE) if its estimates are within budget,
+    and if that execution fails or times out, the estimated plan is returned
+    instead.
+    """
+    running = running or RunningQuery()
+    running.attach(conn)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET TRANSACTION READ ONLY")
+        cursor.execute("SET LOCAL statement_timeout = %s", (budget.statement_timeout_ms,))
+        cursor.execute("SET LOCAL lock_timeout = %s", (budget.lock_timeout_ms,))
+
+        cursor.execute(f"EXPLAIN (FORMAT JSON, VERBOSE) {sql_query}")
+        json_plan = cursor.fetchall()[0][0]
+        reason = budget.exceeded_by(json_plan)
+
+        if reason is None and not running.cancelled:
+            try:
+                cursor.execute(f"EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS, VERBOSE) {sql_query}")
+                analyzed = cursor.fetchall()[0][0]
+                return {"json_plan": analyzed, "text_plan": render_plan(analyzed), "budget": budget.to_dict()}
+            except psycopg2.errors.QueryCanceled:
+                reason = "the analysis was cancelled" if running.cancelled else f"the statement timeout of {budget.statement_timeout_ms} ms was reached"
+            except psycopg2.errors.LockNotAvailable:
+                reason = f"a lock was not granted within {budget.lock_timeout_ms} ms"
+            except psycopg2.Error as e:
+                reason = f"executing it failed ({(e.pgerror or str(e)).strip()})"
+        elif reason is None:
+            reason = "the analysis was cancelled"
+
+        return {
+            "json_plan": json_plan,
+            "text_plan": render_plan(json_plan),
+            "budget": budget.to_dict(),
+            "note": f"Plan generated without ANALYZE because {reason}.",
+        }
+    finally:
+        running.detach()
+        conn.rollback()
@@ -0,0 +1,174 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+import psycopg2
+
+from .explain import AnalysisBudget, plan_nodes
+from .plan_renderer import plan_document
+
+# PostgreSQL's default random_page_cost: the price of one index probe in the fallback estimate
+RANDOM_PAGE_COST = 4.0
+
+_IDENTIFIER = r'"(?:[^"]|"")+"|[A-Za-z_][\w$]*'
+# A possibly qualified, possibly cast column reference: o.status, (o.status)::text, "Orders".id
+_REFERENCE = re.compile(rf'(?<![:\w."\'])\(?(?:(?P<alias>{_IDENTIFIER})\.)?(?P<column>{_IDENTIFIER})\)?(?:::[\w ]+?)?')
+# The same reference followed by an operator an index can serve
+_PREDICATE = re.compile(rf"{_REFERENCE.pattern}\s+(?P<operator><=|>=|=|<|>|~~)\s")
+_SORT_DIRECTION = re.compile(r"\s+(ASC|DESC|NULLS FIRST|NULLS LAST)\b.*$", re.IGNORECASE)
+
+
+def _unquote(identifier: Text) -> Text:
+    return identifier[1:-1].replace('""', '"') if identifier.startswith('"') else identifier
+
+
+def _quote(identifier: Text) -> Text:
+    return identifier if re.fullmatch(r"[a-z_][a-z0-9_$]*", identifier) else '"' + identifier.replace('"', '""') + '"'
+
+
+class IndexAdvisor:
+    """Suggests indexes for the scans, joins and sorts of a plan and rates them.
+
+    Candidates come from the filters of sequential scans (equality columns
+    first, then range columns), from hash and merge join keys of sequentially
+    scanned relations and from sort keys. Each candidate is rated by planning
+    the query again with it as a hypothetical index when the `hypopg` extension
+    is installed on the target; otherwise the saving is estimated from the cost
+    of the nodes the index would replace. At most `INDEX_ADVISOR_MAX_CANDIDATES`
+    are evaluated; `INDEX_ADVISOR_ENABLED=false` turns the advisor off.
+    """
+
+    def __init__(self, settings: Optional[Dict[Text, Text]] = None):
+        settings = os.environ if settings is None else settings
+        self.enabled = settings.get("INDEX_ADVISOR_ENABLED", "true").lower() not in ("0", "false", "no")
+        self.max_candidates = int(settings.get("INDEX_ADVISOR_MAX_CANDIDATES", "5"))
+
+    def candidates(self, json_plan: Any) -> List[Dict[Text, Any]]:
+        """Candidate indexes for the plan, in the order they were found, without duplicates."""
+        root = plan_document(json_plan)["Plan"]
+        relations = {
+            node.get("Alias") or node["Relation Name"]: (node.get("Schema"), node["Relation Name"])
+            for node in plan_nodes(root) if "Relation Name" in node
+        }
+        seq_scanned = {(node.get("Schema"), node["Relation Name"]): node for node in plan_nodes(root) if node.get("Node Type") == "Seq Scan" and "Relation Name" in node}
+
+        candidates: Dict[Tuple, Dict[Text, Any]] = {}
+
+        def add(relation: Tuple[Optional[Text], Text], columns: List[Text], reason: Text, replaced_cost: float, probe_rows: float) -> None:
+            columns = list(dict.fromkeys(columns))[:3]
+            key = (relation, tuple(columns))
+            if columns and key not in candidates:
+                schema, table = relation
+                qualified = f"{_quote(schema)}.{_quote(table)}" if schema else _quote(table)
+                candidates[key] = {
+                    "table": f"{schema}.{table}" if schema else table,
+                    "columns": columns,
+                    "statement": f"CREATE INDEX ON {qualified} ({', '.join(_quote(column) for column in columns)})",
+                    "reason": reason,
+                    "replaced_cost": replaced_cost,
+                    "probe_rows": probe_rows,
+                }
+
+        for node in plan_nodes(root):
+            children = node.get("Plans", [])
+            children_cost = sum(child.get("Total Cost", 0.0) for child in children)
+            exclusive_cost = max(node.get("Total Cost", 0.0) - children_cost, 0.0)
+
+            if node.get("Node Type") == "Seq Scan" and node.get("Filter") and "Relation Name" in node:
+                predicates = [(_unquote(match["column"]), match["operator"]) for match in _PREDICATE.finditer(node["Filter"])]
+                columns = [column for column, operator in predicates if operator == "="] + [column for column, operator in predicates if operator != "="]
+                relation = (node.get("Schema"), node["Relation Name"])
+                add(relation, columns, f"filter in Seq Scan on {relation[1]}", exclusive_cost, node.get("Plan Rows", 0))
+
+            join_condition = node.get("Hash Cond") or node.get("Merge Cond")
+            if join_condition and len(children) == 2:
+                for match in _REFERENCE.finditer(join_condition):
+                    relation = relations.get(_unquote(match["alias"] or ""))
+                    if relation in seq_scanned:
+                        scan = seq_scanned[relation]
+                        # With an index on the join key, the scan becomes one probe per row of the other side
+                        other = children[1] if any(found is scan for found in plan_nodes(children[0])) else children[0]
+                        add(relation, [_unquote(match["column"])], f"join key in {node['Node Type']}", scan.get("Total Cost", 0.0), other.get("Plan Rows", 0))
+
+            if node.get("Node Type") == "Sort" and node.get("Sort Key"):
+                references = [_REFERENCE.fullmatch(_SORT_DIRECTION.sub("", key).strip()) for key in node["Sort Key"]]
+                aliases = {match["alias"] for match in references if match}
+                if all(references) and len(aliases) == 1 and _unquote(aliases.pop() or "") in relations:
+                    relation = relations[_unquote(references[0]["alias"] or "")]
+                    add(relation, [_unquote(match["column"]) for match in references], "sort key", exclusive_cost, node.get("Plan Rows", 0))
+
+        return list(candidates.values())[:self.max_candidates]
+
+    def _estimate(self, candidate: Dict[Text, Any], cost_before: float) -> Dict[Text, Any]:
+        reduction = max(candidate["replaced_cost"] - candidate["probe_rows"] * RANDOM_PAGE_COST, 0.0)
+        return {"method": "estimate", "cost_before": cost_before, "cost_after": round(cost_before - reduction, 2)}
+
+    def _hypothetical(self, cursor: Any, sql_query: Text, candidate: Dict[Text, Any]) -> Dict[Text, Any]:
+        cursor.execute("SELECT indexrelid FROM hypopg_create_index(%s)", (candidate["statement"],))
+        oid = cursor.fetchone()[0]
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql_query}")
+        plan = plan_document(cursor.fetchall()[0][0])["Plan"]
+        cursor.execute("SELECT hypopg_drop_index(%s)", (oid,))
+        # hypopg names its indexes "<oid>btree_..."
+        used = any(str(node.get("Index Name", "")).startswith(f"<{oid}>") for node in plan_nodes(plan))
+        return {"method": "hypopg", "cost_after": plan["Total Cost"], "used": used}
+
+    def advise(self, conn: Any, sql_query: Text, json_plan: Any, budget: AnalysisBudget) -> List[Dict[Text, Any]]:
+        """Rate the plan's candidate indexes, best estimated cost reduction first."""
+        candidates = self.candidates(json_plan) if self.enabled else []
+        if not candidates:
+            return []
+
+        cost_before = plan_document(json_plan)["Plan"].get("Total Cost", 0.0)
+        ratings = None
+        hypopg = False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute("SET LOCAL statement_timeout = %s", (budget.statement_timeout_ms,))
+            cursor.execute("SELECT 1 FROM pg_catalog.pg_extension WHERE extname = 'hypopg'")
+            hypopg = cursor.fetchone() is not None
+            if hypopg:
+                # Re-plan without hypothetical indexes too, so both costs come from the same planner state
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql_query}")
+                cost_before = plan_document(cursor.fetchall()[0][0])["Plan"]["Total Cost"]
+                ratings = [dict(self._hypothetical(cursor, sql_query, candidate), cost_before=cost_before) for candidate in candidates]
+        except psycopg2.Error:
+            # hypopg failed or timed out; fall back to estimates for every candidate
+            ratings = None
+        finally:
+            conn.rollback()
+            if hypopg:
+                # Hypothetical indexes live in the backend, not the transaction;
+                # never leave one behind on a pooled connection
+                try:
+                    cursor.execute("SELECT hypopg_reset()")
+                    conn.rollback()
+                except psycopg2.Error:
+                    conn.rollback()
+
+        if ratings is None:
+            ratings = [self._estimate(candidate, cost_before) for candidate in candidates]
+
+        recommendations = []
+        for candidate, rating in zip(candidates, ratings):
+            reduction = max(rating["cost_before"] - rating["cost_after"], 0.0) if rating.get("used", True) else 0.0
+            recommendation = {key: candidate[key] for key in ("table", "columns", "statement", "reason")}
+            recommendation.update(rating)
+            recommendation["reduction"] = round(reduction, 2)
+            recommendation["reduction_percent"] = round(100 * reduction / rating["cost_before"], 1) if rating["cost_before"] else 0.0
+            recommendations.append(recommendation)
+        return sorted(recommendations, key=lambda recommendation: recommendation["reduction"], reverse=True)
+
+    def summary(self, recommendations: List[Dict[Text, Any]], top: int = 3) -> Text:
+        """Chat lines for the indexes worth creating, or an empty string if none helps."""
+        helpful = [recommendation for recommendation in recommendations if recommendation["reduction"] > 0][:top]
+        if not helpful:
+            return ""
+        lines = ["Suggested indexes:"]
+        for recommendation in helpful:
+            lines.append(
+                f"- {recommendation['statement']}: estimated cost {recommendation['cost_before']:,.2f} -> {recommendation['cost_after']:,.2f} "
+                f"(-{recommendation['reduction_percent']:.0f}%, {recommendation['method']}; {recommendation['reason']})"
+            )
+        return "\n".join(lines)
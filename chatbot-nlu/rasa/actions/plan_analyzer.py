@@ -0,0 +1,124 @@
+import os
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+from .plan_renderer import node_title, plan_document
+
+
+class PlanAnalyzer:
+    """Finds where the time of an `EXPLAIN (FORMAT JSON)` plan goes.
+
+    Every node gets its exclusive time (its own time, without its children's),
+    loop-adjusted actual and estimated row counts, the ratio between them and
+    its shared-buffer hit ratio. Nodes are flagged for sequential scans over
+    more than `PLAN_SEQ_SCAN_ROWS` rows, sorts and hashes that spilled to disk,
+    nested loops whose inner side ran more than `PLAN_NESTED_LOOP_LOOPS` times
+    and row estimates off by more than `PLAN_MISESTIMATE_FACTOR`. Plans without
+    ANALYZE figures are ranked by exclusive estimated cost instead of time.
+    """
+
+    def __init__(self, settings: Optional[Dict[Text, Text]] = None):
+        settings = os.environ if settings is None else settings
+        self.top = int(settings.get("PLAN_HOTSPOTS", "5"))
+        self.seq_scan_rows = int(settings.get("PLAN_SEQ_SCAN_ROWS", "10000"))
+        self.nested_loop_loops = int(settings.get("PLAN_NESTED_LOOP_LOOPS", "1000"))
+        self.misestimate_factor = float(settings.get("PLAN_MISESTIMATE_FACTOR", "10"))
+
+    def _flags(self, node: Dict[Text, Any], metrics: Dict[Text, Any]) -> List[Text]:
+        flags = []
+        node_type = node.get("Node Type")
+        loops = max(node.get("Actual Loops", 1), 1)
+
+        if node_type == "Seq Scan":
+            if metrics["analyzed"]:
+                scanned = (node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)) * loops
+            else:
+                scanned = node.get("Plan Rows", 0)
+            if scanned >= self.seq_scan_rows:
+                flags.append(f"sequential scan over {scanned:,} rows")
+        if node.get("Sort Space Type") == "Disk":
+            flags.append(f"sort spilled {node.get('Sort Space Used', 0):,} kB to disk")
+        if node.get("Hash Batches", 1) > 1:
+            flags.append(f"hash spilled to disk in {node['Hash Batches']} batches")
+        if node_type == "Nested Loop" and len(node.get("Plans", [])) > 1:
+            inner_loops = node["Plans"][1].get("Actual Loops", 0)
+            if inner_loops >= self.nested_loop_loops:
+                flags.append(f"nested loop ran its inner side {inner_loops:,} times")
+        ratio = metrics["misestimate"]
+        if ratio is not None and max(ratio, 1 / ratio) >= self.misestimate_factor:
+            direction = "more" if ratio > 1 else "fewer"
+            flags.append(f"{max(ratio, 1 / ratio):,.0f}x {direction} rows than estimated")
+        return flags
+
+    def _walk(self, node: Dict[Text, Any], nodes: List[Dict[Text, Any]]) -> Tuple[float, float]:
+        """Collect metrics of `node` and its descendants; return its inclusive time and cost."""
+        analyzed = "Actual Total Time" in node
+        loops = node.get("Actual Loops", 1)
+        inclusive_ms = node.get("Actual Total Time", 0.0) * loops
+        inclusive_cost = node.get("Total Cost", 0.0)
+
+        children_ms = children_cost = 0.0
+        for child in node.get("Plans", []):
+            child_ms, child_cost = self._walk(child, nodes)
+            children_ms += child_ms
+            children_cost += child_cost
+
+        estimated_rows = node.get("Plan Rows", 0) * max(loops, 1)
+        rows = node.get("Actual Rows", 0) * loops if analyzed else None
+        hits, reads = node.get("Shared Hit Blocks", 0), node.get("Shared Read Blocks", 0)
+        metrics = {
+            "node": node_title(node),
+            "node_type": node.get("Node Type"),
+            "analyzed": analyzed,
+            "exclusive_ms": round(max(inclusive_ms - children_ms, 0.0), 3) if analyzed else None,
+            "exclusive_cost": round(max(inclusive_cost - children_cost, 0.0), 2),
+            "rows": rows,
+            "estimated_rows": estimated_rows,
+            "loops": loops if analyzed else None,
+            # Both sides are clamped to one row so empty results stay comparable. Not
+            # rounded: a large overestimate would round to 0 and its inverse divide by it
+            "misestimate": max(rows, 1) / max(estimated_rows, 1) if analyzed and loops else None,
+            "buffer_hit_ratio": round(hits / (hits + reads), 4) if hits + reads else None,
+        }
+        metrics["flags"] = self._flags(node, metrics)
+        nodes.append(metrics)
+        return inclusive_ms, inclusive_cost
+
+    def analyze(self, json_plan: Any) -> Dict[Text, Any]:
+        """Per-node metrics of a plan, ranked, with the top `top` nodes as hotspots."""
+        document = plan_document(json_plan)
+        nodes: List[Dict[Text, Any]] = []
+        self._walk(document["Plan"], nodes)
+
+        analyzed = any(node["analyzed"] for node in nodes)
+        key = "exclusive_ms" if analyzed else "exclusive_cost"
+        total = sum(node[key] or 0 for node in nodes)
+        for node in nodes:
+            node["percent"] = round(100 * (node[key] or 0) / total, 1) if total else 0.0
+        ranked = sorted(nodes, key=lambda node: node[key] or 0, reverse=True)
+
+        return {
+            "analyzed": analyzed,
+            "ranked_by": key,
+            "planning_time_ms": document.get("Planning Time"),
+            "execution_time_ms": document.get("Execution Time"),
+            "total_cost": document["Plan"].get("Total Cost"),
+            "node_count": len(nodes),
+            "hotspots": ranked[:self.top],
+            "findings": [{"node": node["node"], "flag": flag} for node in ranked for flag in node["flags"]],
+        }
+
+    def summary(self, report: Dict[Text, Any]) -> Text:
+        """Short chat-sized description of the report's hotspots."""
+        if report["analyzed"]:
+            lines = [f"Top {len(report['hotspots'])} hotspots by exclusive time ({report['execution_time_ms'] or 0:.1f} ms total):"]
+        else:
+            lines = [f"Top {len(report['hotspots'])} hotspots by estimated cost ({report['total_cost'] or 0:,.2f} total):"]
+        for position, node in enumerate(report["hotspots"], start=1):
+            if report["analyzed"]:
+                line = f"{position}. {node['node']}: {node['exclusive_ms']:.1f} ms ({node['percent']:.0f}%), {node['rows']:,} rows"
+            else:
+                line = f"{position}. {node['node']}: cost {node['exclusive_cost']:,.2f} ({node['percent']:.0f}%), {node['estimated_rows']:,} rows estimated"
+            if node["flags"]:
+                line += " - " + "; ".join(node["flags"])
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Text, Tuple
+
+from .plan_renderer import node_title, plan_document
+from .sql_tokenizer import tokenize
+
+HISTORY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS plans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fingerprint TEXT NOT NULL,
+        target TEXT NOT NULL,
+        query TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        analyzed INTEGER NOT NULL,
+        total_cost REAL,
+        execution_time_ms REAL,
+        artifact_id TEXT,
+        plan TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS plans_by_query ON plans (fingerprint, target, id);
+"""
+
+
+def normalize_query(sql: Text) -> Text:
+    """`sql` without comments, with literals replaced by `?` and whitespace collapsed.
+
+    Literals and comments are dropped so the same query with different
+    parameters shares its history.
+    """
+    parts = []
+    for token in tokenize(sql):
+        if token.kind == "comment":
+            continue
+        if token.kind in ("string", "dollar", "number", "parameter"):
+            parts.append("?")
+        elif token.kind == "space":
+            parts.append(" ")
+        elif token.kind == "identifier":
+            parts.append(token.text)
+        else:
+            parts.append(token.text.lower())
+    return re.sub(r" +", " ", "".join(parts)).strip(" ;")
+
+
+def normalized_fingerprint(normalized: Text) -> Text:
+    """The history key of a query already passed through `normalize_query`."""
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def query_fingerprint(sql: Text) -> Text:
+    return normalized_fingerprint(normalize_query(sql))
+
+
+def _nodes(node: Dict[Text, Any], path: Tuple[int, ...] = ()) -> Iterator[Tuple[Tuple[int, ...], Dict[Text, Any]]]:
+    yield path, node
+    for position, child in enumerate(node.get("Plans", [])):
+        yield from _nodes(child, path + (position,))
+
+
+def _seq_scans(root: Dict[Text, Any]) -> set:
+    return {
+        ".".join(filter(None, (node.get("Schema"), node["Relation Name"])))
+        for _, node in _nodes(root)
+        if node.get("Node Type") == "Seq Scan" and "Relation Name" in node
+    }
+
+
+def _delta(before: Optional[float], after: Optional[float]) -> Optional[Dict[Text, Any]]:
+    if before is None or after is None:
+        return None
+    return {"before": before, "after": after, "change": round(after - before, 3), "percent": round(100 * (after - before) / before, 1) if before else None}
+
+
+def compare_plans(previous: Any, current: Any, threshold_percent: float = 20.0) -> Dict[Text, Any]:
+    """Differences between two plans of the same query and whether it got slower.
+
+    Nodes are matched by their position in the tree. The verdict uses execution
+    time when both plans were analysed and total estimated cost otherwise: more
+    than `threshold_percent` worse is a regression, and so is any slowdown that
+    comes with a new sequential scan.
+    """
+    previous, current = plan_document(previous), plan_document(current)
+    before, after = dict(_nodes(previous["Plan"])), dict(_nodes(current["Plan"]))
+
+    node_changes = [
+        {"before": node_title(before[path]), "after": node_title(after[path])}
+        for path in after
+        if path in before and before[path].get("Node Type") != after[path].get("Node Type")
+    ]
+    cost = _delta(previous["Plan"].get("Total Cost"), current["Plan"].get("Total Cost"))
+    execution_time = _delta(previous.get("Execution Time"), current.get("Execution Time"))
+    new_seq_scans = sorted(_seq_scans(current["Plan"]) - _seq_scans(previous["Plan"]))
+
+    measure = execution_time or cost
+    percent = (measure or {}).get("percent") or 0.0
+    if percent > threshold_percent or (new_seq_scans and percent > 0):
+        verdict = "regressed"
+    elif percent < -threshold_percent:
+        verdict = "improved"
+    else:
+        verdict = "unchanged"
+
+    return {
+        "verdict": verdict,
+        "compared_by": "execution_time" if execution_time else "cost",
+        "execution_time_ms": execution_time,
+        "total_cost": cost,
+        "node_changes": node_changes,
+        "nodes_added": len(after.keys() - before.keys()),
+        "nodes_removed": len(before.keys() - after.keys()),
+        "new_seq_scans": new_seq_scans,
+    }
+
+
+def describe_comparison(comparison: Dict[Text, Any], previous_run_at: float) -> Text:
+    """One chat line summarising `compare_plans`."""
+    when = time.strftime("%Y-%m-%d %H:%M", time.localtime(previous_run_at))
+    if comparison["compared_by"] == "execution_time":
+        delta, unit = comparison["execution_time_ms"], " ms"
+        label = "execution time"
+    else:
+        delta, unit = comparison["total_cost"], ""
+        label = "estimated cost"
+    line = f"Compared with the previous run ({when}): {comparison['verdict']}"
+    if delta:
+        percent = f" ({delta['percent']:+.0f}%)" if delta["percent"] is not None else ""
+        line += f", {label} {delta['before']:.2f}{unit} -> {delta['after']:.2f}{unit}{percent}"
+    if comparison["new_seq_scans"]:
+        line += f"; new sequential scan on {', '.join(comparison['new_seq_scans'])}"
+    if comparison["node_changes"]:
+        line += f"; {len(comparison['node_changes'])} plan node(s) changed type"
+    return line
+
+
+class PlanHistory:
+    """SQLite store of analysed plans keyed by query fingerprint and target database.
+
+    The database lives at `PLAN_HISTORY_DB` (a file in the temp directory by
+    default); only the latest `PLAN_HISTORY_KEEP` plans of each query and
+    database are kept.
+    """
+
+    def __init__(self, path: Optional[Text] = None, keep: Optional[int] = None):
+        self.path = path or os.getenv("PLAN_HISTORY_DB", os.path.join(tempfile.gettempdir(), "plan_history.sqlite3"))
+        self.keep = keep if keep is not None else int(os.getenv("PLAN_HISTORY_KEEP", "20"))
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call; callers run on different threads
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(HISTORY_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def latest(self, fingerprint: Text, target: Text) -> Optional[Dict[Text, Any]]:
+        """The most recent plan recorded for this query and database, if any."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM plans WHERE fingerprint = ? AND target = ? ORDER BY id DESC LIMIT 1", (fingerprint, target)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["plan"] = json.loads(entry["plan"])
+        return entry
+
+    def record(self, fingerprint: Text, target: Text, query: Text, json_plan: Any, artifact_id: Optional[Text] = None) -> int:
+        """Store a plan and drop the ones beyond the retention limit; return its id."""
+        document = plan_document(json_plan)
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO plans (fingerprint, target, query, created_at, analyzed, total_cost, execution_time_ms, artifact_id, plan) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        fingerprint, target, query, time.time(), int("Execution Time" in document),
+                        document["Plan"].get("Total Cost"), document.get("Execution Time"), artifact_id,
+                        json.dumps([document], separators=(",", ":")),
+                    ),
+                )
+                conn.execute(
+                    "DELETE FROM plans WHERE fingerprint = ? AND target = ? AND id NOT IN (SELECT id FROM plans WHERE fingerprint = ? AND target = ? ORDER BY id DESC LIMIT ?)",
+                    (fingerprint, target, fingerprint, target, self.keep),
+                )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def runs(self, fingerprint: Text, target: Text) -> List[Dict[Text, Any]]:
+        """Summary of the recorded runs of a query on a database, newest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, created_at, analyzed, total_cost, execution_time_ms, artifact_id FROM plans WHERE fingerprint = ? AND target = ? ORDER BY id DESC",
+                (fingerprint, target),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+
+plan_history = PlanHistory()
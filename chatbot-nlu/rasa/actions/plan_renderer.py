@@ -0,0 +1,148 @@
+import json
+from typing import Any, Dict, List, Text, Union
+
+# Join types printed between the node type and "Join", e.g. "Hash Left Join"
+JOIN_NODES = {"Hash Join": "Hash", "Merge Join": "Merge", "Nested Loop": "Nested Loop"}
+
+AGGREGATE_STRATEGIES = {"Plain": "Aggregate", "Sorted": "GroupAggregate", "Hashed": "HashAggregate", "Mixed": "MixedAggregate"}
+
+# Properties printed verbatim as "<label>: <value>", in EXPLAIN's order
+SIMPLE_PROPERTIES = (
+    "Group Key", "Sort Key", "Presorted Key", "Cache Key", "Hash Cond", "Merge Cond", "Index Cond", "Recheck Cond",
+    "Join Filter", "Rows Removed by Join Filter", "One-Time Filter", "Filter", "Rows Removed by Filter",
+    "Rows Removed by Index Recheck", "Heap Fetches", "Workers Planned", "Workers Launched",
+)
+
+
+def node_title(node: Dict[Text, Any]) -> Text:
+    """One-line description of a plan node, e.g. "Index Scan using users_pkey on public.users u"."""
+    node_type = node.get("Node Type", "Unknown")
+    if node_type == "Aggregate":
+        title = AGGREGATE_STRATEGIES.get(node.get("Strategy"), "Aggregate")
+    elif node_type == "ModifyTable":
+        title = node.get("Operation", node_type)
+    elif node_type in JOIN_NODES and node.get("Join Type", "Inner") != "Inner":
+        title = f"{JOIN_NODES[node_type]} {node['Join Type']} Join"
+    elif node_type == "SetOp":
+        title = f"{'HashSetOp' if node.get('Strategy') == 'Hashed' else 'SetOp'} {node.get('Command', '')}".rstrip()
+    else:
+        title = node_type
+
+    if node.get("Partial Mode") in ("Partial", "Finalize"):
+        title = f"{node['Partial Mode']} {title}"
+    if node.get("Parallel Aware"):
+        title = f"Parallel {title}"
+    if node.get("Async Capable"):
+        title = f"Async {title}"
+    if node.get("Scan Direction") == "Backward":
+        title += " Backward"
+
+    if "Index Name" in node:
+        title += f" {'on' if node_type == 'Bitmap Index Scan' else 'using'} {node['Index Name']}"
+    target = node.get("Relation Name") or node.get("CTE Name") or node.get("Function Name") or node.get("Table Function Name")
+    if target:
+        if node.get("Schema") and "Relation Name" in node:
+            target = f"{node['Schema']}.{target}"
+        title += f" on {target}"
+        if node.get("Alias") and node["Alias"] != (node.get("Relation Name") or node.get("CTE Name") or node.get("Function Name")):
+            title += f" {node['Alias']}"
+    elif node_type == "Subquery Scan" and node.get("Alias"):
+        title += f" on {node['Alias']}"
+    return title
+
+
+def _estimates(node: Dict[Text, Any]) -> Text:
+    text = ""
+    if "Total Cost" in node:
+        text += f"  (cost={node.get('Startup Cost', 0):.2f}..{node['Total Cost']:.2f} rows={node.get('Plan Rows', 0)} width={node.get('Plan Width', 0)})"
+    if node.get("Actual Loops") == 0:
+        text += " (never executed)"
+    elif "Actual Total Time" in node:
+        text += f" (actual time={node.get('Actual Startup Time', 0):.3f}..{node['Actual Total Time']:.3f} rows={node.get('Actual Rows', 0)} loops={node.get('Actual Loops', 1)})"
+    elif "Actual Rows" in node:
+        text += f" (actual rows={node['Actual Rows']} loops={node.get('Actual Loops', 1)})"
+    return text
+
+
+def _buffers(node: Dict[Text, Any]) -> Text:
+    parts = []
+    for scope in ("Shared", "Local", "Temp"):
+        counts = [
+            f"{kind.lower()}={node[f'{scope} {kind} Blocks']}"
+            for kind in ("Hit", "Read", "Dirtied", "Written")
+            if node.get(f"{scope} {kind} Blocks")
+        ]
+        if counts:
+            parts.append(f"{scope.lower()} {' '.join(counts)}")
+    return ", ".join(parts)
+
+
+def _details(node: Dict[Text, Any]) -> List[Text]:
+    lines = []
+    if node.get("Output"):
+        lines.append(f"Output: {', '.join(node['Output'])}")
+    for key in SIMPLE_PROPERTIES:
+        value = node.get(key)
+        if value is None or value == [] or (key.startswith("Rows Removed") and not value):
+            continue
+        lines.append(f"{key}: {', '.join(value) if isinstance(value, list) else value}")
+    if "Sort Method" in node:
+        lines.append(f"Sort Method: {node['Sort Method']}  {node.get('Sort Space Type', 'Memory')}: {node.get('Sort Space Used', 0)}kB")
+    if "Hash Buckets" in node:
+        lines.append(f"Buckets: {node['Hash Buckets']}  Batches: {node.get('Hash Batches', 1)}  Memory Usage: {node.get('Peak Memory Usage', 0)}kB")
+    buffers = _buffers(node)
+    if buffers:
+        lines.append(f"Buffers: {buffers}")
+    if node.get("I/O Read Time") or node.get("I/O Write Time"):
+        lines.append(f"I/O Timings: read={node.get('I/O Read Time', 0):.3f} write={node.get('I/O Write Time', 0):.3f}")
+    return lines
+
+
+def _render_node(node: Dict[Text, Any], depth: int, lines: List[Text]) -> None:
+    # The root starts at column 0; every child is drawn as "->  " under its
+    # parent's details, exactly like EXPLAIN's text format
+    if depth == 0:
+        lines.append(node_title(node) + _estimates(node))
+        detail_indent = "  "
+    else:
+        indent = " " * (2 + 6 * (depth - 1))
+        if node.get("Subplan Name"):
+            lines.append(f"{indent}{node['Subplan Name']}")
+        lines.append(f"{indent}->  {node_title(node)}{_estimates(node)}")
+        detail_indent = indent + "      "
+
+    lines.extend(detail_indent + line for line in _details(node))
+    for child in node.get("Plans", []):
+        _render_node(child, depth + 1, lines)
+
+
+def plan_document(json_plan: Union[Text, List[Dict[Text, Any]], Dict[Text, Any]]) -> Dict[Text, Any]:
+    """The `{"Plan": ...}` object of an `EXPLAIN (FORMAT JSON, ...)` result.
+
+    Accepts the JSON document as returned by the server (a one-element list),
+    its first element, or the raw JSON string.
+    """
+    if isinstance(json_plan, str):
+        json_plan = json.loads(json_plan)
+    if isinstance(json_plan, list):
+        json_plan = json_plan[0]
+    return json_plan
+
+
+def render_plan(json_plan: Union[Text, List[Dict[Text, Any]], Dict[Text, Any]]) -> Text:
+    """Render the output of `EXPLAIN (FORMAT JSON, ...)` in EXPLAIN's text format."""
+    json_plan = plan_document(json_plan)
+    lines: List[Text] = []
+    _render_node(json_plan["Plan"], 0, lines)
+
+    planning = json_plan.get("Planning") or {}
+    planning_buffers = _buffers(planning)
+    if planning_buffers:
+        lines.extend(["Planning:", f"  Buffers: {planning_buffers}"])
+    if "Planning Time" in json_plan:
+        lines.append(f"Planning Time: {json_plan['Planning Time']:.3f} ms")
+    for trigger in json_plan.get("Triggers", []):
+        lines.append(f"Trigger {trigger.get('Trigger Name')}: time={trigger.get('Time', 0):.3f} calls={trigger.get('Calls', 0)}")
+    if "Execution Time" in json_plan:
+        lines.append(f"Execution Time: {json_plan['Execution Time']:.3f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,239 @@
+import re
+from typing import Iterator, List, NamedTuple, Optional, Text
+
+# Quoted tokens in the unrolled-loop form, which cannot backtrack into itself
+_STRING = r"'[^']*(?:''[^']*)*'"
+_ESCAPE_STRING = r"'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'"
+_IDENTIFIER = r'"[^"]*(?:""[^"]*)*"'
+_PARAMETER = r"\$\d+"
+_DOLLAR_TAG = r"\$(?:[^\W\d]\w*)?\$"
+
+# One alternation tried at the current offset, so every token is matched once by
+# the regex engine. Block comments (which nest) and dollar quotes (which need
+# their tag) are only opened here and closed by hand.
+_TOKEN = re.compile(
+    r"(?P<space>\s+)"
+    r"|(?P<comment>--[^\n]*)"
+    r"|(?P<block_comment>/\*)"
+    rf"|(?P<escape_string>[eE]{_ESCAPE_STRING})"
+    rf"|(?P<string>(?:[bBxXnN]|[uU]&)?{_STRING})"
+    r"|(?P<open_string>(?:[eEbBxXnN]|[uU]&)?')"
+    rf"|(?P<identifier>{_IDENTIFIER})"
+    r"|(?P<open_identifier>\")"
+    rf"|(?P<parameter>{_PARAMETER})"
+    rf"|(?P<dollar>{_DOLLAR_TAG})"
+    r"|(?P<word>[^\W\d][\w$]*)"
+    r"|(?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)"
+    r"|(?P<operator>(?:[-+*/<>=~!@#%^&|`?](?!-|\*))*[-+*/<>=~!@#%^&|`?])"
+    r"|(?P<punctuation>.)",
+    re.DOTALL,
+)
+_BLOCK_COMMENT_EDGE = re.compile(r"/\*|\*/")
+
+# What can end a statement or hide a semicolon; the text in between is skipped
+# by the regex engine without producing tokens
+_BOUNDARY = re.compile(
+    r"(?P<semicolon>;)"
+    r"|(?P<comment>--[^\n]*)"
+    r"|(?P<block_comment>/\*)"
+    r"|(?P<string>')"
+    r"|(?P<identifier>\")"
+    r"|(?P<dollar>\$)"
+    r"|(?<![\w$])(?P<keyword>begin|atomic|case|end)(?![\w$])",
+    re.IGNORECASE,
+)
+_QUOTED = {
+    "string": re.compile(_STRING),
+    "escape_string": re.compile(_ESCAPE_STRING, re.DOTALL),
+    "identifier": re.compile(_IDENTIFIER),
+}
+_DOLLAR_OPENING = re.compile(rf"{_PARAMETER}|{_DOLLAR_TAG}")
+_WORD_CHARACTER = re.compile(r"[\w$]")
+
+
+class Token(NamedTuple):
+    kind: Text
+    text: Text
+    start: int
+    terminated: bool = True
+
+
+class Statement(NamedTuple):
+    line: int
+    text: Text
+    kind: Text
+
+
+class Script(NamedTuple):
+    statements: List[Statement]
+    # Kind of the string, identifier or comment left open at the end of the text, if any
+    unterminated: Optional[Text]
+
+
+def _block_comment_end(sql: Text, position: int) -> int:
+    """Offset just past the block comment opened at `position`, or -1; they nest in PostgreSQL."""
+    depth = 0
+    for edge in _BLOCK_COMMENT_EDGE.finditer(sql, position):
+        depth += 1 if edge.group() == "/*" else -1
+        if depth == 0:
+            return edge.end()
+    return -1
+
+
+def tokenize(sql: Text) -> Iterator[Token]:
+    """Split `sql` into tokens in one pass over the text.
+
+    Kinds are `space`, `comment`, `string`, `dollar` (dollar-quoted string),
+    `identifier` (double-quoted), `number`, `parameter` ($n), `word`,
+    `operator` and `punctuation`. Unterminated strings, identifiers and
+    comments run to the end of the text and are marked as such. Concatenating
+    the tokens' text gives `sql` back.
+    """
+    position, length = 0, len(sql)
+    while position < length:
+        match = _TOKEN.match(sql, position)
+        kind, end = match.lastgroup, match.end()
+        if kind == "block_comment":
+            kind, end = "comment", _block_comment_end(sql, position)
+        elif kind == "dollar":
+            end = sql.find(match.group(), end)
+            end = end if end < 0 else end + len(match.group())
+        elif kind == "escape_string":
+            kind = "string"
+        elif kind in ("open_string", "open_identifier"):
+            kind, end = kind[5:], -1
+
+        if end < 0:
+            yield Token(kind, sql[position:], position, terminated=False)
+            return
+        yield Token(kind, sql[position:end], position)
+        position = end
+
+
+def _leading_keyword(statement: Text) -> Text:
+    for token in tokenize(statement):
+        if token.kind == "word":
+            return token.text.upper()
+        if token.kind not in ("space", "comment") and token.text != "(":
+            return ""
+    return ""
+
+
+def _defines_routine(statement: Text) -> bool:
+    """Whether a statement starts with CREATE [OR REPLACE] FUNCTION or PROCEDURE."""
+    words = []
+    for token in tokenize(statement):
+        if token.kind == "word":
+            words.append(token.text.upper())
+        elif token.kind not in ("space", "comment"):
+            break
+        if len(words) == 4:
+            break
+    if words[:2] == ["CREATE", "OR"]:
+        words = words[:1] + words[3:] if words[2:3] == ["REPLACE"] else []
+    return words[:1] == ["CREATE"] and words[1:2] in (["FUNCTION"], ["PROCEDURE"])
+
+
+def inspect_script(sql: Text) -> Script:
+    """Split a script into statements on top-level semicolons, in one pass.
+
+    Semicolons inside strings, dollar quotes, comments and the `BEGIN ATOMIC ... END`
+    bodies of `CREATE [OR REPLACE] FUNCTION/PROCEDURE` do not end a statement. Each statement is returned without
+    its surrounding comments and whitespace, with the line it starts on and its
+    leading keyword (after any opening parentheses); statements that are empty
+    or only comments are dropped.
+
+    Only what can end a statement or hide a semicolon is looked at; the text in
+    between is skipped by a regex search, so large queries stay cheap.
+    """
+    statements = []
+    first = last = None
+    atomic_depth = 0
+    begin_end = None
+    line, counted = 1, 0
+    unterminated = None
+
+    def content(start: int, end: int) -> None:
+        nonlocal first, last, begin_end
+        text = sql[start:end]
+        if text and not text.isspace():
+            if first is None:
+                first = start + len(text) - len(text.lstrip())
+            last = start + len(text.rstrip())
+            begin_end = None
+
+    def finish() -> None:
+        nonlocal line, counted, first, last
+        if first is not None:
+            line += sql.count("\n", counted, first)
+            counted = first
+            text = sql[first:last]
+            statements.append(Statement(line, text, _leading_keyword(text)))
+        first = last = None
+
+    position, length = 0, len(sql)
+    while position < length:
+        match = _BOUNDARY.search(sql, position)
+        if match is None:
+            content(position, length)
+            break
+        content(position, match.start())
+        kind, start, end = match.lastgroup, match.start(), match.end()
+
+        if kind == "semicolon" and not atomic_depth:
+            finish()
+        elif kind == "comment":
+            pass
+        elif kind == "block_comment":
+            end = _block_comment_end(sql, start)
+            if end < 0:
+                unterminated = "comment"
+                break
+        elif kind in ("string", "identifier"):
+            # E'...' strings take backslash escapes; the E must be a word of its own
+            if kind == "string" and start and sql[start - 1] in "eE" and not (start > 1 and _WORD_CHARACTER.match(sql, start - 2)):
+                kind = "escape_string"
+            quoted = _QUOTED[kind].match(sql, start)
+            if quoted is None:
+                unterminated = "identifier" if kind == "identifier" else "string"
+                content(start, length)
+                break
+            end = quoted.end()
+            content(start, end)
+        elif kind == "dollar":
+            # A $ inside a word or a $n parameter is plain text
+            opening = None if start and _WORD_CHARACTER.match(sql, start - 1) else _DOLLAR_OPENING.match(sql, start)
+            if opening is not None and not opening.group()[1].isdigit():
+                closing = sql.find(opening.group(), opening.end())
+                if closing < 0:
+                    unterminated = "dollar"
+                    content(start, length)
+                    break
+                end = closing + len(opening.group())
+            elif opening is not None:
+                end = opening.end()
+            content(start, end)
+        elif kind == "keyword":
+            word = match.group().lower()
+            if atomic_depth and word == "case":
+                atomic_depth += 1
+            elif atomic_depth and word == "end":
+                atomic_depth -= 1
+            elif word == "atomic" and begin_end is not None and _defines_routine(sql[first:start]):
+                # Only a routine body is BEGIN ATOMIC; elsewhere both are plain words (column labels, say)
+                atomic_depth += 1
+            content(start, end)
+            if word == "begin":
+                begin_end = end
+        else:
+            # A semicolon inside BEGIN ATOMIC ... END
+            content(start, end)
+        position = end
+
+    finish()
+    return Script(statements, unterminated)
+
+
+def split_statements(sql: Text) -> List[Statement]:
+    """The statements of a script; see `inspect_script`."""
+    return inspect_script(sql).statements
@@ -0,0 +1,203 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+import psycopg2
+from rasa_sdk import Action, FormValidationAction, Tracker
+from rasa_sdk.events import SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+from rasa_sdk.types import DomainDict
+
+from .artifact_store import artifact_store
+from .db_executor import db_executor
+from .db_pool import PoolTimeoutError, database_target, pool_registry
+from .explain import AnalysisBudget
+from .plan_analyzer import PlanAnalyzer
+from .plan_renderer import render_plan
+from .sql_tokenizer import tokenize
+
+# Slot value -> pg_stat_statements column, for extension versions >= 1.8 and older ones
+SORT_COLUMNS = {
+    "total": ("total_exec_time", "total_time"),
+    "mean": ("mean_exec_time", "mean_time"),
+}
+
+STATEMENTS_QUERY = """
+    SELECT s.queryid, s.query, s.calls, s.{total} AS total_time, s.{mean} AS mean_time, s.rows,
+           100 * s.{total} / nullif(sum(s.{total}) OVER (), 0) AS share
+    FROM pg_stat_statements s
+    JOIN pg_catalog.pg_database d ON d.oid = s.dbid
+    WHERE d.datname = current_database()
+      AND s.query ~* '^\\s*(select|with|insert|update|delete|values|table)\\M'
+    ORDER BY s.{sort} DESC
+    LIMIT %s
+"""
+
+
+def top_statements(cursor: Any, sort: Text, limit: int) -> List[Dict[Text, Any]]:
+    """The `limit` statements of the current database with the highest total or mean time."""
+    cursor.execute("SELECT extversion FROM pg_catalog.pg_extension WHERE extname = 'pg_stat_statements'")
+    row = cursor.fetchone()
+    if row is None:
+        raise RuntimeError("The pg_stat_statements extension is not installed on this database.")
+    # The *_time columns were renamed to *_exec_time in 1.8
+    index = 0 if tuple(int(part) for part in row[0].split(".")[:2]) >= (1, 8) else 1
+    columns = {"total": SORT_COLUMNS["total"][index], "mean": SORT_COLUMNS["mean"][index], "sort": SORT_COLUMNS[sort][index]}
+
+    cursor.execute(STATEMENTS_QUERY.format(**columns), (limit,))
+    return [
+        {"queryid": queryid, "query": query, "calls": calls, "total_time_ms": round(total_time, 3), "mean_time_ms": round(mean_time, 3), "rows": rows, "share_percent": round(share or 0.0, 1)}
+        for queryid, query, calls, total_time, mean_time, rows, share in cursor.fetchall()
+    ]
+
+
+def generic_plan(conn: Any, query: Text, budget: AnalysisBudget) -> Tuple[Any, Text]:
+    """Plan a normalized statement without executing it; return the JSON plan and how it was obtained.
+
+    pg_stat_statements replaces constants with $n parameters. PostgreSQL 16+
+    plans those directly with GENERIC_PLAN; older servers get a prepared
+    statement explained with NULL arguments under force_generic_plan.
+    """
+    parameters = max((int(token.text[1:]) for token in tokenize(query) if token.kind == "parameter"), default=0)
+    cursor = conn.cursor()
+    prepared = False
+    try:
+        cursor.execute("SET TRANSACTION READ ONLY")
+        cursor.execute("SET LOCAL statement_timeout = %s", (budget.statement_timeout_ms,))
+        if not parameters:
+            cursor.execute(f"EXPLAIN (FORMAT JSON, VERBOSE) {query}")
+            return cursor.fetchall()[0][0], "plain"
+        if conn.server_version >= 160000:
+            cursor.execute(f"EXPLAIN (GENERIC_PLAN, FORMAT JSON, VERBOSE) {query}")
+            return cursor.fetchall()[0][0], "generic_plan"
+
+        cursor.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+        cursor.execute(f"PREPARE workload_statement AS {query}")
+        prepared = True
+        cursor.execute(f"EXPLAIN (FORMAT JSON, VERBOSE) EXECUTE workload_statement({', '.join(['NULL'] * parameters)})")
+        return cursor.fetchall()[0][0], "prepared_statement"
+    finally:
+        conn.rollback()
+        if prepared:
+            # Prepared statements outlive the transaction; never leave one on a pooled connection
+            cursor.execute("DEALLOCATE workload_statement")
+            conn.rollback()
+
+
+def analyze_workload(connection_string: Text, sort: Text, limit: int, parallelism: int, budget: Optional[AnalysisBudget] = None) -> Dict[Text, Any]:
+    """Plan the top statements concurrently, one pooled connection each, and analyse every plan."""
+    budget = budget or AnalysisBudget()
+    analyzer = PlanAnalyzer()
+    with pool_registry.connection(connection_string) as conn:
+        statements = top_statements(conn.cursor(), sort, limit)
+
+    def explain(statement: Dict[Text, Any]) -> Dict[Text, Any]:
+        try:
+            with pool_registry.connection(connection_string) as conn:
+                json_plan, method = generic_plan(conn, statement["query"], budget)
+        except (psycopg2.Error, PoolTimeoutError) as e:
+            return dict(statement, error=(getattr(e, "pgerror", None) or str(e)).strip())
+        return dict(statement, plan_method=method, analysis=analyzer.analyze(json_plan), text_plan=render_plan(json_plan), json_plan=json_plan)
+
+    if statements:
+        with ThreadPoolExecutor(max_workers=min(parallelism, len(statements)), thread_name_prefix="workload") as executor:
+            # map() keeps the pg_stat_statements ranking
+            statements = list(executor.map(explain, statements))
+
+    return {
+        "database": database_target(connection_string),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "sorted_by": f"{sort}_time",
+        "statements": statements,
+        "findings": [
+            {"queryid": statement["queryid"], "node": finding["node"], "flag": finding["flag"]}
+            for statement in statements for finding in statement.get("analysis", {}).get("findings", [])
+        ],
+    }
+
+
+def workload_summary(report: Dict[Text, Any], top: int = 5) -> Text:
+    """Chat lines for the most expensive statements and each one's main hotspot."""
+    statements = report["statements"]
+    lines = [f"Analyzed the top {len(statements)} statements by {report['sorted_by'].replace('_', ' ')} on {report['database']}:"]
+    for position, statement in enumerate(statements[:top], start=1):
+        query = " ".join(statement["query"].split())
+        line = f"{position}. {statement['share_percent']:.0f}% of time, {statement['calls']:,} calls, mean {statement['mean_time_ms']:.1f} ms: {query[:80]}{'...' if len(query) > 80 else ''}"
+        if "error" in statement:
+            line += f" - could not be planned ({statement['error']})"
+        elif statement["analysis"]["hotspots"]:
+            hotspot = statement["analysis"]["hotspots"][0]
+            line += f" - {hotspot['node']}"
+            if hotspot["flags"]:
+                line += f" ({'; '.join(hotspot['flags'])})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class ValidateAnalyzeWorkloadForm(FormValidationAction):
+    def name(self) -> Text:
+        return "validate_analyze_workload_form"
+
+    async def validate_connection_string(
+        self,
+        slot_value: Text,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: DomainDict,
+    ) -> Dict[Text, Any]:
+        """Validate that the connection string is a proper Postgres URI that accepts connections."""
+        return await pool_registry.validate_connection_string(self.name(), slot_value, dispatcher)
+
+    def validate_workload_sort(
+        self,
+        slot_value: Any,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: DomainDict,
+    ) -> Dict[Text, Any]:
+        """Accept total or mean (average) execution time."""
+        value = str(slot_value or "").strip().lower()
+        if value.startswith("total"):
+            return {"workload_sort": "total"}
+        if value.startswith(("mean", "average", "avg")):
+            return {"workload_sort": "mean"}
+        dispatcher.utter_message(text="Please choose how to rank statements: total or mean execution time.")
+        return {"workload_sort": None}
+
+
+class ActionSubmitWorkloadAnalysis(Action):
+    def name(self) -> Text:
+        return "action_submit_workload_analysis"
+
+    async def run(
+        self,
+        dispatcher: CollectingDispatcher,
+        tracker: Tracker,
+        domain: DomainDict,
+    ) -> List[Dict[Text, Any]]:
+        """Plan the database's most expensive statements and report their hotspots."""
+        connection_string = tracker.get_slot("connection_string")
+        sort = tracker.get_slot("workload_sort") or "total"
+        limit = int(os.getenv("WORKLOAD_TOP_N", "10"))
+
+        dispatcher.utter_message(text=f"Request in Progress... Planning the top {limit} statements from pg_stat_statements.")
+
+        try:
+            report = await db_executor.run(self.name(), analyze_workload, connection_string, sort, limit, pool_registry.parallelism("WORKLOAD_PARALLELISM"))
+
+            # One consolidated report in the shared artifact store
+            artifact_id = await db_executor.run(self.name(), artifact_store.put_json, report)
+
+            dispatcher.utter_message(text=workload_summary(report))
+            dispatcher.utter_message(custom={
+                "text": "Download the complete workload report:",
+                "form_type": "download",
+                "file_name": artifact_id,
+                "artifact_id": artifact_id,
+            })
+            return [SlotSet("workload_report_path", artifact_store.path(artifact_id))]
+
+        except Exception as e:
+            dispatcher.utter_message(text=f"Error analyzing workload: {e}")
+            return []
@@ -0,0 +1,31 @@
+import json
+import os
+import time
+
+from rasa.actions.artifact_store import ArtifactStore
+
+
+def test_put_json_is_content_addressed(tmp_path):
+    store = ArtifactStore(root=str(tmp_path))
+
+    first = store.put_json({"tables": ["users", "orders"]})
+    second = store.put_json({"tables": ["users", "orders"]})
+    other = store.put_json({"tables": ["users"]})
+
+    assert first == second
+    assert first != other
+    assert first.endswith(".json")
+    assert json.loads(open(store.path(first)).read()) == {"tables": ["users", "orders"]}
+    assert sorted(os.listdir(tmp_path)) == sorted([first, other])
+
+
+def test_purge_expired(tmp_path):
+    store = ArtifactStore(root=str(tmp_path), ttl_seconds=60)
+    old = store.put_json({"old": True})
+    fresh = store.put_json({"fresh": True})
+    stale_time = time.time() - 120
+    os.utime(store.path(old), (stale_time, stale_time))
+
+    assert store.purge_expired() == 1
+    assert not store.exists(old)
+    assert store.exists(fresh)
@@ -0,0 +1,14 @@
+from benchmarks.validate_sql import generated, legacy, lexer, unbalanced
+
+
+def test_synthetic_queries_fit_their_size():
+    for size in (1024, 4096):
+        assert size - 8 <= len(generated(size)) <= size
+        assert len(unbalanced(size)) == size
+
+
+def test_both_validations_accept_generated_sql():
+    sql = generated(4096)
+
+    assert legacy(sql)
+    assert lexer(sql)
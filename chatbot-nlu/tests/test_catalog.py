@@ -0,0 +1,86 @@
+from rasa.actions.catalog import COLUMNS_QUERY, FUNCTIONS_QUERY, INDEXES_QUERY, SCHEMAS_QUERY, fetch_definitions
+
+
+class FakeCursor:
+    """Cursor returning canned rows per query and recording every round trip."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return self.rows[self.executed[-1][0]]
+
+
+def test_one_query_per_object_type():
+    cursor = FakeCursor({
+        COLUMNS_QUERY: [
+            ("users", [{"name": "id", "type": "integer", "nullable": False}, {"name": "email", "type": "character varying(255)", "nullable": True}]),
+            ("orders", None),
+        ],
+        FUNCTIONS_QUERY: [("add", "a integer, b integer", "integer", "select a + b")],
+        INDEXES_QUERY: [],
+    })
+    tables = [f"table_{i}" for i in range(500)] + ["users", "orders"]
+
+    definitions = fetch_definitions(cursor, {"tables": tables, "functions": ["add", "missing"], "indexes": ["users_pkey"]})
+
+    # One round trip per type, no matter how many objects were selected
+    assert len(cursor.executed) == 3
+    assert cursor.executed[0][1] == (["public"], tables, ["public"])
+    assert definitions["tables"][-2] == {"name": "users", "columns": [{"name": "id", "type": "integer", "nullable": False}, {"name": "email", "type": "character varying(255)", "nullable": True}]}
+    assert definitions["tables"][-1] == {"name": "orders", "columns": []}
+    assert definitions["tables"][0] == {"name": "table_0", "columns": []}
+    assert definitions["functions"] == [
+        {"name": "add", "arguments": "a integer, b integer", "return_type": "integer", "source": "select a + b"},
+        {"name": "missing", "source": "-- Definition not available"},
+    ]
+    assert definitions["indexes"] == [{"name": "users_pkey", "source": "-- Definition not available"}]
+
+
+def test_types_follow_export_order_and_schemas_are_configurable():
+    cursor = FakeCursor({COLUMNS_QUERY: [], SCHEMAS_QUERY: [("sales", "postgres")]})
+
+    definitions = fetch_definitions(cursor, {"schemas": ["sales"], "views": ["v"], "tables": []}, schemas=["sales", "public"])
+
+    assert list(definitions) == ["views", "schemas"]
+    assert cursor.executed[0][1] == (["sales", "public"], ["v"], ["sales", "public"])
+    assert definitions["schemas"] == [{"name": "sales", "owner": "postgres"}]
+
+
+def test_inventory_is_a_single_round_trip():
+    from rasa.actions.catalog import fetch_inventory
+
+    class InventoryCursor(FakeCursor):
+        def fetchall(self):
+            return [("tables", ["orders", "users"]), ("triggers", ["audit_users"])]
+
+    cursor = InventoryCursor({})
+
+    inventory = fetch_inventory(cursor, ["tables", "triggers", "views", "tables", "bogus"], schemas=["public", "sales"])
+
+    assert len(cursor.executed) == 1
+    query, params = cursor.executed[0]
+    assert params == {"schemas": ["public", "sales"]}
+    assert "information_schema" not in query.replace("'information_schema'", "")
+    # Triggers are joined to their table's namespace, not to the trigger's table oid
+    assert "r.oid = t.tgrelid" in query
+    assert inventory == {"tables": ["orders", "users"], "triggers": ["audit_users"], "views": []}
+
+
+def test_explore_schemas(monkeypatch):
+    from unittest.mock import MagicMock
+
+    from rasa.actions.schema_explorer import explore_schemas
+
+    tracker = MagicMock()
+    tracker.get_slot.return_value = None
+    monkeypatch.setenv("EXPLORE_SCHEMAS", "public, sales")
+    assert explore_schemas(tracker) == ["public", "sales"]
+
+    tracker.get_slot.return_value = "billing,hr"
+    assert explore_schemas(tracker) == ["billing", "hr"]
+
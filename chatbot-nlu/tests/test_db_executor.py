@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from rasa.actions import query_analyzer, schema_explorer
+from rasa.actions.artifact_store import ArtifactStore
+from rasa.actions.catalog_cache import catalog_cache
+from rasa.actions.db_executor import DatabaseExecutor
+from rasa.actions.db_pool import PoolRegistry
+from rasa.actions.plan_history import PlanHistory
+
+DSN = "postgres://app:secret@db:5432/sales"
+
+
+class SlowExplainCursor:
+    """EXPLAIN blocks until the test releases it; catalog queries answer at once."""
+
+    def __init__(self, release):
+        self.release = release
+        self.query = None
+
+    def execute(self, query, params=None):
+        self.query = query
+        if query.startswith("EXPLAIN"):
+            assert self.release.wait(5)
+
+    def fetchone(self):
+        return ("1/1",)
+
+    def fetchall(self):
+        if self.query.startswith("EXPLAIN"):
+            return [([{"Plan": {"Node Type": "Seq Scan"}}],)] if "JSON" in self.query else [("Seq Scan on orders",)]
+        return [("tables", ["orders"])]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class SlowExplainConnection:
+    closed = 0
+
+    def __init__(self, release):
+        self.release = release
+
+    def cursor(self):
+        return SlowExplainCursor(self.release)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def tracker(sender_id, **slots):
+    return Tracker(sender_id, slots, {}, [], False, None, {}, None)
+
+
+@pytest.mark.asyncio
+async def test_slow_query_does_not_block_other_conversations(monkeypatch, tmp_path):
+    release = threading.Event()
+    registry = PoolRegistry(settings={}, connect=lambda dsn: SlowExplainConnection(release))
+    monkeypatch.setattr(query_analyzer, "pool_registry", registry)
+    monkeypatch.setattr(schema_explorer, "pool_registry", registry)
+    monkeypatch.setattr(query_analyzer, "artifact_store", ArtifactStore(root=str(tmp_path)))
+    monkeypatch.setattr(query_analyzer, "plan_history", PlanHistory(path=str(tmp_path / "history.sqlite3")))
+    catalog_cache.clear()
+
+    analysis = asyncio.create_task(query_analyzer.ActionSubmitQueryAnalysis().run(
+        CollectingDispatcher(), tracker("alice", connection_string=DSN, sql_query="SELECT * FROM orders"), {}
+    ))
+    await asyncio.sleep(0.05)
+
+    started = time.monotonic()
+    events = await schema_explorer.ActionSubmitSchemaExplore().run(
+        CollectingDispatcher(), tracker("bob", connection_string=DSN, object_types=["tables"]), {}
+    )
+    elapsed = time.monotonic() - started
+
+    # Bob's explore completed while Alice's EXPLAIN is still running
+    assert not analysis.done()
+    assert elapsed < 1
+    assert {"tables": ["orders"]} in [event["value"] for event in events]
+
+    release.set()
+    assert [event["name"] for event in await analysis] == ["execution_plan_path"]
+    assert registry.stats()["db:5432/sales"]["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_limited_per_action():
+    executor = DatabaseExecutor(settings={"DB_ACTION_CONCURRENCY": "2", "DB_ACTION_CONCURRENCY_SLOW": "1"})
+    running = {"slow": 0, "fast": 0}
+    peak = {"slow": 0, "fast": 0}
+    lock = threading.Lock()
+
+    def work(action):
+        with lock:
+            running[action] += 1
+            peak[action] = max(peak[action], running[action])
+        time.sleep(0.02)
+        with lock:
+            running[action] -= 1
+
+    await asyncio.gather(*(executor.run(action, work, action) for action in ["slow", "fast"] * 4))
+    executor.shutdown()
+
+    assert executor.limit("slow") == 1
+    assert peak == {"slow": 1, "fast": 2}
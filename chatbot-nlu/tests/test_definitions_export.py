@@ -0,0 +1,120 @@
+import contextlib
+import json
+import os
+import tracemalloc
+
+import pytest
+
+from rasa.actions.artifact_store import ArtifactStore
+from rasa.actions.catalog import COLUMNS_QUERY, FUNCTIONS_QUERY, INDEXES_QUERY
+from rasa.actions.definitions_export import export_definitions, export_summary
+
+
+class ServerSideCursor:
+    """Named cursor producing its rows lazily, like a server-side cursor does."""
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.rows = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((self.name, query, params))
+        for inner, rows in self.conn.rows.items():
+            if inner in query:
+                self.rows = rows(params[-1])
+
+    def fetchmany(self, size):
+        self.conn.batches.append(size)
+        return [row for _, row in zip(range(size), self.rows)]
+
+
+class ExportConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.batches = []
+
+    def cursor(self, name=None):
+        assert name, "definitions must be read through a named cursor"
+        return ServerSideCursor(self, name)
+
+
+def factory(conn):
+    return lambda: contextlib.nullcontext(conn)
+
+
+def test_export_streams_each_type_in_selection_order(tmp_path):
+    store = ArtifactStore(root=str(tmp_path))
+    conn = ExportConnection({
+        # The database returns rows in selection order and leaves out what does not exist
+        COLUMNS_QUERY: lambda names: iter([("users", [{"name": "id", "type": "integer", "nullable": False}]), ("orders", None)]),
+        FUNCTIONS_QUERY: lambda names: iter([("add", "a integer, b integer", "integer", "select a + b")]),
+        INDEXES_QUERY: lambda names: iter(()),
+    })
+    selected = {"indexes": ["users_pkey"], "tables": ["users", "missing", "orders", "users"], "functions": ["missing_fn", "add"]}
+
+    export = export_definitions(factory(conn), selected, {"database_host_endpoint": "db:5432"}, schemas=["sales"], batch_size=1, store=store)
+
+    expected = {"database_host_endpoint": "db:5432", "definitions": {
+        "tables": [
+            {"name": "users", "columns": [{"name": "id", "type": "integer", "nullable": False}]},
+            {"name": "missing", "columns": []},
+            {"name": "orders", "columns": []},
+        ],
+        "functions": [
+            {"name": "missing_fn", "source": "-- Definition not available"},
+            {"name": "add", "arguments": "a integer, b integer", "return_type": "integer", "source": "select a + b"},
+        ],
+        "indexes": [{"name": "users_pkey", "source": "-- Definition not available"}],
+    }}
+    # Byte for byte what serialising the whole export in memory would have stored
+    assert export["artifact_id"] == ArtifactStore(root=str(tmp_path / "memory")).put_json(expected)
+    with open(store.path(export["artifact_id"])) as f:
+        assert json.load(f) == expected
+    assert export["definitions"] == {"tables": 3, "functions": 2, "indexes": 1}
+    assert export_summary(export).startswith("Exported 6 definitions (tables: 3, functions: 2, indexes: 1), ")
+
+    assert [name for name, _, _ in conn.executed] == ["export_tables", "export_functions", "export_indexes"]
+    assert conn.executed[0][1].endswith("ORDER BY array_position(%s::text[], definitions.name::text)")
+    assert conn.executed[0][2] == (["sales"], ["users", "missing", "orders"], ["sales"], ["users", "missing", "orders"])
+    assert set(conn.batches) == {1}
+    # No part files are left behind
+    assert sorted(os.listdir(tmp_path)) == sorted(["memory", export["artifact_id"]])
+
+
+def test_large_export_memory_stays_flat(tmp_path):
+    columns = [{"name": f"column_{i}", "type": "character varying(255)", "nullable": True} for i in range(10)]
+    conn = ExportConnection({COLUMNS_QUERY: lambda names: ((name, columns) for name in names)})
+    tables = [f"table_{i}" for i in range(5000)]
+
+    tracemalloc.start()
+    try:
+        export = export_definitions(factory(conn), {"tables": tables}, {}, batch_size=100, store=ArtifactStore(root=str(tmp_path)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # 50,000 columns end up on disk; only one batch of rows is ever held in memory
+    assert export["definitions"] == {"tables": 5000}
+    assert export["bytes"] > 3 * 1024 * 1024
+    assert peak < export["bytes"] / 4
+
+
+def test_failed_export_leaves_no_files(tmp_path):
+    def broken(names):
+        yield ("users", [])
+        raise RuntimeError("connection lost")
+
+    conn = ExportConnection({COLUMNS_QUERY: broken, FUNCTIONS_QUERY: lambda names: iter(())})
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        export_definitions(factory(conn), {"tables": ["users", "orders"], "functions": ["add"]}, {}, batch_size=1, parallelism=2, store=ArtifactStore(root=str(tmp_path)))
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,108 @@
+from rasa.actions.explain import AnalysisBudget
+from rasa.actions.index_advisor import IndexAdvisor
+
+SLOW_PLAN = [{"Plan": {
+    "Node Type": "Sort", "Total Cost": 1500.0, "Plan Rows": 20, "Sort Key": ["o.created_at DESC"],
+    "Plans": [{
+        "Node Type": "Hash Join", "Total Cost": 1400.0, "Plan Rows": 20, "Hash Cond": "(o.user_id = u.id)",
+        "Plans": [
+            {
+                "Node Type": "Seq Scan", "Relation Name": "orders", "Schema": "public", "Alias": "o", "Total Cost": 1000.0, "Plan Rows": 20,
+                "Filter": "(((o.status)::text = 'open'::text) AND (o.created_at > '2024-01-01'::date))",
+            },
+            {"Node Type": "Hash", "Total Cost": 300.0, "Plan Rows": 5000, "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "users", "Schema": "public", "Alias": "u", "Total Cost": 300.0, "Plan Rows": 5000},
+            ]},
+        ],
+    }],
+}}]
+
+
+class AdvisorCursor:
+    def __init__(self, hypopg):
+        self.hypopg = hypopg
+        self.executed = []
+        self.next_oid = 100
+        self.active = None
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        if "hypopg_create_index" in query:
+            self.next_oid += 1
+            self.active = (self.next_oid, params[0])
+        elif "hypopg_drop_index" in query:
+            self.active = None
+
+    def fetchone(self):
+        query = self.executed[-1]
+        if "pg_extension" in query:
+            return (1,) if self.hypopg else None
+        return (self.active[0],)
+
+    def fetchall(self):
+        # Only the (status, created_at) index changes the plan
+        if self.active and "(status, created_at)" in self.active[1]:
+            return [([{"Plan": {"Node Type": "Index Scan", "Index Name": f"<{self.active[0]}>btree_orders_status_created_at", "Total Cost": 420.0}}],)]
+        return [([{"Plan": {"Node Type": "Sort", "Total Cost": 1500.0}}],)]
+
+
+class AdvisorConnection:
+    def __init__(self, hypopg):
+        self.cursor_ = AdvisorCursor(hypopg)
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self.cursor_
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_candidates_from_filters_joins_and_sorts():
+    candidates = IndexAdvisor(settings={}).candidates(SLOW_PLAN)
+
+    assert [(candidate["statement"], candidate["reason"]) for candidate in candidates] == [
+        ("CREATE INDEX ON public.orders (created_at)", "sort key"),
+        ("CREATE INDEX ON public.orders (user_id)", "join key in Hash Join"),
+        ("CREATE INDEX ON public.users (id)", "join key in Hash Join"),
+        ("CREATE INDEX ON public.orders (status, created_at)", "filter in Seq Scan on orders"),
+    ]
+    assert IndexAdvisor(settings={"INDEX_ADVISOR_MAX_CANDIDATES": "1"}).candidates(SLOW_PLAN) == candidates[:1]
+
+
+def test_candidates_are_rated_with_hypopg():
+    conn = AdvisorConnection(hypopg=True)
+
+    advice = IndexAdvisor(settings={}).advise(conn, "SELECT * FROM orders o JOIN users u ON u.id = o.user_id", SLOW_PLAN, AnalysisBudget(settings={}))
+
+    assert advice[0]["statement"] == "CREATE INDEX ON public.orders (status, created_at)"
+    assert advice[0]["method"] == "hypopg" and advice[0]["used"]
+    assert (advice[0]["cost_before"], advice[0]["cost_after"], advice[0]["reduction"], advice[0]["reduction_percent"]) == (1500.0, 420.0, 1080.0, 72.0)
+    assert [recommendation["reduction"] for recommendation in advice[1:]] == [0.0, 0.0, 0.0]
+    # Everything ran read-only and no hypothetical index is left on the connection
+    assert conn.cursor_.executed[0] == "SET TRANSACTION READ ONLY"
+    assert conn.cursor_.executed[-1] == "SELECT hypopg_reset()"
+
+
+def test_cost_estimate_without_hypopg():
+    conn = AdvisorConnection(hypopg=False)
+    advisor = IndexAdvisor(settings={})
+
+    advice = advisor.advise(conn, "SELECT 1", SLOW_PLAN, AnalysisBudget(settings={}))
+
+    assert {recommendation["method"] for recommendation in advice} == {"estimate"}
+    # The orders scan (cost 1000) becomes 20 probes at random_page_cost
+    assert advice[0]["statement"] == "CREATE INDEX ON public.orders (status, created_at)"
+    assert advice[0]["reduction"] == 920.0
+    assert not any("hypopg_" in query for query in conn.cursor_.executed)
+    assert advisor.summary(advice).splitlines()[:2] == [
+        "Suggested indexes:",
+        "- CREATE INDEX ON public.orders (status, created_at): estimated cost 1,500.00 -> 580.00 (-61%, estimate; filter in Seq Scan on orders)",
+    ]
+
+
+def test_disabled_advisor_does_nothing():
+    conn = AdvisorConnection(hypopg=True)
+
+    assert IndexAdvisor(settings={"INDEX_ADVISOR_ENABLED": "false"}).advise(conn, "SELECT 1", SLOW_PLAN, AnalysisBudget(settings={})) == []
+    assert conn.cursor_.executed == []
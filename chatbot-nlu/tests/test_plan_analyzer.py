@@ -0,0 +1,84 @@
+from rasa.actions.plan_analyzer import PlanAnalyzer
+
+
+def node(node_type, total_ms, rows, plan_rows, loops=1, children=(), **extra):
+    return {
+        "Node Type": node_type, "Startup Cost": 0.0, "Total Cost": extra.pop("cost", 100.0), "Plan Rows": plan_rows, "Plan Width": 8,
+        "Actual Startup Time": 0.0, "Actual Total Time": total_ms, "Actual Rows": rows, "Actual Loops": loops,
+        "Plans": list(children), **extra,
+    }
+
+
+NESTED_LOOP_PLAN = [{
+    "Plan": node("Sort", 100.0, 500, 500, children=[
+        node("Nested Loop", 90.0, 500, 5, children=[
+            node("Seq Scan", 30.0, 2000, 2000, **{"Relation Name": "orders", "Alias": "orders", "Rows Removed by Filter": 48000, "Shared Hit Blocks": 30, "Shared Read Blocks": 70}),
+            node("Index Scan", 0.02, 1, 1, loops=2000, **{"Index Name": "users_pkey", "Relation Name": "users", "Alias": "users"}),
+        ]),
+    ], **{"Sort Method": "external merge", "Sort Space Type": "Disk", "Sort Space Used": 2048}),
+    "Planning Time": 0.5,
+    "Execution Time": 101.0,
+}]
+
+
+def test_exclusive_time_and_loop_adjusted_rows():
+    report = PlanAnalyzer(settings={}).analyze(NESTED_LOOP_PLAN)
+    nodes = {hotspot["node_type"]: hotspot for hotspot in report["hotspots"]}
+
+    assert report["analyzed"] and report["node_count"] == 4
+    # The index scan ran 2000 times at 0.02 ms: 40 ms of the nested loop's 90
+    assert nodes["Index Scan"]["exclusive_ms"] == 40.0
+    assert nodes["Index Scan"]["rows"] == 2000
+    assert nodes["Nested Loop"]["exclusive_ms"] == 20.0
+    assert nodes["Sort"]["exclusive_ms"] == 10.0
+    assert [hotspot["node_type"] for hotspot in report["hotspots"]] == ["Index Scan", "Seq Scan", "Nested Loop", "Sort"]
+    assert nodes["Index Scan"]["percent"] == 40.0
+    assert nodes["Seq Scan"]["buffer_hit_ratio"] == 0.3
+    assert nodes["Nested Loop"]["misestimate"] == 100.0
+
+
+def test_flags():
+    report = PlanAnalyzer(settings={}).analyze(NESTED_LOOP_PLAN)
+    flags = {hotspot["node_type"]: hotspot["flags"] for hotspot in report["hotspots"]}
+
+    assert flags["Seq Scan"] == ["sequential scan over 50,000 rows"]
+    assert flags["Sort"] == ["sort spilled 2,048 kB to disk"]
+    assert flags["Nested Loop"] == ["nested loop ran its inner side 2,000 times", "100x more rows than estimated"]
+    assert flags["Index Scan"] == []
+    assert len(report["findings"]) == 4
+
+
+def test_top_n_summary():
+    analyzer = PlanAnalyzer(settings={"PLAN_HOTSPOTS": "2"})
+
+    summary = analyzer.summary(analyzer.analyze(NESTED_LOOP_PLAN))
+
+    assert summary.splitlines() == [
+        "Top 2 hotspots by exclusive time (101.0 ms total):",
+        "1. Index Scan using users_pkey on users: 40.0 ms (40%), 2,000 rows",
+        "2. Seq Scan on orders: 30.0 ms (30%), 2,000 rows - sequential scan over 50,000 rows",
+    ]
+
+
+def test_estimated_plans_are_ranked_by_cost():
+    plan = {"Plan": {"Node Type": "Hash Join", "Total Cost": 500.0, "Plan Rows": 10, "Plans": [
+        {"Node Type": "Seq Scan", "Relation Name": "events", "Alias": "events", "Total Cost": 400.0, "Plan Rows": 90000},
+        {"Node Type": "Hash", "Total Cost": 20.0, "Plan Rows": 10, "Hash Batches": 4},
+    ]}}
+    analyzer = PlanAnalyzer(settings={})
+
+    report = analyzer.analyze(plan)
+
+    assert not report["analyzed"] and report["ranked_by"] == "exclusive_cost"
+    assert [(hotspot["node_type"], hotspot["exclusive_cost"]) for hotspot in report["hotspots"]] == [("Seq Scan", 400.0), ("Hash Join", 80.0), ("Hash", 20.0)]
+    assert report["hotspots"][0]["flags"] == ["sequential scan over 90,000 rows"]
+    assert analyzer.summary(report).splitlines()[1] == "1. Seq Scan on events: cost 400.00 (80%), 90,000 rows estimated - sequential scan over 90,000 rows"
+
+
+def test_empty_result_against_a_large_estimate():
+    plan = {"Plan": node("Index Scan", 0.5, 0, 1000, **{"Index Name": "events_kind_idx", "Relation Name": "events", "Alias": "events"})}
+
+    report = PlanAnalyzer(settings={}).analyze(plan)
+
+    assert report["hotspots"][0]["misestimate"] == 0.001
+    assert report["hotspots"][0]["flags"] == ["1,000x fewer rows than estimated"]
@@ -0,0 +1,82 @@
+import json
+
+from rasa.actions.plan_renderer import render_plan
+
+HASH_JOIN_PLAN = [{
+    "Plan": {
+        "Node Type": "Hash Join", "Parallel Aware": False, "Join Type": "Inner",
+        "Startup Cost": 1.09, "Total Cost": 39.61, "Plan Rows": 10, "Plan Width": 40,
+        "Actual Startup Time": 0.041, "Actual Total Time": 0.312, "Actual Rows": 12, "Actual Loops": 1,
+        "Output": ["o.id", "u.email"], "Inner Unique": True, "Hash Cond": "(o.user_id = u.id)",
+        "Shared Hit Blocks": 5,
+        "Plans": [
+            {
+                "Node Type": "Seq Scan", "Parent Relationship": "Outer", "Parallel Aware": False,
+                "Relation Name": "orders", "Schema": "public", "Alias": "o",
+                "Startup Cost": 0.0, "Total Cost": 32.6, "Plan Rows": 2260, "Plan Width": 8,
+                "Actual Startup Time": 0.006, "Actual Total Time": 0.101, "Actual Rows": 120, "Actual Loops": 1,
+                "Output": ["o.id", "o.user_id"], "Filter": "(o.total > 10)", "Rows Removed by Filter": 7,
+                "Shared Hit Blocks": 4,
+            },
+            {
+                "Node Type": "Hash", "Parent Relationship": "Inner", "Parallel Aware": False,
+                "Startup Cost": 1.04, "Total Cost": 1.04, "Plan Rows": 4, "Plan Width": 36,
+                "Actual Startup Time": 0.02, "Actual Total Time": 0.02, "Actual Rows": 4, "Actual Loops": 1,
+                "Output": ["u.email", "u.id"], "Hash Buckets": 1024, "Hash Batches": 1, "Peak Memory Usage": 9,
+                "Plans": [{
+                    "Node Type": "Index Scan", "Parent Relationship": "Outer", "Scan Direction": "Forward",
+                    "Index Name": "users_pkey", "Relation Name": "users", "Schema": "public", "Alias": "u",
+                    "Startup Cost": 0.15, "Total Cost": 1.04, "Plan Rows": 4, "Plan Width": 36,
+                    "Actual Loops": 0, "Output": ["u.email", "u.id"], "Index Cond": "(u.id < 5)",
+                }],
+            },
+        ],
+    },
+    "Planning": {"Shared Hit Blocks": 12},
+    "Planning Time": 0.25,
+    "Triggers": [],
+    "Execution Time": 0.4,
+}]
+
+
+def test_renders_explain_text_format():
+    assert render_plan(HASH_JOIN_PLAN) == "\n".join([
+        "Hash Join  (cost=1.09..39.61 rows=10 width=40) (actual time=0.041..0.312 rows=12 loops=1)",
+        "  Output: o.id, u.email",
+        "  Hash Cond: (o.user_id = u.id)",
+        "  Buffers: shared hit=5",
+        "  ->  Seq Scan on public.orders o  (cost=0.00..32.60 rows=2260 width=8) (actual time=0.006..0.101 rows=120 loops=1)",
+        "        Output: o.id, o.user_id",
+        "        Filter: (o.total > 10)",
+        "        Rows Removed by Filter: 7",
+        "        Buffers: shared hit=4",
+        "  ->  Hash  (cost=1.04..1.04 rows=4 width=36) (actual time=0.020..0.020 rows=4 loops=1)",
+        "        Output: u.email, u.id",
+        "        Buckets: 1024  Batches: 1  Memory Usage: 9kB",
+        "        ->  Index Scan using users_pkey on public.users u  (cost=0.15..1.04 rows=4 width=36) (never executed)",
+        "              Output: u.email, u.id",
+        "              Index Cond: (u.id < 5)",
+        "Planning:",
+        "  Buffers: shared hit=12",
+        "Planning Time: 0.250 ms",
+        "Execution Time: 0.400 ms",
+    ])
+
+
+def test_node_titles():
+    def title(**node):
+        return render_plan({"Plan": node})
+
+    assert title(**{"Node Type": "Aggregate", "Strategy": "Hashed", "Partial Mode": "Simple"}) == "HashAggregate"
+    assert title(**{"Node Type": "Aggregate", "Strategy": "Sorted", "Partial Mode": "Finalize"}) == "Finalize GroupAggregate"
+    assert title(**{"Node Type": "Nested Loop", "Join Type": "Anti"}) == "Nested Loop Anti Join"
+    assert title(**{"Node Type": "Seq Scan", "Parallel Aware": True, "Relation Name": "t", "Alias": "t"}) == "Parallel Seq Scan on t"
+    assert title(**{"Node Type": "Index Only Scan", "Scan Direction": "Backward", "Index Name": "t_idx", "Relation Name": "t", "Alias": "t"}) == "Index Only Scan Backward using t_idx on t"
+    assert title(**{"Node Type": "Bitmap Index Scan", "Index Name": "t_idx"}) == "Bitmap Index Scan on t_idx"
+    assert title(**{"Node Type": "ModifyTable", "Operation": "Insert", "Relation Name": "t", "Schema": "public", "Alias": "t"}) == "Insert on public.t"
+
+
+def test_accepts_json_text_and_plain_explain():
+    plan = json.dumps([{"Plan": {"Node Type": "Result", "Startup Cost": 0.0, "Total Cost": 0.01, "Plan Rows": 1, "Plan Width": 4, "Output": ["1"]}}])
+
+    assert render_plan(plan) == "Result  (cost=0.00..0.01 rows=1 width=4)\n  Output: 1"
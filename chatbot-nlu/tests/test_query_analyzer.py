@@ -0,0 +1,264 @@
+import asyncio
+import threading
+
+import psycopg2
+import pytest
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from rasa.actions import query_analyzer
+from rasa.actions.db_pool import PoolRegistry
+from rasa.actions.explain import AnalysisBudget
+
+DSN = "postgres://app:secret@db:5432/sales"
+
+
+def plan(node_type="Seq Scan", rows=50, cost=1.5):
+    return [{"Plan": {"Node Type": node_type, "Relation Name": "orders", "Schema": "public", "Alias": "orders", "Startup Cost": 0.0, "Total Cost": cost, "Plan Rows": rows, "Plan Width": 4}}]
+
+
+class ExplainCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        self.conn.executed.append(query)
+        if "ANALYZE" in query:
+            self.conn.analyzing.set()
+            if self.conn.analyze_error:
+                raise self.conn.analyze_error
+            if self.conn.block and not self.conn.cancelled.wait(5):
+                raise AssertionError("the query was never cancelled")
+            if self.conn.cancelled.is_set():
+                raise psycopg2.errors.QueryCanceled("canceling statement due to user request")
+
+    def fetchall(self):
+        return [(self.conn.plan,)]
+
+
+class ExplainConnection:
+    closed = 0
+
+    def __init__(self):
+        self.plan = plan()
+        self.analyze_error = None
+        self.block = False
+        self.analyzing = threading.Event()
+        self.cancelled = threading.Event()
+        self.executed = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return ExplainCursor(self)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    conn = ExplainConnection()
+    monkeypatch.setattr(query_analyzer, "pool_registry", PoolRegistry(settings={}, connect=lambda dsn: conn))
+    return conn
+
+
+def test_query_runs_once_in_a_bounded_read_only_transaction(connection):
+    result = query_analyzer.explain_query(DSN, "SELECT id FROM orders", AnalysisBudget(settings={"ANALYZE_STATEMENT_TIMEOUT_MS": "5000"}))
+
+    assert connection.executed == [
+        "SET TRANSACTION READ ONLY",
+        "SET LOCAL statement_timeout = %s",
+        "SET LOCAL lock_timeout = %s",
+        "EXPLAIN (FORMAT JSON, VERBOSE) SELECT id FROM orders",
+        "EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS, VERBOSE) SELECT id FROM orders",
+    ]
+    assert "note" not in result
+    assert result["budget"]["statement_timeout_ms"] == 5000
+    assert result["text_plan"] == "Seq Scan on public.orders  (cost=0.00..1.50 rows=50 width=4)"
+    # Rolled back by the analysis and again when returned to the pool
+    assert connection.rollbacks == 2
+
+
+@pytest.mark.parametrize("estimated,settings,reason", [
+    (plan("ModifyTable"), {}, "the statement modifies data"),
+    (plan(rows=5000), {"ANALYZE_MAX_ROWS": "1000"}, "an estimated 5000 rows exceed the limit of 1000"),
+    (plan(cost=1e6), {"ANALYZE_MAX_COST": "1000"}, "an estimated cost of 1000000.00 exceeds the limit of 1000.00"),
+])
+def test_queries_over_budget_are_only_planned(connection, estimated, settings, reason):
+    connection.plan = estimated
+
+    result = query_analyzer.explain_query(DSN, "DELETE FROM orders", AnalysisBudget(settings=settings))
+
+    assert not any("ANALYZE" in query for query in connection.executed)
+    assert result["note"] == f"Plan generated without ANALYZE because {reason}."
+
+
+def test_statement_timeout_falls_back_to_the_estimated_plan(connection):
+    connection.analyze_error = psycopg2.errors.QueryCanceled("canceling statement due to statement timeout")
+
+    result = query_analyzer.explain_query(DSN, "SELECT id FROM orders", AnalysisBudget(settings={"ANALYZE_STATEMENT_TIMEOUT_MS": "100"}))
+
+    assert result["note"] == "Plan generated without ANALYZE because the statement timeout of 100 ms was reached."
+    assert result["json_plan"] == connection.plan
+
+
+@pytest.mark.asyncio
+async def test_abandoned_analysis_is_cancelled_on_the_server(connection):
+    connection.block = True
+    task = asyncio.create_task(query_analyzer.ActionSubmitQueryAnalysis().run(
+        CollectingDispatcher(), Tracker("alice", {"connection_string": DSN, "sql_query": "SELECT pg_sleep(60)"}, {}, [], False, None, {}, None), {}
+    ))
+    assert await asyncio.to_thread(connection.analyzing.wait, 5)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert connection.cancelled.is_set()
+    # The worker thread finishes promptly and hands the connection back
+    for _ in range(100):
+        if query_analyzer.pool_registry.stats()["db:5432/sales"]["in_use"] == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert query_analyzer.pool_registry.stats()["db:5432/sales"]["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reply_summarises_hotspots(connection, monkeypatch, tmp_path):
+    from rasa.actions.artifact_store import ArtifactStore
+    from rasa.actions.plan_history import PlanHistory
+
+    monkeypatch.setattr(query_analyzer, "artifact_store", ArtifactStore(root=str(tmp_path)))
+    monkeypatch.setattr(query_analyzer, "plan_history", PlanHistory(path=str(tmp_path / "history.sqlite3")))
+    connection.plan = plan(rows=5000, cost=80.0)
+
+    async def analyze(sql_query):
+        dispatcher = CollectingDispatcher()
+        events = await query_analyzer.ActionSubmitQueryAnalysis().run(
+            dispatcher, Tracker("alice", {"connection_string": DSN, "sql_query": sql_query}, {}, [], False, None, {}, None), {}
+        )
+        assert [event["name"] for event in events] == ["execution_plan_path"]
+        return dispatcher.messages[1]["text"].splitlines()
+
+    assert await analyze("SELECT id FROM orders WHERE id = 1") == [
+        "Query analysis complete!",
+        "Top 1 hotspots by estimated cost (80.00 total):",
+        "1. Seq Scan on public.orders: cost 80.00 (100%), 5,000 rows estimated",
+    ]
+
+    # The same query with another literal is compared with the previous run
+    connection.plan = plan(rows=5000, cost=200.0)
+    reply = await analyze("select id from orders where id = 2")
+    assert reply[-1].startswith("Compared with the previous run (")
+    assert reply[-1].endswith("): regressed, estimated cost 80.00 -> 200.00 (+150%)")
+
+
+@pytest.mark.asyncio
+async def test_only_the_parsed_statement_is_explained(connection, monkeypatch, tmp_path):
+    from rasa.actions.artifact_store import ArtifactStore
+    from rasa.actions.plan_history import PlanHistory
+
+    monkeypatch.setattr(query_analyzer, "artifact_store", ArtifactStore(root=str(tmp_path)))
+    monkeypatch.setattr(query_analyzer, "plan_history", PlanHistory(path=str(tmp_path / "history.sqlite3")))
+
+    await query_analyzer.ActionSubmitQueryAnalysis().run(
+        CollectingDispatcher(), Tracker("alice", {"connection_string": DSN, "sql_query": "-- report\nSELECT id FROM orders;; "}, {}, [], False, None, {}, None), {}
+    )
+
+    assert "EXPLAIN (FORMAT JSON, VERBOSE) SELECT id FROM orders" in connection.executed
+
+
+@pytest.mark.asyncio
+async def test_plans_are_analyzed_and_stored_off_the_event_loop(connection, monkeypatch, tmp_path):
+    from rasa.actions.artifact_store import ArtifactStore
+    from rasa.actions.plan_history import PlanHistory, query_fingerprint
+
+    store = ArtifactStore(root=str(tmp_path))
+    history = PlanHistory(path=str(tmp_path / "history.sqlite3"))
+    monkeypatch.setattr(query_analyzer, "artifact_store", store)
+    monkeypatch.setattr(query_analyzer, "plan_history", history)
+    threads = []
+    for owner, name in ((query_analyzer, "normalize_query"), (store, "put_json")):
+        original = getattr(owner, name)
+        monkeypatch.setattr(owner, name, lambda *args, original=original: threads.append(threading.current_thread()) or original(*args))
+
+    await query_analyzer.ActionSubmitQueryAnalysis().run(
+        CollectingDispatcher(), Tracker("alice", {"connection_string": DSN, "sql_query": "SELECT id FROM orders WHERE id = 7"}, {}, [], False, None, {}, None), {}
+    )
+
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    assert history.latest(query_fingerprint("select id from orders where id = 1"), "db:5432/sales")["query"] == "select id from orders where id = ?"
+
+
+class ScriptCursor(ExplainCursor):
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        if query.startswith("EXPLAIN"):
+            if "missing" in query:
+                raise psycopg2.errors.UndefinedTable('relation "missing" does not exist\n')
+            self.conn.plan = plan(cost=900.0 if "users" in query else 12.5)
+
+
+class ScriptConnection(ExplainConnection):
+    def cursor(self):
+        return ScriptCursor(self)
+
+
+@pytest.mark.asyncio
+async def test_script_statements_are_reported_by_cost(monkeypatch, tmp_path):
+    from rasa.actions.artifact_store import ArtifactStore
+
+    store = ArtifactStore(root=str(tmp_path))
+    monkeypatch.setattr(query_analyzer, "artifact_store", store)
+    monkeypatch.setattr(query_analyzer, "pool_registry", PoolRegistry(settings={}, connect=lambda dsn: ScriptConnection()))
+    script = "SELECT id FROM orders WHERE note = 'a;b';\nCREATE INDEX ON orders (note);\nSELECT * FROM missing;\nSELECT * FROM users;"
+    dispatcher = CollectingDispatcher()
+
+    events = await query_analyzer.ActionSubmitQueryAnalysis().run(
+        dispatcher, Tracker("alice", {"connection_string": DSN, "sql_query": script}, {}, [], False, None, {}, None), {}
+    )
+
+    assert dispatcher.messages[1]["text"].splitlines() == [
+        "Script analysis complete!",
+        "Planned 2 of 4 statements (1 failed, 1 skipped). Most expensive first:",
+        "4. line 4, SELECT: cost 900.00, 50 rows estimated - SELECT * FROM users",
+        "1. line 1, SELECT: cost 12.50, 50 rows estimated - SELECT id FROM orders WHERE note = 'a;b'",
+        '3. line 3, SELECT: failed (relation "missing" does not exist) - SELECT * FROM missing',
+        "2. line 2, CREATE: skipped, EXPLAIN does not support CREATE statements - CREATE INDEX ON orders (note)",
+    ]
+    artifact_id = dispatcher.messages[2]["custom"]["artifact_id"]
+    assert events[0]["value"] == store.path(artifact_id)
+
+
+def test_scripts_over_the_statement_limit_are_rejected(monkeypatch):
+    monkeypatch.setenv("SCRIPT_MAX_STATEMENTS", "2")
+    dispatcher = CollectingDispatcher()
+    form = query_analyzer.ValidateAnalyzeQueryForm()
+
+    assert form.validate_sql_query("SELECT 1; SELECT 2; SELECT 3", dispatcher, None, {}) == {"sql_query": None}
+    assert form.validate_sql_query("SELECT 1; SELECT 2;", dispatcher, None, {}) == {"sql_query": "SELECT 1; SELECT 2;"}
+
+
+@pytest.mark.parametrize("sql_query,reply", [
+    ("WITH recent AS (SELECT * FROM orders) SELECT * FROM recent", None),
+    ("(SELECT 1) UNION (SELECT 2)", None),
+    ("please show me the slow orders", "Invalid SQL syntax. Please re-enter a valid query."),
+    ("SELECT 1;\nfrom orders select id", "Invalid SQL syntax in the statement on line 2. Please re-enter a valid query."),
+    ("SELECT * FROM orders WHERE note = 'open", "The query has an unterminated string literal. Please re-enter it."),
+    ("-- only a comment", "Please provide a SQL query."),
+    ("SELECT '" + "x" * 2048 + "'", "The query is larger than 1 KB. Please submit a smaller query."),
+])
+def test_sql_query_validation(monkeypatch, sql_query, reply):
+    monkeypatch.setenv("SQL_QUERY_MAX_BYTES", "1024")
+    dispatcher = CollectingDispatcher()
+
+    result = query_analyzer.ValidateAnalyzeQueryForm().validate_sql_query(sql_query, dispatcher, None, {})
+
+    assert result == {"sql_query": None if reply else sql_query}
+    assert [message["text"] for message in dispatcher.messages] == ([reply] if reply else [])
@@ -0,0 +1,70 @@
+from rasa.actions.sql_tokenizer import Statement, inspect_script, split_statements, tokenize
+
+SCRIPT = """-- nightly report; run as reporting
+CREATE TABLE report (id int, note text);
+INSERT INTO report VALUES (1, 'a;b'), (2, E'it\\'s;'), (3, 'don''t;');
+
+CREATE FUNCTION touch() RETURNS trigger AS $body$
+BEGIN
+  NEW.note := 'x;y';  /* nested /* ; */ comment */
+  RETURN NEW;
+END;
+$body$ LANGUAGE plpgsql;
+CREATE FUNCTION kind(n int) RETURNS text
+BEGIN ATOMIC
+  SELECT CASE WHEN n > 0 THEN 'positive' ELSE 'other' END;
+END;
+SELECT "semi;colon" FROM report WHERE id = $1;;
+"""
+
+
+def test_tokens_cover_the_text():
+    sql = "SELECT a::text, $1, $q$it's$q$ FROM t -- done\nWHERE b <= 1.5e3 /* x /* y */ z */"
+
+    tokens = list(tokenize(sql))
+
+    assert "".join(token.text for token in tokens) == sql
+    assert [(token.kind, token.text) for token in tokens if token.kind not in ("space", "word", "punctuation")] == [
+        ("parameter", "$1"),
+        ("dollar", "$q$it's$q$"),
+        ("comment", "-- done"),
+        ("operator", "<="),
+        ("number", "1.5e3"),
+        ("comment", "/* x /* y */ z */"),
+    ]
+
+
+def test_unterminated_literals_run_to_the_end():
+    assert list(tokenize("SELECT 'open"))[-1] == ("string", "'open", 7, False)
+    assert inspect_script("SELECT 1 /* open */ */").unterminated is None
+    assert inspect_script("SELECT 1 /* open /* */").unterminated == "comment"
+    assert inspect_script("SELECT $a$ open $b$").unterminated == "dollar"
+    assert inspect_script("SELECT E'open\\'").unterminated == "string"
+
+
+def test_script_is_split_on_top_level_semicolons():
+    statements = split_statements(SCRIPT)
+
+    assert [statement.line for statement in statements] == [2, 3, 5, 11, 15]
+    assert [statement.kind for statement in statements] == ["CREATE", "INSERT", "CREATE", "CREATE", "SELECT"]
+    assert statements[1].text == "INSERT INTO report VALUES (1, 'a;b'), (2, E'it\\'s;'), (3, 'don''t;')"
+    assert statements[2].text.endswith("$body$ LANGUAGE plpgsql")
+    assert statements[3].text.endswith("ELSE 'other' END;\nEND")
+    assert statements[4] == Statement(15, 'SELECT "semi;colon" FROM report WHERE id = $1', "SELECT")
+    assert [statement.text for statement in split_statements("SELECT a$b$c FROM t; SELECT $1;")] == ["SELECT a$b$c FROM t", "SELECT $1"]
+
+
+def test_empty_and_comment_only_scripts():
+    assert split_statements("") == []
+    assert split_statements("-- nothing here\n;/* or here */;") == []
+    assert split_statements("SELECT 1") == [Statement(1, "SELECT 1", "SELECT")]
+    assert split_statements("((SELECT 1)) UNION (SELECT 2)")[0].kind == "SELECT"
+    assert split_statements("'not a keyword'")[0].kind == ""
+
+
+def test_begin_atomic_only_opens_routine_bodies():
+    # PostgreSQL takes begin and atomic as column labels; the semicolons still end statements
+    statements = split_statements("SELECT begin atomic FROM (SELECT 1 AS begin) s; COMMIT; DELETE FROM orders")
+
+    assert [statement.kind for statement in statements] == ["SELECT", "COMMIT", "DELETE"]
+    assert [statement.kind for statement in split_statements("CREATE OR REPLACE PROCEDURE p() BEGIN ATOMIC SELECT 1; SELECT 2; END; SELECT 3")] == ["CREATE", "SELECT"]
@@ -0,0 +1,168 @@
+import threading
+
+import psycopg2
+import pytest
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from rasa.actions import workload_analyzer
+from rasa.actions.artifact_store import ArtifactStore
+from rasa.actions.db_pool import PoolRegistry
+from rasa.actions.explain import AnalysisBudget
+
+DSN = "postgres://app:secret@db:5432/sales"
+
+STATEMENTS = [
+    (11, "SELECT * FROM orders WHERE customer_id = $1", 1200, 9000.0, 7.5, 1200, 60.0),
+    (12, "SELECT count(*) FROM users", 10, 4500.0, 450.0, 10, 30.0),
+    (13, "SELECT * FROM missing WHERE id = $1", 3, 1500.0, 500.0, 0, 10.0),
+]
+
+
+def plan(relation, cost):
+    return [{"Plan": {"Node Type": "Seq Scan", "Relation Name": relation, "Schema": "public", "Alias": relation, "Startup Cost": 0.0, "Total Cost": cost, "Plan Rows": 50000, "Plan Width": 4}}]
+
+
+class WorkloadCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append(query)
+        if "pg_extension" in query:
+            self.result = [(self.conn.extversion,)]
+        elif "pg_stat_statements" in query:
+            self.result = STATEMENTS[:params[0]]
+        elif query.startswith("EXPLAIN"):
+            if self.conn.barrier:
+                self.conn.barrier.wait(5)
+            if "missing" in query or "workload_statement(NULL)" in query and "missing" in self.conn.prepared:
+                raise psycopg2.errors.UndefinedTable('relation "missing" does not exist\n')
+            self.result = [(plan("users" if "users" in query + self.conn.prepared else "orders", 900.0),)]
+        elif query.startswith("PREPARE"):
+            self.conn.prepared = query
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+class WorkloadConnection:
+    def __init__(self, server_version=160002, extversion="1.10", barrier=None):
+        self.server_version = server_version
+        self.extversion = extversion
+        self.barrier = barrier
+        self.executed = []
+        self.prepared = ""
+        self.rollbacks = 0
+        self.closed = 0
+
+    def cursor(self):
+        return WorkloadCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("extversion,column", [("1.10", "total_exec_time"), ("1.7", "total_time")])
+def test_top_statements_use_the_columns_of_the_installed_extension(extversion, column):
+    conn = WorkloadConnection(extversion=extversion)
+
+    statements = workload_analyzer.top_statements(conn.cursor(), "total", 2)
+
+    assert f"ORDER BY s.{column} DESC" in conn.executed[1]
+    assert [statement["queryid"] for statement in statements] == [11, 12]
+    assert statements[0]["share_percent"] == 60.0
+
+
+def test_missing_extension_is_reported():
+    conn = WorkloadConnection(extversion=None)
+    conn.cursor = lambda: type("Cursor", (WorkloadCursor,), {"fetchone": lambda self: None})(conn)
+
+    with pytest.raises(RuntimeError, match="pg_stat_statements extension is not installed"):
+        workload_analyzer.top_statements(conn.cursor(), "mean", 10)
+
+
+def test_generic_plans_by_server_version():
+    budget = AnalysisBudget(settings={})
+
+    current = WorkloadConnection(server_version=160002)
+    assert workload_analyzer.generic_plan(current, "SELECT count(*) FROM users", budget)[1] == "plain"
+    assert workload_analyzer.generic_plan(current, STATEMENTS[0][1], budget)[1] == "generic_plan"
+    assert current.executed[-1] == "EXPLAIN (GENERIC_PLAN, FORMAT JSON, VERBOSE) SELECT * FROM orders WHERE customer_id = $1"
+
+    older = WorkloadConnection(server_version=150004)
+    json_plan, method = workload_analyzer.generic_plan(older, STATEMENTS[0][1], budget)
+    assert method == "prepared_statement"
+    assert json_plan[0]["Plan"]["Relation Name"] == "orders"
+    assert older.executed == [
+        "SET TRANSACTION READ ONLY",
+        "SET LOCAL statement_timeout = %s",
+        "SET LOCAL plan_cache_mode = force_generic_plan",
+        "PREPARE workload_statement AS SELECT * FROM orders WHERE customer_id = $1",
+        "EXPLAIN (FORMAT JSON, VERBOSE) EXECUTE workload_statement(NULL)",
+        # The prepared statement does not stay on the pooled connection
+        "DEALLOCATE workload_statement",
+    ]
+
+
+def test_statements_are_planned_concurrently_in_ranking_order(monkeypatch):
+    # Every statement must be planning at the same time to get past the barrier
+    barrier = threading.Barrier(3)
+    monkeypatch.setattr(workload_analyzer, "pool_registry", PoolRegistry(settings={}, connect=lambda dsn: WorkloadConnection(barrier=barrier)))
+
+    report = workload_analyzer.analyze_workload(DSN, "total", 3, parallelism=3, budget=AnalysisBudget(settings={}))
+
+    assert report["database"] == "db:5432/sales"
+    assert report["sorted_by"] == "total_time"
+    assert [statement["queryid"] for statement in report["statements"]] == [11, 12, 13]
+    assert report["statements"][0]["plan_method"] == "generic_plan"
+    assert report["statements"][1]["analysis"]["hotspots"][0]["node"] == "Seq Scan on public.users"
+    assert report["statements"][2]["error"] == 'relation "missing" does not exist'
+    assert [finding["queryid"] for finding in report["findings"]] == [11, 12]
+
+    assert workload_analyzer.workload_summary(report).splitlines() == [
+        "Analyzed the top 3 statements by total time on db:5432/sales:",
+        "1. 60% of time, 1,200 calls, mean 7.5 ms: SELECT * FROM orders WHERE customer_id = $1 - Seq Scan on public.orders (sequential scan over 50,000 rows)",
+        "2. 30% of time, 10 calls, mean 450.0 ms: SELECT count(*) FROM users - Seq Scan on public.users (sequential scan over 50,000 rows)",
+        '3. 10% of time, 3 calls, mean 500.0 ms: SELECT * FROM missing WHERE id = $1 - could not be planned (relation "missing" does not exist)',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_action_stores_one_workload_report(monkeypatch, tmp_path):
+    store = ArtifactStore(root=str(tmp_path))
+    monkeypatch.setattr(workload_analyzer, "artifact_store", store)
+    monkeypatch.setattr(workload_analyzer, "pool_registry", PoolRegistry(settings={}, connect=lambda dsn: WorkloadConnection()))
+    monkeypatch.setenv("WORKLOAD_TOP_N", "2")
+    dispatcher = CollectingDispatcher()
+
+    events = await workload_analyzer.ActionSubmitWorkloadAnalysis().run(
+        dispatcher, Tracker("alice", {"connection_string": DSN, "workload_sort": "mean"}, {}, [], False, None, {}, None), {}
+    )
+
+    assert dispatcher.messages[1]["text"].startswith("Analyzed the top 2 statements by mean time on db:5432/sales:")
+    artifact_id = dispatcher.messages[2]["custom"]["artifact_id"]
+    assert events[0]["name"] == "workload_report_path" and events[0]["value"] == store.path(artifact_id)
+    assert store.exists(artifact_id)
+
+
+def test_sort_slot_accepts_total_or_mean():
+    form = workload_analyzer.ValidateAnalyzeWorkloadForm()
+    dispatcher = CollectingDispatcher()
+
+    assert form.validate_workload_sort("Average time", dispatcher, None, {}) == {"workload_sort": "mean"}
+    assert form.validate_workload_sort("total", dispatcher, None, {}) == {"workload_sort": "total"}
+    assert form.validate_workload_sort("fastest", dispatcher, None, {}) == {"workload_sort": None}